@@ -1,11 +1,15 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request
 from app.models import (
-    AnalyzeRequest, AnalyzeResponse, CompanyResponse,
-    CompanyListResponse, HealthResponse, GraphData
+    AnalyzeRequest, AnalyzeResponse, BatchAnalyzeRequest, BatchAnalyzeResponse,
+    CompanyResponse, CompanySectionsResponse, CompanyListResponse, HealthResponse, GraphData,
+    MetricsResponse
 )
-from app.core.cache import get_cached_company
+from app.core.cache import redis_cache, get_cached_company, COMPANY_SECTIONS
+from app.core.jobs import analysis_queue, enrichment_queue, batch_queue, prewarm_queue, poll_queue
+from app.core.admission import admission, AdmissionRejected
 from app.config import settings
 from datetime import datetime
+import ipaddress
 import uuid
 import logging
 
@@ -15,46 +19,114 @@ router = APIRouter()
 @router.post("/analyze", response_model=AnalyzeResponse, status_code=202)
 async def analyze_company(
     request: AnalyzeRequest,
-    background_tasks: BackgroundTasks,
     http_request: Request
 ):
     """Initiate company analysis"""
     session_id = str(uuid.uuid4())
+    client_id = _client_id(http_request)
     
-    logger.info(f"Starting analysis for {request.company_name} (session: {session_id})")
+    try:
+        position = await admission.admit(session_id, client_id)
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected analysis of {request.company_name} for {client_id}: {e.reason}")
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "message": e.reason,
+                "queue_position": e.queue_position,
+                "retry_after_seconds": e.retry_after,
+            },
+            headers={"Retry-After": str(e.retry_after)}
+        )
     
-    # Import here to avoid circular dependency
-    from app.core.orchestrator import CompanyOrchestrator
+    logger.info(f"Starting analysis for {request.company_name} (session: {session_id}, queue position: {position['queue_position']})")
     
-    # Start background analysis
-    orchestrator = CompanyOrchestrator(session_id)
-    background_tasks.add_task(
-        orchestrator.analyze,
-        request.company_name,
-        request.options.model_dump()
-    )
+    from app.core.prewarm import record_company_access
+    await record_company_access(request.company_name)
     
-    # Build WebSocket URL dynamically from the incoming request host
-    host = http_request.headers.get("host", "localhost:8000")
-    is_https = http_request.headers.get("x-forwarded-proto", "http") == "https"
-    ws_protocol = "wss" if is_https else "ws"
-    ws_url = f"{ws_protocol}://{host}/ws/progress/{session_id}"
+    # Queue the analysis; any worker consuming the analysis stream picks it up
+    await analysis_queue.enqueue("analyze", {
+        "session_id": session_id,
+        "client_id": client_id,
+        "company_name": request.company_name,
+        "options": request.options.model_dump(),
+    })
     
     return AnalyzeResponse(
         session_id=session_id,
-        status="processing",
-        estimated_time_seconds=30,
-        websocket_url=ws_url
+        status="processing" if position["queue_position"] == 0 else "queued",
+        estimated_time_seconds=position["estimated_time_seconds"],
+        queue_position=position["queue_position"],
+        websocket_url=_websocket_url(http_request, session_id)
+    )
+
+@router.post("/analyze/batch", response_model=BatchAnalyzeResponse, status_code=202)
+async def analyze_batch(request: BatchAnalyzeRequest, http_request: Request):
+    """Analyze a portfolio of companies; cached companies return immediately"""
+    if len(request.company_names) > settings.batch_max_companies:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A batch can contain at most {settings.batch_max_companies} companies"
+        )
+    
+    from app.core.batch import start_batch
+    
+    batch = await start_batch(request.company_names, request.options.model_dump())
+    return BatchAnalyzeResponse(
+        **batch,
+        websocket_url=_websocket_url(http_request, batch["batch_id"])
     )
 
+def _websocket_url(http_request: Request, session_id: str) -> str:
+    """Build the progress WebSocket URL dynamically from the incoming request host"""
+    host = http_request.headers.get("host", "localhost:8000")
+    is_https = http_request.headers.get("x-forwarded-proto", "http") == "https"
+    ws_protocol = "wss" if is_https else "ws"
+    return f"{ws_protocol}://{host}/ws/progress/{session_id}"
+
+def _is_trusted_proxy(address: str) -> bool:
+    for proxy in settings.admission_trusted_proxies:
+        if proxy == "*":
+            return True
+        try:
+            if ipaddress.ip_address(address) in ipaddress.ip_network(proxy, strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+def _client_id(http_request: Request) -> str:
+    """
+    Identify the caller for per-client admission limits. X-Forwarded-For is
+    only honored on connections from a trusted proxy, and then the client is
+    the rightmost address no trusted proxy added.
+    """
+    peer = http_request.client.host if http_request.client else "unknown"
+    if not _is_trusted_proxy(peer):
+        return peer
+    forwarded = [hop.strip() for hop in http_request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for address in reversed(forwarded):
+        if not _is_trusted_proxy(address):
+            return address
+    return forwarded[0] if forwarded else peer
+
 @router.get("/company/{company_id}", response_model=CompanyResponse)
 async def get_company(company_id: str):
-    """Get company analysis results"""
+    """
+    Get company analysis results. Sections past their soft TTL are still
+    returned (marked stale in `freshness`) and refreshed in the background.
+    """
+    from app.core.orchestrator import section_freshness, schedule_company_refresh
+    from app.core.prewarm import record_company_access
+
     # Try cache first
     cached = await get_cached_company(company_id)
     if cached:
         logger.info(f"Returning cached data for {company_id}")
-        return cached
+        await record_company_access(cached["company_name"], cached.get("company_key"))
+        freshness = section_freshness(cached)
+        await schedule_company_refresh(cached, freshness)
+        return {**cached, "freshness": freshness}
     
     # If not in cache, return 404
     raise HTTPException(
@@ -62,6 +134,37 @@ async def get_company(company_id: str):
         detail=f"Company {company_id} not found. Please analyze it first."
     )
 
+@router.get("/company/{company_id}/sections", response_model=CompanySectionsResponse)
+async def get_company_sections(company_id: str, names: str = ""):
+    """
+    Get the record head and only the named sections (comma-separated, e.g.
+    `?names=overview,financials`); no names returns just the head.
+    """
+    from app.core.orchestrator import section_freshness, schedule_company_refresh
+    from app.core.prewarm import record_company_access
+
+    wanted = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = [name for name in wanted if name not in COMPANY_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown sections: {', '.join(unknown)}. Valid sections: {', '.join(COMPANY_SECTIONS)}"
+        )
+
+    cached = await get_cached_company(company_id, sections=wanted)
+    if not cached:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Company {company_id} not found. Please analyze it first."
+        )
+
+    await record_company_access(cached["company_name"], cached.get("company_key"))
+    freshness = section_freshness(cached)
+    await schedule_company_refresh(cached, freshness)
+    # Records cached whole carry every section; return only the requested ones
+    data = {name: section for name, section in cached.get("data", {}).items() if name in wanted}
+    return {**cached, "data": data, "freshness": freshness}
+
 @router.get("/graph/{company_id}", response_model=GraphData)
 async def get_graph(company_id: str, depth: int = 2):
     """Get knowledge graph data"""
@@ -87,6 +190,27 @@ async def list_companies(limit: int = 20, offset: int = 0):
         offset=offset
     )
 
+@router.get("/metrics", response_model=MetricsResponse)
+async def get_metrics():
+    """Queue depth and wait times, for dashboards and autoscaling"""
+    return MetricsResponse(
+        admission=await admission.metrics(),
+        jobs=[
+            await analysis_queue.metrics(),
+            await enrichment_queue.metrics(),
+            await batch_queue.metrics(),
+            await prewarm_queue.metrics(),
+            await poll_queue.metrics(),
+        ],
+        cache={
+            "backend": redis_cache.store.name if redis_cache.store else None,
+            "l1": redis_cache.local.metrics(),
+            "circuit": redis_cache.breaker.metrics(),
+            "namespaces": await redis_cache.namespace_metrics(),
+        },
+        timestamp=datetime.utcnow().isoformat()
+    )
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
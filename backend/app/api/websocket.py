@@ -1,33 +1,94 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.core.cache import get_progress_updates, delete_progress
+from app.core.cache import get_progress_updates, get_section_updates, delete_progress
+from app.core.progress import progress_hub, RESYNC
 import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Poll interval while Redis pub/sub is unavailable
+POLL_INTERVAL_SECONDS = 0.5
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    """Return once the client goes away; the progress stream ignores client messages"""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
 @router.websocket("/ws/progress/{session_id}")
 async def websocket_progress(websocket: WebSocket, session_id: str):
-    """WebSocket for real-time progress updates"""
+    """
+    WebSocket for real-time progress updates and result sections as they land.
+    Events are pushed over Redis pub/sub; without Redis the stored progress
+    is polled instead. An analysis that completed with degraded sections
+    keeps the socket open until they are recovered or enrichment is over.
+    """
     await websocket.accept()
     logger.info(f"WebSocket connected for session {session_id}")
-    
+    sections_sent = 0
+    recovered = set()
+    last_progress = None
+
+    async def send_sections():
+        nonlocal sections_sent
+        sections = await get_section_updates(session_id, sections_sent)
+        for section in sections:
+            await websocket.send_json(section)
+            if not section.get("degraded"):
+                recovered.add(section.get("section"))
+        sections_sent += len(sections)
+
+    async def send_progress(progress):
+        """Send a progress update unless unchanged"""
+        nonlocal last_progress
+        if not progress or progress == last_progress:
+            return
+        last_progress = progress
+        await websocket.send_json(progress)
+
+    def finished() -> bool:
+        """True once nothing more is coming for this session"""
+        kind = last_progress.get("type") if last_progress else None
+        if kind == "completed":
+            return not set(last_progress.get("degraded_sections") or []) - recovered
+        return kind in ["enriched", "error"]
+
     try:
-        while True:
-            # Get progress from Redis
-            progress = await get_progress_updates(session_id)
-            
-            if progress:
-                await websocket.send_json(progress)
-                
-                # If completed or error, close connection
-                if progress.get("type") in ["completed", "error"]:
-                    logger.info(f"Analysis {progress.get('type')} for session {session_id}")
-                    await asyncio.sleep(1)  # Give client time to receive
+        if progress_hub.available:
+            # Nothing is sent while a session is idle, so watch for the client leaving
+            disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+            try:
+                async with progress_hub.subscribe(session_id) as events:
+                    # Catch up on events published before subscribing
+                    event = RESYNC
+                    while True:
+                        if event["event"] == "progress":
+                            await send_progress(event["data"])
+                        else:
+                            await send_sections()
+                            if event["event"] == "resync":
+                                await send_progress(await get_progress_updates(session_id))
+                        if finished():
+                            break
+                        next_event = asyncio.create_task(events.get())
+                        await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                        if not next_event.done():
+                            next_event.cancel()
+                            raise WebSocketDisconnect()
+                        event = next_event.result()
+            finally:
+                disconnected.cancel()
+        else:
+            while True:
+                await send_sections()
+                await send_progress(await get_progress_updates(session_id))
+                if finished():
                     break
-            
-            await asyncio.sleep(0.5)
-    
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+        logger.info(f"Analysis {last_progress.get('type')} for session {session_id}")
+        await asyncio.sleep(1)  # Give client time to receive
+
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for session {session_id}")
     except Exception as e:
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     # API Keys
@@ -15,11 +15,139 @@ class Settings(BaseSettings):
     
     # Redis
     redis_url: str = "redis://localhost:6379"
+    redis_max_connections: int = 50  # per connection pool (text and bytes)
+    redis_socket_timeout_seconds: float = 5.0  # must exceed the job queue's 2s blocking reads
+    redis_connect_timeout_seconds: float = 1.0
+    redis_health_check_interval_seconds: int = 30
+    # Consecutive connection failures that open the circuit; while open, Redis
+    # calls fail fast and reconnects are retried with exponential backoff
+    redis_breaker_failure_threshold: int = 3
+    redis_reconnect_backoff_base_seconds: float = 0.5
+    redis_reconnect_backoff_max_seconds: float = 30.0
+
+    # Where cached values live: "redis", or an embedded "memory" (single
+    # process) or "sqlite" (shared by the processes of one node) backend.
+    # With Redis, values go to cache_fallback_backend while it is unreachable
+    # ("" to drop them, as before).
+    cache_backend: str = "redis"
+    cache_fallback_backend: str = "memory"
+    cache_sqlite_path: str = "cache.db"
+    memory_cache_max_entries: int = 10000
     
     # App
     environment: str = "development"
     log_level: str = "INFO"
     cache_ttl_seconds: int = 3600
+
+    # Stale-while-revalidate: company results stay readable for
+    # company_cache_ttl_seconds; a section older than its soft TTL is served
+    # stale and refreshed once in the background.
+    company_cache_ttl_seconds: int = 86400 * 7
+    section_soft_ttls: Dict[str, int] = {
+        "overview": 86400 * 7,
+        "products_apis": 86400 * 7,
+        "market_intelligence": 86400 * 3,
+        "financials": 86400,
+        "team_culture": 86400 * 7,
+        "news_sentiment": 3600 * 6,
+    }
+    refresh_lock_seconds: int = 600
+
+    # Learned company alias index (names, slugs, domains -> canonical key)
+    entity_alias_ttl_seconds: int = 86400 * 90
+
+    # Service cache fills: one caller computes a missing value under a Redis
+    # lease (renewed while it runs), everyone else waits for its result.
+    # XFetch refreshes values early with a probability scaled by xfetch_beta.
+    read_through_lease_seconds: int = 30
+    xfetch_beta: float = 1.0
+
+    # Cached values are stored in a binary envelope (orjson payload), zstd-
+    # compressed from cache_compression_min_bytes on when zstandard is installed
+    cache_compression_enabled: bool = True
+    cache_compression_min_bytes: int = 2048
+    cache_compression_level: int = 3
+
+    # Per-namespace cache metrics, flushed to Redis for cluster-wide views
+    cache_metric_namespaces: List[str] = [
+        "yutori:research:", "yutori:browsing:", "yutori:task:", "tavily:competitors:",
+        "sentiment:news:", "company:alias:", "company:", "progress:",
+    ]
+    cache_metrics_flush_seconds: int = 15
+    cache_metrics_retention_seconds: int = 3600
+
+    # In-process L1 cache in front of Redis, invalidated across processes
+    # over pub/sub. Keys under the excluded prefixes always go to Redis.
+    l1_cache_enabled: bool = True
+    l1_cache_max_entries: int = 1000
+    l1_cache_ttl_seconds: float = 30.0
+    l1_cache_excluded_prefixes: List[str] = [
+        "progress:", "analysis:", "admission:", "batch:", "refresh:", "jobs:", "yutori:task:"
+    ]
+    analysis_lease_ttl_seconds: int = 120
+
+    # Job queue
+    embedded_worker: bool = True  # also consume jobs inside the API process
+    worker_concurrency: int = 4
+    enrichment_worker_concurrency: int = 2
+    batch_worker_concurrency: int = 2  # caps upstream load from all batches together
+    prewarm_worker_concurrency: int = 1
+    poll_worker_concurrency: int = 8
+    job_visibility_timeout_seconds: int = 120
+    job_max_deliveries: int = 3
+    job_dead_letter_maxlen: int = 10000
+
+    # Yutori research tasks are polled every research_poll_interval_seconds,
+    # one short job per poll, until they finish or research_poll_timeout_seconds pass
+    research_poll_interval_seconds: float = 5.0
+    research_poll_timeout_seconds: int = 600
+
+    # Admission control
+    admission_max_pending: int = 50  # queued + running analyses, cluster-wide
+    admission_max_per_client: int = 3
+    admission_entry_ttl_seconds: int = 600
+    admission_default_run_seconds: int = 30
+    # Reverse proxies (addresses or CIDR ranges, "*" for any) whose
+    # X-Forwarded-For header identifies the client; other peers are
+    # identified by their connection address
+    admission_trusted_proxies: List[str] = []
+
+    # Cache prewarming: the prewarm_top_n most requested companies (counts
+    # halve every prewarm_decay_seconds) get service entries refreshed
+    # prewarm_lead_seconds before they turn stale, on the low-priority prewarm
+    # stream, at most prewarm_max_refreshes_per_hour upstream refreshes
+    prewarm_enabled: bool = True
+    prewarm_interval_seconds: int = 300
+    prewarm_top_n: int = 25
+    prewarm_lead_seconds: int = 3600
+    prewarm_decay_seconds: int = 86400
+    prewarm_max_refreshes_per_hour: int = 20
+
+    # Background migration of cached values stamped with an older schema
+    # version: at most cache_migration_batch_size per interval, plus a
+    # backfill scan of the migrated namespaces every cache_migration_scan_seconds
+    cache_migration_enabled: bool = True
+    cache_migration_interval_seconds: int = 60
+    cache_migration_batch_size: int = 20
+    cache_migration_scan_seconds: int = 21600
+
+    # Batch analysis
+    batch_max_companies: int = 500
+    batch_ttl_seconds: int = 86400
+    # Items coalesced onto an analysis running elsewhere are checked every
+    # batch_poll_interval_seconds, one short job per check
+    batch_poll_interval_seconds: float = 2.0
+
+    # Latency budgets (seconds). Stages that miss theirs, or the overall
+    # deadline, are returned as degraded and filled in the background.
+    analysis_deadline_seconds: float = 40.0
+    stage_budgets: Dict[str, float] = {
+        "overview": 8.0,
+        "competitors": 20.0,
+        "financials": 10.0,
+        "team": 5.0,
+        "news": 35.0,
+    }
     
     class Config:
         env_file = ".env"
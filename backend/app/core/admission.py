@@ -0,0 +1,257 @@
+from app.core.cache import redis_cache
+from app.core.jobs import analysis_queue
+from app.config import settings
+from typing import Any, Dict, Optional
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+QUEUED_KEY = "admission:queued"      # session -> enqueue time
+RUNNING_KEY = "admission:running"    # session -> start time
+STATS_KEY = "admission:stats"        # moving averages of wait and run time
+
+
+# Prune expired entries, check both limits and admit, in one atomic step so
+# concurrent requests cannot all pass the check before any of them is added.
+# KEYS: queued, running, client; ARGV: now, cutoff, session, entry ttl,
+# max per client, max pending. Returns {admitted, queued, running, client pending}.
+_ADMIT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], 0, ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], 0, ARGV[2])
+local queued = redis.call('ZCARD', KEYS[1])
+local running = redis.call('ZCARD', KEYS[2])
+local client = redis.call('ZCARD', KEYS[3])
+if client < tonumber(ARGV[5]) and queued + running < tonumber(ARGV[6]) then
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[3])
+    redis.call('ZADD', KEYS[3], ARGV[1], ARGV[3])
+    redis.call('EXPIRE', KEYS[3], ARGV[4])
+    return {1, queued, running, client}
+end
+return {0, queued, running, client}
+"""
+
+
+def _client_key(client_id: str) -> str:
+    return f"admission:client:{client_id}"
+
+
+class AdmissionRejected(Exception):
+    """The analysis queue (or this client's share of it) is full"""
+
+    def __init__(self, reason: str, retry_after: int, queue_position: int = 0):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.queue_position = queue_position
+
+
+class AdmissionController:
+    """
+    Admission control in front of the analysis queue.
+
+    Every analysis is tracked from admission until its worker finishes it. A new
+    analysis is rejected when the cluster-wide run queue (queued + running) is at
+    `admission_max_pending`, or when its client already has
+    `admission_max_per_client` analyses in flight. Accepted analyses get their
+    queue position and an ETA based on observed run times and the analysis
+    workers currently consuming the queue. State lives in Redis
+    so every API process sees the same queue; entries older than
+    `admission_entry_ttl_seconds` are dropped in case a worker died.
+    """
+
+    def __init__(self):
+        # In-process fallback when Redis is unavailable
+        self._queued: Dict[str, float] = {}
+        self._running: Dict[str, float] = {}
+        self._clients: Dict[str, Dict[str, float]] = {}
+        self._stats = {"avg_wait_seconds": 0.0, "avg_run_seconds": float(settings.admission_default_run_seconds)}
+
+    async def admit(self, session_id: str, client_id: str) -> Dict[str, int]:
+        """Admit an analysis or raise AdmissionRejected. Returns queue position and ETA."""
+        now = time.time()
+        client = redis_cache.client
+        if client:
+            try:
+                return await self._admit_redis(client, session_id, client_id, now)
+            except AdmissionRejected:
+                raise
+            except Exception as e:
+                logger.warning(f"Admission state unavailable, using in-process queue: {e}")
+        return self._admit_local(session_id, client_id, now)
+
+    async def _admit_redis(self, client, session_id: str, client_id: str, now: float) -> Dict[str, int]:
+        cutoff = now - settings.admission_entry_ttl_seconds
+        pipe = client.pipeline(transaction=False)
+        pipe.eval(
+            _ADMIT_SCRIPT, 3, QUEUED_KEY, RUNNING_KEY, _client_key(client_id),
+            now, cutoff, session_id, settings.admission_entry_ttl_seconds,
+            settings.admission_max_per_client, settings.admission_max_pending,
+        )
+        pipe.hgetall(STATS_KEY)
+        pipe.xinfo_consumers(analysis_queue.stream, analysis_queue.group)
+        admit, stats, consumers = await pipe.execute(raise_on_error=False)
+        for result in (admit, stats):
+            if isinstance(result, Exception):
+                raise result
+        admitted, queued, running, client_pending = admit
+
+        stats = self._averages(stats)
+        slots = self._run_slots(consumers)
+        if not admitted:
+            self._check_limits(queued, running, client_pending, stats, slots)
+        return self._position(queued, running, stats, slots)
+
+    def _run_slots(self, consumers: Any) -> int:
+        """
+        Analyses that run at once across the cluster: the analysis stream's
+        live consumers times their concurrency. Consumers idle longer than the
+        visibility timeout belong to workers that are gone.
+        """
+        if isinstance(consumers, Exception) or not consumers:
+            return analysis_queue.concurrency  # no worker has registered yet
+        max_idle_ms = settings.job_visibility_timeout_seconds * 1000
+        live = sum(1 for consumer in consumers if consumer.get("idle", 0) < max_idle_ms)
+        return max(1, live) * analysis_queue.concurrency
+
+    def _admit_local(self, session_id: str, client_id: str, now: float) -> Dict[str, int]:
+        cutoff = now - settings.admission_entry_ttl_seconds
+        for entries in (self._queued, self._running, *self._clients.values()):
+            for stale in [s for s, ts in entries.items() if ts < cutoff]:
+                del entries[stale]
+
+        # Without Redis analyses run on this process' in-process slots
+        slots = analysis_queue.concurrency
+        client_sessions = self._clients.setdefault(client_id, {})
+        self._check_limits(len(self._queued), len(self._running), len(client_sessions), self._stats, slots)
+
+        position = self._position(len(self._queued), len(self._running), self._stats, slots)
+        self._queued[session_id] = now
+        client_sessions[session_id] = now
+        return position
+
+    def _check_limits(
+        self, queued: int, running: int, client_pending: int, stats: Dict[str, float], slots: int
+    ):
+        if client_pending >= settings.admission_max_per_client:
+            raise AdmissionRejected(
+                f"Too many analyses in progress for this client (limit {settings.admission_max_per_client})",
+                retry_after=math.ceil(stats["avg_run_seconds"]),
+            )
+        if queued + running >= settings.admission_max_pending:
+            position = self._position(queued, running, stats, slots)
+            raise AdmissionRejected(
+                "Analysis queue is full, please retry later",
+                retry_after=position["estimated_time_seconds"],
+                queue_position=position["queue_position"],
+            )
+
+    def _position(self, queued: int, running: int, stats: Dict[str, float], slots: int) -> Dict[str, int]:
+        """
+        Position and ETA for an analysis joining behind `queued` + `running`
+        others, with `slots` analyses running at once. Position 0 means it
+        starts as soon as a worker picks it up.
+        """
+        slots = max(1, slots)
+        position = max(0, queued + running - slots + 1)
+        waves = math.ceil(position / slots)
+        return {
+            "queue_position": position,
+            "estimated_time_seconds": math.ceil((waves + 1) * stats["avg_run_seconds"]),
+        }
+
+    def _averages(self, stats: Dict[str, str]) -> Dict[str, float]:
+        return {
+            "avg_wait_seconds": float(stats.get("avg_wait_seconds", 0.0)),
+            "avg_run_seconds": float(stats.get("avg_run_seconds", settings.admission_default_run_seconds)),
+        }
+
+    async def start(self, session_id: str):
+        """A worker picked up the analysis"""
+        now = time.time()
+        client = redis_cache.client
+        if client:
+            try:
+                enqueued_at = await client.zscore(QUEUED_KEY, session_id)
+                pipe = client.pipeline(transaction=True)
+                pipe.zrem(QUEUED_KEY, session_id)
+                pipe.zadd(RUNNING_KEY, {session_id: now})
+                await pipe.execute()
+                if enqueued_at:
+                    await self._record(client, "avg_wait_seconds", now - enqueued_at)
+                return
+            except Exception as e:
+                logger.warning(f"Could not record start of {session_id}: {e}")
+
+        enqueued_at = self._queued.pop(session_id, None)
+        self._running[session_id] = now
+        if enqueued_at:
+            self._record_local("avg_wait_seconds", now - enqueued_at)
+
+    async def finish(self, session_id: str, client_id: str):
+        """The analysis ended (successfully or not) and frees its slot"""
+        now = time.time()
+        client = redis_cache.client
+        if client:
+            try:
+                started_at = await client.zscore(RUNNING_KEY, session_id)
+                pipe = client.pipeline(transaction=True)
+                pipe.zrem(QUEUED_KEY, session_id)
+                pipe.zrem(RUNNING_KEY, session_id)
+                pipe.zrem(_client_key(client_id), session_id)
+                await pipe.execute()
+                if started_at:
+                    await self._record(client, "avg_run_seconds", now - started_at)
+                return
+            except Exception as e:
+                logger.warning(f"Could not record end of {session_id}: {e}")
+
+        self._queued.pop(session_id, None)
+        started_at = self._running.pop(session_id, None)
+        self._clients.get(client_id, {}).pop(session_id, None)
+        if started_at:
+            self._record_local("avg_run_seconds", now - started_at)
+
+    async def _record(self, client, stat: str, seconds: float):
+        """Exponential moving average; last-writer-wins is fine for an estimate"""
+        current = await client.hget(STATS_KEY, stat)
+        value = seconds if current is None else 0.8 * float(current) + 0.2 * seconds
+        await client.hset(STATS_KEY, stat, value)
+
+    def _record_local(self, stat: str, seconds: float):
+        self._stats[stat] = 0.8 * self._stats[stat] + 0.2 * seconds
+
+    async def metrics(self) -> Dict[str, Any]:
+        """Queue depth and wait times, for dashboards and autoscaling"""
+        client = redis_cache.client
+        if client:
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.zcard(QUEUED_KEY)
+                pipe.zcard(RUNNING_KEY)
+                pipe.zrange(QUEUED_KEY, 0, 0, withscores=True)
+                pipe.hgetall(STATS_KEY)
+                queued, running, oldest, stats = await pipe.execute()
+                oldest_at: Optional[float] = oldest[0][1] if oldest else None
+                return self._metrics(queued, running, oldest_at, self._averages(stats))
+            except Exception as e:
+                logger.warning(f"Could not read admission metrics: {e}")
+
+        oldest_at = min(self._queued.values()) if self._queued else None
+        return self._metrics(len(self._queued), len(self._running), oldest_at, self._stats)
+
+    def _metrics(self, queued: int, running: int, oldest_at: Optional[float], stats: Dict[str, float]) -> Dict[str, Any]:
+        return {
+            "queued": queued,
+            "running": running,
+            "max_pending": settings.admission_max_pending,
+            "oldest_wait_seconds": round(time.time() - oldest_at, 1) if oldest_at else 0.0,
+            "avg_wait_seconds": round(stats["avg_wait_seconds"], 1),
+            "avg_run_seconds": round(stats["avg_run_seconds"], 1),
+        }
+
+
+# Global instance
+admission = AdmissionController()
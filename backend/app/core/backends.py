@@ -0,0 +1,454 @@
+from abc import ABC, abstractmethod
+from app.config import settings
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple, Union
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Company record heads are stored once under `company:{id}`; slugs and session ids
+# are `company:alias:{alias}` keys holding that id. Resolves either in one round trip.
+_RESOLVE_COMPANY_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value then return value end
+local company_id = redis.call('GET', KEYS[2])
+if company_id then return redis.call('GET', ARGV[1] .. company_id) end
+return false
+"""
+
+# Pipeline command: (operation, *args), with the operation one of
+# "set" (key, value, ttl), "expire" (key, ttl), "delete" (*keys), "ttl" (key),
+# "size" (key) and "resolve" (key, alias_key, prefix), run by CacheBackend.execute
+Operation = Tuple[Any, ...]
+
+# Keys per SCAN call; large so big keyspaces need few round trips
+SCAN_COUNT = 1000
+
+
+def _to_bytes(value: Union[bytes, str]) -> bytes:
+    return value.encode() if isinstance(value, str) else value
+
+
+class CacheBackend(ABC):
+    """
+    Key-value store with per-key TTLs behind RedisCache. It holds cached
+    values (bytes), alias pointers and progress lists; queues, leases and
+    pub/sub always stay on Redis. Reads of missing or expired keys return None.
+    """
+
+    name = "backend"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
+
+    @abstractmethod
+    async def set(self, key: str, value: Union[bytes, str], ttl: int):
+        ...
+
+    @abstractmethod
+    async def expire(self, key: str, ttl: int) -> bool:
+        """Reset the TTL of an existing key. Returns False if there is no such key."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> int:
+        ...
+
+    async def unlink(self, *keys: str) -> int:
+        """Delete keys without blocking the server (memory is reclaimed in the background on Redis)"""
+        return await self.delete(*keys)
+
+    @abstractmethod
+    async def ttl(self, key: str) -> int:
+        """Seconds left to live, -2 if the key does not exist (like Redis TTL)"""
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Bytes the key takes up (Redis MEMORY USAGE, else the stored value size); None if missing"""
+
+    async def resolve(self, key: str, alias_key: str, prefix: str) -> Optional[bytes]:
+        """Value of `key`, else the value of `prefix + <id stored under alias_key>`"""
+        value = await self.get(key)
+        if value is not None:
+            return value
+        target = await self.get(alias_key)
+        return await self.get(prefix + target.decode()) if target is not None else None
+
+    @abstractmethod
+    async def push(self, key: str, item: str, ttl: int):
+        """Append to the list at `key` and reset its TTL"""
+
+    @abstractmethod
+    async def range(self, key: str, start: int = 0) -> List[Union[bytes, str]]:
+        ...
+
+    async def execute(self, operations: Sequence[Operation], transaction: bool = True) -> List[Any]:
+        """Run queued pipeline commands, returning one reply per command"""
+        return [await getattr(self, operation)(*args) for operation, *args in operations]
+
+    @abstractmethod
+    def scan(self, pattern: str = "*") -> AsyncIterator[str]:
+        """Iterate over live keys matching a glob-style pattern"""
+
+    @abstractmethod
+    async def flush(self):
+        """Drop every key"""
+
+    async def close(self):
+        pass
+
+
+class RedisBackend(CacheBackend):
+    """Values on Redis, through RedisCache's bytes client"""
+
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return await self.client.mget(keys)
+
+    async def set(self, key: str, value: Union[bytes, str], ttl: int):
+        await self.client.setex(key, ttl, value)
+
+    async def expire(self, key: str, ttl: int) -> bool:
+        return await self.client.expire(key, ttl)
+
+    async def delete(self, *keys: str) -> int:
+        return await self.client.delete(*keys) if keys else 0
+
+    async def unlink(self, *keys: str) -> int:
+        return await self.client.unlink(*keys) if keys else 0
+
+    async def ttl(self, key: str) -> int:
+        return await self.client.ttl(key)
+
+    async def size(self, key: str) -> Optional[int]:
+        return await self.client.memory_usage(key)
+
+    async def resolve(self, key: str, alias_key: str, prefix: str) -> Optional[bytes]:
+        return await self.client.eval(_RESOLVE_COMPANY_SCRIPT, 2, key, alias_key, prefix)
+
+    async def push(self, key: str, item: str, ttl: int):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(key, item)
+        pipe.expire(key, ttl)
+        await pipe.execute()
+
+    async def range(self, key: str, start: int = 0) -> List[bytes]:
+        return await self.client.lrange(key, start, -1)
+
+    async def execute(self, operations: Sequence[Operation], transaction: bool = True) -> List[Any]:
+        """One round trip, atomic (MULTI/EXEC) when `transaction`"""
+        pipe = self.client.pipeline(transaction=transaction)
+        for operation, *args in operations:
+            if operation == "set":
+                key, value, ttl = args
+                pipe.setex(key, ttl, value)
+            elif operation == "expire":
+                pipe.expire(*args)
+            elif operation == "delete":
+                pipe.delete(*args)
+            elif operation == "ttl":
+                pipe.ttl(*args)
+            elif operation == "size":
+                pipe.memory_usage(*args)
+            elif operation == "resolve":
+                pipe.eval(_RESOLVE_COMPANY_SCRIPT, 2, *args)
+            else:
+                raise ValueError(f"Unknown pipeline operation '{operation}'")
+        return await pipe.execute()
+
+    async def scan(self, pattern: str = "*") -> AsyncIterator[str]:
+        async for key in self.client.scan_iter(match=pattern, count=SCAN_COUNT):
+            yield key.decode() if isinstance(key, bytes) else key
+
+    async def flush(self):
+        await self.client.flushdb()
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Values in this process's memory, bounded to `max_entries` keys (least
+    recently used are evicted). Only for a single process: workers in other
+    processes see none of it.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def _lookup(self, key: str) -> Any:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if item[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return item[1]
+
+    def _store(self, key: str, value: Any, ttl: int):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self._lookup(key)
+        return value if isinstance(value, bytes) else None
+
+    async def set(self, key: str, value: Union[bytes, str], ttl: int):
+        self._store(key, _to_bytes(value), ttl)
+
+    async def expire(self, key: str, ttl: int) -> bool:
+        value = self._lookup(key)
+        if value is None:
+            return False
+        self._store(key, value, ttl)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._entries.pop(key, None) is not None for key in keys)
+
+    async def ttl(self, key: str) -> int:
+        if self._lookup(key) is None:
+            return -2
+        return max(int(self._entries[key][0] - time.time()), 0)
+
+    async def size(self, key: str) -> Optional[int]:
+        value = self._lookup(key)
+        if isinstance(value, list):
+            return sum(len(item) for item in value)
+        return len(value) if value is not None else None
+
+    async def push(self, key: str, item: str, ttl: int):
+        items = self._lookup(key)
+        if not isinstance(items, list):
+            items = []
+        items.append(_to_bytes(item))
+        self._store(key, items, ttl)
+
+    async def range(self, key: str, start: int = 0) -> List[bytes]:
+        items = self._lookup(key)
+        return list(items[start:]) if isinstance(items, list) else []
+
+    async def scan(self, pattern: str = "*") -> AsyncIterator[str]:
+        for key in list(self._entries):
+            if fnmatchcase(key, pattern) and self._lookup(key) is not None:
+                yield key
+
+    async def flush(self):
+        self._entries.clear()
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Values in an SQLite file on local disk, shared by every process on the
+    node (WAL mode). Calls run in a worker thread; expired rows are skipped on
+    read and purged every `purge_every` writes.
+    """
+
+    name = "sqlite"
+    purge_every = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Autocommit; batches open their own transaction
+        self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache_lists "
+            "(key TEXT NOT NULL, position INTEGER NOT NULL, item BLOB NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (key, position)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        self._purge()
+
+    async def _run(self, function, *args):
+        def locked():
+            with self._lock:
+                return function(*args)
+        return await asyncio.to_thread(locked)
+
+    def _purge(self):
+        now = time.time()
+        self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        self._db.execute("DELETE FROM cache_lists WHERE expires_at <= ?", (now,))
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self._purge()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._db.execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: Union[bytes, str], ttl: int):
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, _to_bytes(value), time.time() + ttl),
+        )
+        self._wrote()
+
+    def _expire(self, key: str, ttl: int) -> bool:
+        now = time.time()
+        updated = self._db.execute(
+            "UPDATE cache SET expires_at = ? WHERE key = ? AND expires_at > ?", (now + ttl, key, now)
+        ).rowcount
+        updated += self._db.execute(
+            "UPDATE cache_lists SET expires_at = ? WHERE key = ? AND expires_at > ?", (now + ttl, key, now)
+        ).rowcount
+        return bool(updated)
+
+    def _delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            deleted += self._db.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+            deleted += bool(self._db.execute("DELETE FROM cache_lists WHERE key = ?", (key,)).rowcount)
+        return deleted
+
+    def _ttl(self, key: str) -> int:
+        now = time.time()
+        row = self._db.execute(
+            "SELECT expires_at FROM cache WHERE key = ? AND expires_at > ? "
+            "UNION ALL SELECT MAX(expires_at) FROM cache_lists WHERE key = ? AND expires_at > ?",
+            (key, now, key, now),
+        ).fetchall()
+        expires_at = max((expires for (expires,) in row if expires is not None), default=None)
+        return int(expires_at - now) if expires_at is not None else -2
+
+    def _size(self, key: str) -> Optional[int]:
+        now = time.time()
+        row = self._db.execute(
+            "SELECT length(value) FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row:
+            return row[0]
+        return self._db.execute(
+            "SELECT SUM(length(item)) FROM cache_lists WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()[0]
+
+    def _resolve(self, key: str, alias_key: str, prefix: str) -> Optional[bytes]:
+        value = self._get(key)
+        if value is not None:
+            return value
+        target = self._get(alias_key)
+        return self._get(prefix + target.decode()) if target is not None else None
+
+    def _push(self, key: str, item: str, ttl: int):
+        now = time.time()
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("DELETE FROM cache_lists WHERE key = ? AND expires_at <= ?", (key, now))
+            self._db.execute(
+                "INSERT INTO cache_lists (key, position, item, expires_at) "
+                "SELECT ?, COALESCE(MAX(position) + 1, 0), ?, ? FROM cache_lists WHERE key = ?",
+                (key, _to_bytes(item), now + ttl, key),
+            )
+            self._db.execute("UPDATE cache_lists SET expires_at = ? WHERE key = ?", (now + ttl, key))
+        self._wrote()
+
+    def _range(self, key: str, start: int) -> List[bytes]:
+        rows = self._db.execute(
+            "SELECT item FROM cache_lists WHERE key = ? AND expires_at > ? ORDER BY position LIMIT -1 OFFSET ?",
+            (key, time.time(), start),
+        ).fetchall()
+        return [item for (item,) in rows]
+
+    def _execute(self, operations: Sequence[Operation], transaction: bool) -> List[Any]:
+        if not transaction:
+            return [getattr(self, f"_{operation}")(*args) for operation, *args in operations]
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            return [getattr(self, f"_{operation}")(*args) for operation, *args in operations]
+
+    def _keys(self, pattern: str) -> List[str]:
+        now = time.time()
+        rows = self._db.execute(
+            "SELECT key FROM cache WHERE key GLOB ? AND expires_at > ? "
+            "UNION SELECT key FROM cache_lists WHERE key GLOB ? AND expires_at > ?",
+            (pattern, now, pattern, now),
+        ).fetchall()
+        return [key for (key,) in rows]
+
+    def _flush(self):
+        self._db.execute("DELETE FROM cache")
+        self._db.execute("DELETE FROM cache_lists")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run(self._get, key)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return await self._run(lambda: [self._get(key) for key in keys])
+
+    async def set(self, key: str, value: Union[bytes, str], ttl: int):
+        await self._run(self._set, key, value, ttl)
+
+    async def expire(self, key: str, ttl: int) -> bool:
+        return await self._run(self._expire, key, ttl)
+
+    async def delete(self, *keys: str) -> int:
+        return await self._run(self._delete, *keys)
+
+    async def ttl(self, key: str) -> int:
+        return await self._run(self._ttl, key)
+
+    async def size(self, key: str) -> Optional[int]:
+        return await self._run(self._size, key)
+
+    async def resolve(self, key: str, alias_key: str, prefix: str) -> Optional[bytes]:
+        return await self._run(self._resolve, key, alias_key, prefix)
+
+    async def push(self, key: str, item: str, ttl: int):
+        await self._run(self._push, key, item, ttl)
+
+    async def range(self, key: str, start: int = 0) -> List[bytes]:
+        return await self._run(self._range, key, start)
+
+    async def execute(self, operations: Sequence[Operation], transaction: bool = True) -> List[Any]:
+        """All commands in one thread hop, in one SQLite transaction when `transaction`"""
+        return await self._run(self._execute, operations, transaction)
+
+    async def scan(self, pattern: str = "*") -> AsyncIterator[str]:
+        for key in await self._run(self._keys, pattern):
+            yield key
+
+    async def flush(self):
+        await self._run(self._flush)
+
+    async def close(self):
+        await self._run(self._db.close)
+
+
+def create_backend(name: str) -> CacheBackend:
+    """Embedded backend by name ("memory" or "sqlite"), configured from settings"""
+    if name == "memory":
+        return MemoryBackend(settings.memory_cache_max_entries)
+    if name == "sqlite":
+        return SQLiteBackend(settings.cache_sqlite_path)
+    raise ValueError(f"Unknown cache backend '{name}'")
@@ -0,0 +1,203 @@
+from app.core.cache import (
+    redis_cache, get_cached_company, get_cached_companies, get_progress_updates,
+    update_progress, push_section_update
+)
+from app.core.jobs import batch_queue, poll_queue, register_job_handler
+from app.core.admission import admission
+from app.core.orchestrator import CompanyOrchestrator, STAGE_SECTIONS, plan_stages
+from app.core.singleflight import flight_key
+from app.core.entities import resolve_company_keys
+from app.config import settings
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# In-process fallback when Redis is unavailable: batch id -> counters
+_local_batches: Dict[str, Dict[str, int]] = {}
+
+
+def _batch_key(batch_id: str) -> str:
+    return f"batch:{batch_id}"
+
+
+async def start_batch(company_names: List[str], options: dict) -> Dict[str, Any]:
+    """
+    Schedule a portfolio of companies for analysis.
+
+    Names are deduplicated on their normalized form; names without one (blank
+    or punctuation only) are returned as `rejected`. Companies with a
+    completed cached result holding every section `options` asks for are
+    returned immediately; only misses are queued,
+    on the batch stream whose worker concurrency caps the upstream load of
+    all batches together. Names are resolved, looked up and queued in one
+    round trip each. Progress for the whole batch is reported on one channel
+    keyed by the batch id.
+    """
+    batch_id = str(uuid.uuid4())
+
+    unique: Dict[str, str] = {}
+    rejected: List[str] = []
+    for name in company_names:
+        key = flight_key(name)
+        if not key:
+            rejected.append(name)
+        elif key not in unique:
+            unique[key] = name.strip()
+    names = list(unique.values())
+
+    keys = await resolve_company_keys(names)
+    # Results cached before canonical company keys are only aliased by slug
+    slugs = [name.lower().replace(" ", "-") for name in names]
+    found = await get_cached_companies(keys + slugs)
+    cached = [by_key or by_slug for by_key, by_slug in zip(found, found[len(names):])]
+
+    wanted = {STAGE_SECTIONS[stage] for stage in plan_stages(options) if stage in STAGE_SECTIONS}
+
+    items = []
+    for name, result in zip(names, cached):
+        if result and result.get("status") == "completed" and wanted <= _cached_sections(result):
+            items.append({"company_name": name, "status": "cached", "company_id": result["id"]})
+        else:
+            items.append({"company_name": name, "status": "queued", "session_id": str(uuid.uuid4())})
+
+    queued = [item for item in items if item["status"] == "queued"]
+    await _init_counters(batch_id, len(queued))
+
+    await batch_queue.enqueue_many("batch_analyze", [
+        {
+            "batch_id": batch_id,
+            "session_id": item["session_id"],
+            "company_name": item["company_name"],
+            "options": options,
+        }
+        for item in queued
+    ])
+
+    await _report(batch_id, {"total": len(queued), "done": 0, "failed": 0}, len(items) - len(queued))
+    logger.info(
+        f"Batch {batch_id}: {len(items)} companies, {len(items) - len(queued)} cached, "
+        f"{len(queued)} queued, {len(rejected)} rejected"
+    )
+
+    return {
+        "batch_id": batch_id,
+        "total": len(items),
+        "cached": len(items) - len(queued),
+        "queued": len(queued),
+        "items": items,
+        "rejected": rejected,
+    }
+
+
+def _cached_sections(result: dict) -> set:
+    """Sections a cached result holds; whole records cached before section lists list them in `data`"""
+    if "sections" in result:
+        return set(result["sections"])
+    return set(result.get("data") or {})
+
+
+async def _init_counters(batch_id: str, total: int):
+    client = redis_cache.client
+    if client:
+        try:
+            await client.hset(_batch_key(batch_id), mapping={"total": total, "done": 0, "failed": 0})
+            await client.expire(_batch_key(batch_id), settings.batch_ttl_seconds)
+            return
+        except Exception as e:
+            logger.warning(f"Could not store batch {batch_id} in Redis: {e}")
+    _local_batches[batch_id] = {"total": total, "done": 0, "failed": 0}
+
+
+async def _record_item(batch_id: str, succeeded: bool) -> Dict[str, int]:
+    field = "done" if succeeded else "failed"
+    client = redis_cache.client
+    if client:
+        try:
+            pipe = client.pipeline(transaction=True)
+            pipe.hincrby(_batch_key(batch_id), field, 1)
+            pipe.hgetall(_batch_key(batch_id))
+            _, counters = await pipe.execute()
+            return {k: int(v) for k, v in counters.items()}
+        except Exception as e:
+            logger.warning(f"Could not update batch {batch_id} in Redis: {e}")
+    counters = _local_batches.setdefault(batch_id, {"total": 0, "done": 0, "failed": 0})
+    counters[field] += 1
+    return dict(counters)
+
+
+async def _report(batch_id: str, counters: Dict[str, int], cached: Optional[int] = None):
+    """Publish aggregate batch progress on the batch's progress channel"""
+    total, finished = counters.get("total", 0), counters.get("done", 0) + counters.get("failed", 0)
+    complete = finished >= total
+    progress_data = {
+        "type": "completed" if complete else "progress",
+        "session_id": batch_id,
+        "stage": "batch",
+        "progress": 1.0 if complete else finished / total,
+        "message": f"{finished}/{total} companies analyzed ({counters.get('failed', 0)} failed)",
+        "timestamp": datetime.utcnow().isoformat(),
+        **counters,
+    }
+    if cached is not None:
+        progress_data["cached"] = cached
+    await update_progress(batch_id, progress_data)
+
+
+async def _session_finished(session_id: str) -> bool:
+    progress = await get_progress_updates(session_id)
+    return bool(progress) and progress.get("type") in ("completed", "enriched", "error")
+
+
+@register_job_handler("batch_analyze")
+async def run_batch_item_job(payload: Dict[str, Any]):
+    batch_id, session_id = payload["batch_id"], payload["session_id"]
+
+    await admission.start(session_id)
+    try:
+        orchestrator = CompanyOrchestrator(session_id)
+        await orchestrator.analyze(payload["company_name"], payload.get("options") or {})
+    finally:
+        await admission.finish(session_id, f"batch:{batch_id}")
+
+    if orchestrator.flight and not orchestrator.flight.is_leader and not await _session_finished(session_id):
+        # Coalesced onto an analysis another request is running: record the
+        # item once it ends, without holding a batch slot meanwhile
+        await poll_queue.enqueue("batch_item_poll", {
+            **payload, "deadline": time.time() + settings.analysis_lease_ttl_seconds
+        })
+        return
+    await _record_result(payload)
+
+
+@register_job_handler("batch_item_poll")
+async def run_batch_item_poll_job(payload: Dict[str, Any]):
+    """One check of a coalesced item's analysis, run as a short job that re-queues itself"""
+    await asyncio.sleep(settings.batch_poll_interval_seconds)
+    if not await _session_finished(payload["session_id"]) and time.time() < payload["deadline"]:
+        await poll_queue.enqueue("batch_item_poll", payload)
+        return
+    await _record_result(payload)
+
+
+async def _record_result(payload: Dict[str, Any]):
+    batch_id, session_id = payload["batch_id"], payload["session_id"]
+    company_name = payload["company_name"]
+
+    result = await get_cached_company(session_id, sections=())
+    succeeded = bool(result) and result.get("status") == "completed"
+
+    await push_section_update(batch_id, {
+        "type": "item",
+        "session_id": batch_id,
+        "company_name": company_name,
+        "item_session_id": session_id,
+        "company_id": result["id"] if succeeded else None,
+        "status": "completed" if succeeded else "failed",
+        "timestamp": datetime.utcnow().isoformat(),
+    })
+    await _report(batch_id, await _record_item(batch_id, succeeded))
@@ -1,93 +1,749 @@
 import redis.asyncio as redis
 from app.config import settings
+from app.core import codec
+from app.core.backends import CacheBackend, RedisBackend, create_backend
+from app.core.metrics import CacheMetrics, merge_snapshots
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import asyncio
 import json
 import logging
-from typing import Optional, Any
+import math
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
+# Marker key of values stored with freshness metadata (soft TTL, recompute time,
+# schema version)
+SWR_MARKER = "__swr__"
+
+# Current schema version of namespaces with a registered migration (see
+# app.core.migrations): key prefix -> version stamped on every write
+SCHEMA_VERSIONS: Dict[str, int] = {}
+
+def schema_version_of(key: str) -> Optional[int]:
+    for prefix, version in SCHEMA_VERSIONS.items():
+        if key.startswith(prefix):
+            return version
+    return None
+
+# Release / extend a read-through lease only if this caller still owns it
+_LEASE_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_LEASE_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+class CacheEntry:
+    """
+    A cached value with its freshness. Values stored with a soft TTL become
+    stale after it but stay readable until the hard (Redis) TTL expires.
+    Values stored without one are always fresh.
+    """
+
+    def __init__(
+        self,
+        value: Any,
+        stored_at: Optional[float] = None,
+        fresh_until: Optional[float] = None,
+        expires_at: Optional[float] = None,
+        delta: Optional[float] = None,
+        version: Optional[int] = None,
+    ):
+        self.value = value
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+        self.expires_at = expires_at
+        self.delta = delta  # seconds the value took to compute
+        self.version = version  # schema version of the value, if its namespace has one
+
+    @property
+    def stale(self) -> bool:
+        return self.fresh_until is not None and time.time() >= self.fresh_until
+
+    def outdated(self, key: str) -> bool:
+        """Whether the value predates the current schema version of its namespace"""
+        current = schema_version_of(key)
+        return current is not None and (self.version or 0) < current
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        return time.time() - self.stored_at if self.stored_at is not None else None
+
+    def refresh_early(self, beta: float) -> bool:
+        """
+        Probabilistic early expiration (XFetch): the chance of refreshing grows
+        as the soft (or hard) expiry nears, and sooner for values that were
+        slow to compute, so one reader refreshes before everyone misses.
+        """
+        expiry = self.fresh_until or self.expires_at
+        if not self.delta or expiry is None or beta <= 0:
+            return False
+        return time.time() - self.delta * beta * math.log(1.0 - random.random()) >= expiry
+
+    @classmethod
+    def decode(cls, raw: Union[bytes, str]) -> "CacheEntry":
+        data = codec.decode(raw)
+        if isinstance(data, dict) and SWR_MARKER in data:
+            meta = data[SWR_MARKER]
+            return cls(
+                data.get("value"), meta.get("stored_at"), meta.get("fresh_until"),
+                meta.get("expires_at"), meta.get("delta"), meta.get("version")
+            )
+        return cls(data)
+
+    @staticmethod
+    def encode(
+        value: Any, soft_ttl: Optional[int] = None, ttl: Optional[int] = None, delta: Optional[float] = None,
+        version: Optional[int] = None
+    ) -> bytes:
+        if soft_ttl is None and delta is None and version is None:
+            return codec.encode(value)
+        now = time.time()
+        meta = {"stored_at": now}
+        if soft_ttl is not None:
+            meta["fresh_until"] = now + soft_ttl
+        if ttl is not None:
+            meta["expires_at"] = now + ttl
+        if delta is not None:
+            meta["delta"] = round(delta, 3)
+        if version is not None:
+            meta["version"] = version
+        return codec.encode({SWR_MARKER: meta, "value": value})
+
+# Channel on which writers announce keys every process must drop from its L1
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Hash of per-process cache metric snapshots: instance id -> JSON snapshot
+METRICS_KEY = "cache:metrics"
+
+# Channels on which a session's progress events are published, fanned out to
+# WebSockets by app.core.progress
+PROGRESS_CHANNEL_PREFIX = "progress:events:"
+
+def progress_channel(session_id: str) -> str:
+    return f"{PROGRESS_CHANNEL_PREFIX}{session_id}"
+
+class LocalCache:
+    """
+    In-process L1 tier in front of Redis: a size- and TTL-bounded LRU of
+    already-deserialized entries. Values are shared between readers and must
+    be treated as read-only; copy before mutating.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, excluded_prefixes: Sequence[str] = ()):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.excluded_prefixes = tuple(excluded_prefixes)
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def accepts(self, key: str) -> bool:
+        return self.max_entries > 0 and not key.startswith(self.excluded_prefixes)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key: str, entry: CacheEntry):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys: str):
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+class CachePipeline:
+    """
+    Commands queued inside `async with redis_cache.pipeline() as pipe:` and
+    sent to the cache backend in one batch on exit. Replies are in `results`
+    afterwards (left empty if no backend is available).
+    """
+
+    def __init__(self):
+        self.operations: List[Tuple[Any, ...]] = []
+        self.written: List[str] = []
+        self.results: List[Any] = []
+
+    def set(self, key: str, value: Any, ttl: int = None, soft_ttl: int = None):
+        """Queue a JSON value write, like RedisCache.set"""
+        self.set_raw(key, CacheEntry.encode(value, soft_ttl, version=schema_version_of(key)), ttl)
+
+    def set_raw(self, key: str, value: Union[bytes, str], ttl: int = None):
+        """Queue a write of an already-encoded value or a plain string (pointers, markers)"""
+        self.operations.append(("set", key, value, ttl or settings.cache_ttl_seconds))
+        self.written.append(key)
+
+    def expire(self, key: str, ttl: int):
+        """Queue a TTL reset of a key that is kept as is"""
+        self.operations.append(("expire", key, ttl))
+
+    def delete(self, *keys: str):
+        if keys:
+            self.operations.append(("delete", *keys))
+            self.written.extend(keys)
+
+    def ttl(self, key: str):
+        self.operations.append(("ttl", key))
+
+    def size(self, key: str):
+        """Queue a size lookup (MEMORY USAGE on Redis)"""
+        self.operations.append(("size", key))
+
+    def resolve_company(self, company_id: str):
+        """Queue a company lookup by id, slug or session id, like get_cached_company"""
+        self.operations.append(("resolve", f"company:{company_id}", f"company:alias:{company_id}", "company:"))
+
+# Errors meaning Redis itself is unreachable, as opposed to a bad command or payload
+CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError, ConnectionError, OSError, asyncio.TimeoutError)
+
+def _stored_at(raw: Union[bytes, str]) -> float:
+    """When an encoded value was stored; 0 if unknown (raw pointers, legacy values)"""
+    try:
+        return CacheEntry.decode(raw).stored_at or 0.0
+    except Exception:
+        return 0.0
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive connection failures. While it
+    is open every Redis call fails fast, so callers use their in-process
+    fallbacks, and RedisCache reconnects in the background with exponential
+    backoff, closing it again once Redis answers.
+    """
+
+    def __init__(self, failure_threshold: int):
+        self.failure_threshold = failure_threshold
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> bool:
+        """Count a connection failure. Returns True if it opened the circuit."""
+        self.failures += 1
+        if self.is_open or self.failures < self.failure_threshold:
+            return False
+        self.open()
+        return True
+
+    def open(self):
+        if not self.is_open:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "state": "open" if self.is_open else "closed",
+            "consecutive_failures": self.failures,
+            "open_seconds": round(time.monotonic() - self.opened_at, 1) if self.is_open else 0.0,
+            "trips": self.trips,
+        }
+
 class RedisCache:
+    """
+    Redis access for the whole app. `client` decodes replies to str and serves
+    queues, leases and pub/sub; `raw` returns bytes. Cached values (in the
+    binary envelope of app.core.codec), alias pointers and progress lists go
+    through `store`: Redis by default, or an embedded memory / SQLite backend
+    (settings.cache_backend) that needs no network hop.
+
+    Both clients are None while the circuit breaker is open, so every caller
+    takes its no-Redis path without waiting on a dead connection; values then
+    go to the fallback backend (settings.cache_fallback_backend), if any.
+    """
+
     def __init__(self):
-        self.client = None
+        self._client = None
+        self._raw = None
+        self._redis_store: Optional[RedisBackend] = None
+        self.backend: Optional[CacheBackend] = None  # embedded backend replacing Redis for values
+        self.fallback: Optional[CacheBackend] = None  # embedded backend used while Redis is down
+        self.breaker = CircuitBreaker(settings.redis_breaker_failure_threshold)
+        # L1 tier, kept coherent across processes through INVALIDATION_CHANNEL
+        self.local = LocalCache(
+            settings.l1_cache_max_entries if settings.l1_cache_enabled else 0,
+            settings.l1_cache_ttl_seconds,
+            settings.l1_cache_excluded_prefixes,
+        )
+        self.instance_id = uuid.uuid4().hex
+        self.metrics = CacheMetrics()
+        self._listener: Optional[asyncio.Task] = None
+        self._reconnector: Optional[asyncio.Task] = None
+        self._metrics_flusher: Optional[asyncio.Task] = None
+
+    @property
+    def client(self):
+        return None if self.breaker.is_open else self._client
+
+    @property
+    def raw(self):
+        return None if self.breaker.is_open else self._raw
+
+    @property
+    def store(self) -> Optional[CacheBackend]:
+        """Backend holding cached values right now; None if there is none"""
+        if self.backend:
+            return self.backend
+        if self.raw:
+            return self._redis_store
+        return self.fallback
     
     async def connect(self):
-        """Initialize Redis connection"""
+        """
+        Initialize Redis connection. If Redis is unreachable the circuit opens
+        and the connection is retried in the background.
+        """
+        if settings.cache_backend != "redis" and self.backend is None:
+            self.backend = create_backend(settings.cache_backend)
+            logger.info(f"✓ Cached values stored in the {self.backend.name} backend")
+        elif settings.cache_backend == "redis" and settings.cache_fallback_backend and self.fallback is None:
+            self.fallback = create_backend(settings.cache_fallback_backend)
+        pool_options = {
+            "max_connections": settings.redis_max_connections,
+            "socket_timeout": settings.redis_socket_timeout_seconds,
+            "socket_connect_timeout": settings.redis_connect_timeout_seconds,
+            "health_check_interval": settings.redis_health_check_interval_seconds,
+        }
         try:
-            self.client = await redis.from_url(
+            self._client = await redis.from_url(
                 settings.redis_url,
                 encoding="utf-8",
-                decode_responses=True
+                decode_responses=True,
+                **pool_options
             )
+            self._raw = await redis.from_url(settings.redis_url, **pool_options)
+            self._redis_store = RedisBackend(self._raw)
             # Test connection
-            await self.client.ping()
+            await self._client.ping()
+            self.breaker.record_success()
             logger.info("✓ Redis connected successfully")
+            self._start_listener()
         except Exception as e:
             logger.error(f"Redis connection failed: {e}")
-            self.client = None
+            self.breaker.open()
+            self._start_reconnect()
     
     async def close(self):
         """Close Redis connection"""
-        if self.client:
-            await self.client.close()
+        for task in (self._listener, self._reconnector, self._metrics_flusher):
+            if task:
+                task.cancel()
+        self._listener = None
+        self._reconnector = None
+        self._metrics_flusher = None
+        for backend in (self.backend, self.fallback):
+            if backend:
+                await backend.close()
+        self.backend = None
+        self.fallback = None
+        if self._raw:
+            await self._raw.close()
+        if self._client:
+            await self._client.close()
             logger.info("Redis connection closed")
+
+    def _start_listener(self):
+        if self.local.max_entries and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.create_task(self._listen_for_invalidations())
+        if self._metrics_flusher is None or self._metrics_flusher.done():
+            self._metrics_flusher = asyncio.create_task(self._flush_metrics_periodically())
+
+    async def _flush_metrics_periodically(self):
+        while True:
+            await asyncio.sleep(settings.cache_metrics_flush_seconds)
+            await self.flush_metrics()
+
+    async def flush_metrics(self):
+        """Publish this process's metric snapshot so other processes (and the CLI) can aggregate it"""
+        if not self.client or not self.metrics.namespaces:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hset(METRICS_KEY, self.instance_id, json.dumps(self.metrics.snapshot()))
+            pipe.expire(METRICS_KEY, settings.cache_metrics_retention_seconds)
+            await pipe.execute()
+        except Exception as e:
+            self._failed("metrics flush", e)
+
+    async def namespace_metrics(self, include_local: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-namespace hit rates, latency and size percentiles across every
+        process that flushed recently. Falls back to this process alone.
+        """
+        if include_local:
+            await self.flush_metrics()
+        if not self.client:
+            return merge_snapshots([self.metrics.snapshot()]) if include_local else {}
+        try:
+            snapshots = await self.client.hgetall(METRICS_KEY)
+        except Exception as e:
+            self._failed("metrics read", e)
+            return merge_snapshots([self.metrics.snapshot()]) if include_local else {}
+
+        cutoff = time.time() - settings.cache_metrics_retention_seconds
+        live, expired = [], []
+        for instance_id, raw in snapshots.items():
+            snapshot = json.loads(raw)
+            if snapshot.get("updated_at", 0) >= cutoff:
+                live.append(snapshot)
+            else:
+                expired.append(instance_id)
+        if expired:
+            try:
+                await self.client.hdel(METRICS_KEY, *expired)
+            except Exception:
+                pass
+        return merge_snapshots(live)
+
+    def _start_reconnect(self):
+        if self._reconnector is None or self._reconnector.done():
+            self._reconnector = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        """Ping Redis with exponential backoff (and jitter) until it answers, then close the circuit"""
+        delay = settings.redis_reconnect_backoff_base_seconds
+        while self.breaker.is_open:
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            try:
+                await self._client.ping()
+                await self._raw.ping()
+            except Exception as e:
+                delay = min(delay * 2, settings.redis_reconnect_backoff_max_seconds)
+                logger.warning(f"Redis still unreachable, next attempt in ~{delay:.1f}s: {e}")
+                continue
+            self.breaker.record_success()
+            logger.info("✓ Redis reachable again, circuit closed")
+            if self.fallback:
+                await self._write_back_fallback()
+            self._start_listener()
+
+    async def _write_back_fallback(self):
+        """
+        Copy what was cached in the fallback during the outage to Redis, with
+        its remaining TTL, so results computed meanwhile are not lost, and
+        drop each copied key from the fallback. A Redis value known to be
+        stored later (by a process that could still reach Redis) is kept.
+        Writes landing in the fallback while this runs (the circuit is still
+        open) are not dropped: a key rewritten since it was copied stays for
+        the next reconnect, as does the rest if Redis fails again midway.
+        """
+        fallback, target = self.fallback, self._redis_store
+        written = 0
+        try:
+            async for key in fallback.scan():
+                ttl = await fallback.ttl(key)
+                if ttl <= 0:
+                    continue
+                value = await fallback.get(key)
+                if value is None:
+                    # A list (progress sections): kept if Redis started its own
+                    items = await fallback.range(key)
+                    if not await target.range(key):
+                        for item in items:
+                            await target.push(key, item, ttl)
+                        written += 1
+                    if await fallback.range(key) == items:
+                        await fallback.delete(key)
+                    continue
+                current = await target.get(key)
+                if current is None or _stored_at(current) <= _stored_at(value):
+                    await target.set(key, value, ttl)
+                    written += 1
+                if await fallback.get(key) == value:
+                    await fallback.delete(key)
+        except Exception as e:
+            self._failed("fallback write-back", e)
+            return
+        if written:
+            logger.info(f"✓ Wrote {written} values cached during the outage back to Redis")
+
+    def _failed(self, operation: str, error: Exception):
+        """Log a failed call. Connection failures count towards opening the circuit."""
+        if not isinstance(error, CONNECTION_ERRORS):
+            logger.error(f"Redis {operation} error: {error}")
+            return
+        logger.warning(f"Redis {operation} connection error: {error}")
+        if self.breaker.record_failure():
+            logger.error(f"🔌 Redis circuit open after {self.breaker.failures} connection failures, failing fast")
+            self._start_reconnect()
+
+    def _store_succeeded(self, store: CacheBackend):
+        if store is self._redis_store:
+            self.breaker.record_success()
+
+    def _store_failed(self, store: CacheBackend, operation: str, error: Exception):
+        """Like _failed, but only Redis errors count towards the circuit breaker"""
+        if store is self._redis_store:
+            self._failed(operation, error)
+        else:
+            logger.error(f"{store.name} cache {operation} error: {error}")
+
+    async def _listen_for_invalidations(self):
+        """Drop keys other processes announce as changed. Runs for the life of the connection."""
+        while True:
+            client = self.client
+            if not client:
+                await asyncio.sleep(1)
+                continue
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Invalidations may have been missed while not subscribed
+                self.local.clear()
+                while self.client:
+                    # Bounded wait, so an idle channel never trips the socket timeout
+                    message = await pubsub.get_message(timeout=1.0)
+                    if not message or message.get("type") != "message":
+                        continue
+                    data = json.loads(message["data"])
+                    if data.get("origin") != self.instance_id:
+                        self.local.invalidate(*data.get("keys", []))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed("invalidation listener", e)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    async def invalidate(self, *keys: str):
+        """Drop keys from this process's L1 and tell every other process to do the same"""
+        keys = [key for key in keys if self.local.accepts(key)]
+        if not keys:
+            return
+        self.local.invalidate(*keys)
+        if not self.client:
+            return
+        try:
+            await self.client.publish(
+                INVALIDATION_CHANNEL, json.dumps({"origin": self.instance_id, "keys": keys})
+            )
+        except Exception as e:
+            self._failed("invalidation publish", e)
+
+    async def publish(self, channel: str, message: dict):
+        """Publish a JSON message; dropped while Redis is unavailable"""
+        if not self.client:
+            return
+        try:
+            await self.client.publish(channel, json.dumps(message, default=str))
+        except Exception as e:
+            self._failed("publish", e)
     
     async def get(self, key: str) -> Optional[Any]:
-        """Get value from cache with retry on connection error"""
-        if not self.client:
+        """Get value from cache; None on a miss or while no backend is available"""
+        entry = await self.get_entry(key)
+        return entry.value if entry else None
+
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Get value and freshness from the L1 tier, then the backend"""
+        store = self.store
+        if not store:
             return None
+        cacheable = self.local.accepts(key)
+        if cacheable:
+            entry = self.local.get(key)
+            if entry is not None:
+                self.metrics.lookup(key, True, l1=True)
+                return entry
         try:
-            value = await self.client.get(key)
+            started = time.perf_counter()
+            value = await store.get(key)
+            self._store_succeeded(store)
+            self.metrics.lookup(
+                key, bool(value), (time.perf_counter() - started) * 1000, len(value) if value else None
+            )
             if value:
-                return json.loads(value)
-            return None
-        except (redis.ConnectionError, ConnectionResetError) as e:
-            logger.warning(f"Redis connection error, reconnecting: {e}")
-            try:
-                await self.connect()  # Reconnect
-                value = await self.client.get(key)
-                if value:
-                    return json.loads(value)
-            except Exception as retry_error:
-                logger.error(f"Redis retry failed: {retry_error}")
+                entry = CacheEntry.decode(value)
+                if cacheable:
+                    self.local.put(key, entry)
+                return entry
             return None
         except Exception as e:
-            logger.error(f"Redis get error: {e}")
+            self.metrics.error(key)
+            self._store_failed(store, "get", e)
             return None
     
-    async def set(self, key: str, value: Any, ttl: int = None):
-        """Set value in cache with retry on connection error"""
-        if not self.client:
+    async def set(self, key: str, value: Any, ttl: int = None, soft_ttl: int = None, delta: float = None):
+        """
+        Set value in cache; dropped while no backend is available.
+        With `soft_ttl`, the value turns stale after soft_ttl seconds and is
+        still served until the hard `ttl` expires (stale-while-revalidate).
+        `delta` is the time the value took to compute, used for early refresh.
+        """
+        store = self.store
+        if not store:
             return
         try:
             ttl = ttl or settings.cache_ttl_seconds
-            await self.client.setex(
-                key,
-                ttl,
-                json.dumps(value, default=str)
-            )
-        except (redis.ConnectionError, ConnectionResetError) as e:
-            logger.warning(f"Redis connection error, reconnecting: {e}")
-            try:
-                await self.connect()  # Reconnect
-                ttl = ttl or settings.cache_ttl_seconds
-                await self.client.setex(
-                    key,
-                    ttl,
-                    json.dumps(value, default=str)
-                )
-            except Exception as retry_error:
-                logger.error(f"Redis retry failed: {retry_error}")
-        except Exception as e:
-            logger.error(f"Redis set error: {e}")
+            encoded = CacheEntry.encode(value, soft_ttl, ttl, delta, schema_version_of(key))
+            started = time.perf_counter()
+            await store.set(key, encoded, ttl)
+            self._store_succeeded(store)
+            self.metrics.write(key, (time.perf_counter() - started) * 1000, len(encoded))
+            await self.invalidate(key)
+        except Exception as e:
+            self._store_failed(store, "set", e)
     
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Get several values in one round trip (MGET). Missing keys are left out."""
+        store = self.store
+        if not store:
+            return {}
+        found: Dict[str, Any] = {}
+        remote = []
+        for key in keys:
+            entry = self.local.get(key) if self.local.accepts(key) else None
+            if entry is not None:
+                self.metrics.lookup(key, True, l1=True)
+                found[key] = entry.value
+            else:
+                remote.append(key)
+        if not remote:
+            return found
+        try:
+            started = time.perf_counter()
+            values = await store.mget(remote)
+            latency_ms = (time.perf_counter() - started) * 1000
+            for index, (key, value) in enumerate(zip(remote, values)):
+                # One round trip for the whole batch, attributed to its first key
+                self.metrics.lookup(key, bool(value), latency_ms if index == 0 else None,
+                                    len(value) if value else None)
+                if value:
+                    entry = CacheEntry.decode(value)
+                    if self.local.accepts(key):
+                        self.local.put(key, entry)
+                    found[key] = entry.value
+            self._store_succeeded(store)
+        except Exception as e:
+            self._store_failed(store, "get_many", e)
+        return found
+
+    async def set_many(self, items: Dict[str, Any], ttl: int = None, soft_ttl: int = None):
+        """Set several values with the same TTLs in one round trip"""
+        async with self.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, value, ttl=ttl, soft_ttl=soft_ttl)
+
+    async def delete_many(self, keys: Sequence[str]):
+        """Delete several keys in one round trip"""
+        store = self.store
+        if not store or not keys:
+            return
+        try:
+            await store.delete(*keys)
+            self._store_succeeded(store)
+            await self.invalidate(*keys)
+        except Exception as e:
+            self._store_failed(store, "delete_many", e)
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True) -> AsyncIterator[CachePipeline]:
+        """
+        Queue commands and send them in one round trip on exit, atomically
+        (MULTI/EXEC, or one SQLite transaction) when `transaction`. Nothing is
+        sent if the block raises. Written keys are invalidated in the L1 tier
+        of every process. Errors are logged, like every other cache call.
+        """
+        pipe = CachePipeline()
+        yield pipe
+        store = self.store
+        if not store or not pipe.operations:
+            return
+        try:
+            pipe.results = await store.execute(pipe.operations, transaction)
+            self._store_succeeded(store)
+        except Exception as e:
+            self._store_failed(store, "pipeline", e)
+            return
+        await self.invalidate(*pipe.written)
+
+    async def push(self, key: str, value: Any, ttl: int = None):
+        """Append value to a list and refresh the list's TTL"""
+        store = self.store
+        if not store:
+            return
+        try:
+            await store.push(key, json.dumps(value, default=str), ttl or settings.cache_ttl_seconds)
+            self._store_succeeded(store)
+        except Exception as e:
+            self._store_failed(store, "push", e)
+
+    async def range(self, key: str, start: int = 0) -> list:
+        """Get list items from index `start` to the end"""
+        store = self.store
+        if not store:
+            return []
+        try:
+            items = await store.range(key, start)
+            self._store_succeeded(store)
+            return [json.loads(item) for item in items]
+        except Exception as e:
+            self._store_failed(store, "range", e)
+            return []
+
     async def delete(self, key: str):
         """Delete key from cache"""
-        if not self.client:
+        store = self.store
+        if not store:
             return
         try:
-            await self.client.delete(key)
+            await store.delete(key)
+            self._store_succeeded(store)
+            await self.invalidate(key)
         except Exception as e:
-            logger.error(f"Redis delete error: {e}")
+            self._store_failed(store, "delete", e)
 
 # Global instance
 redis_cache = RedisCache()
@@ -100,22 +756,263 @@ async def close_redis():
     """Close Redis connection"""
     await redis_cache.close()
 
-async def get_cached_company(company_id: str) -> Optional[dict]:
-    """Get cached company data"""
-    return await redis_cache.get(f"company:{company_id}")
+# key -> fill running in this process, so local callers share one computation
+_fills: Dict[str, asyncio.Task] = {}
+
+# Strong references to early refreshes running in the background
+_background_fills: Set[asyncio.Task] = set()
+
+async def read_through(
+    key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    ttl: int,
+    soft_ttl: Optional[int] = None,
+    on_stale: Optional[Callable[[], Awaitable[Any]]] = None,
+    cacheable: Optional[Callable[[Any], bool]] = None,
+    force_refresh: bool = False,
+) -> Any:
+    """
+    Cache-aside read with stampede protection.
+
+    On a miss only one caller cluster-wide runs `fetch`: callers in this
+    process share its task, other processes wait for its Redis lease and then
+    read the value it stored. Stale values (past `soft_ttl`) and values picked
+    for XFetch early refresh are served as-is while `on_stale` schedules a
+    refresh; without `on_stale` the refresh runs in a background task.
+    Values stamped with an older schema version are served as-is too and
+    left to the background migrator (app.core.migrations).
+
+    Results rejected by `cacheable` are returned but not stored. With
+    `force_refresh` the cached value is ignored and recomputed.
+    """
+    if not force_refresh:
+        entry = await redis_cache.get_entry(key)
+        if entry:
+            if entry.stale or entry.refresh_early(settings.xfetch_beta):
+                logger.info(f"✓ Cache HIT ({'stale' if entry.stale else 'early refresh'}) for {key}")
+                if on_stale:
+                    await on_stale()
+                elif key not in _fills:
+                    task = _start_fill(key, fetch, ttl, soft_ttl, cacheable, force_refresh=True)
+                    _background_fills.add(task)
+                    task.add_done_callback(_finish_background_fill)
+            if entry.outdated(key):
+                from app.core.migrations import flag_outdated
+                await flag_outdated(key)
+            return entry.value
+
+    task = _fills.get(key) or _start_fill(key, fetch, ttl, soft_ttl, cacheable, force_refresh)
+    return await asyncio.shield(task)
+
+def _start_fill(key, fetch, ttl, soft_ttl, cacheable, force_refresh) -> asyncio.Task:
+    task = asyncio.create_task(_fill(key, fetch, ttl, soft_ttl, cacheable, force_refresh))
+    _fills[key] = task
+    task.add_done_callback(lambda done: _fills.pop(key, None) if _fills.get(key) is done else None)
+    return task
+
+def _finish_background_fill(task: asyncio.Task):
+    _background_fills.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.warning(f"Background cache refresh failed: {task.exception()}")
+
+async def _fill(key, fetch, ttl, soft_ttl, cacheable, force_refresh) -> Any:
+    """Compute and store `key` while holding its lease, or wait for the process that holds it"""
+    client = redis_cache.client
+    if not client:
+        return await _compute(key, fetch, ttl, soft_ttl, cacheable)
 
-async def cache_company(company_id: str, data: dict):
-    """Cache company data"""
-    await redis_cache.set(f"company:{company_id}", data)
+    lease_key = f"lease:{key}"
+    token = uuid.uuid4().hex
+    lease_ms = settings.read_through_lease_seconds * 1000
+    started = time.time()
+    while True:
+        try:
+            if await client.set(lease_key, token, nx=True, px=lease_ms):
+                break
+        except Exception as e:
+            redis_cache._failed("lease", e)
+            return await _compute(key, fetch, ttl, soft_ttl, cacheable)
+
+        # Another process is computing the value: use its result once it is done.
+        # If it failed (or its result was not cacheable), retry for the lease.
+        await _wait_for_release(client, lease_key)
+        entry = await redis_cache.get_entry(key)
+        if entry and (not force_refresh or (entry.stored_at or 0) >= started):
+            return entry.value
+
+    renew = asyncio.create_task(_renew_lease(client, lease_key, token, lease_ms))
+    try:
+        return await _compute(key, fetch, ttl, soft_ttl, cacheable)
+    finally:
+        renew.cancel()
+        try:
+            await client.eval(_LEASE_RELEASE_SCRIPT, 1, lease_key, token)
+        except Exception as e:
+            logger.warning(f"Could not release lease on {key}: {e}")
+
+async def _compute(key, fetch, ttl, soft_ttl, cacheable) -> Any:
+    started = time.monotonic()
+    value = await fetch()
+    if cacheable is None or cacheable(value):
+        await redis_cache.set(key, value, ttl=ttl, soft_ttl=soft_ttl, delta=time.monotonic() - started)
+    return value
+
+async def _wait_for_release(client, lease_key: str):
+    """Poll until the lease is released or expires (its holder died), backing off to 1s"""
+    interval = 0.05
+    while True:
+        try:
+            if not await client.exists(lease_key):
+                return
+        except Exception:
+            return
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, 1.0)
+
+async def _renew_lease(client, lease_key: str, token: str, lease_ms: int):
+    """Keep the lease while a slow fetch (e.g. a Yutori browse) is still running"""
+    while True:
+        await asyncio.sleep(lease_ms / 3000)
+        try:
+            await client.eval(_LEASE_RENEW_SCRIPT, 1, lease_key, token, lease_ms)
+        except Exception as e:
+            logger.warning(f"Could not renew {lease_key}: {e}")
+
+# Sections of a company record's `data`. Each is stored under its own
+# `company:{id}:{section}` key; `company:{id}` holds the rest of the record
+# (the head: status, section lists and timestamps, metadata).
+COMPANY_SECTIONS = (
+    "overview", "products_apis", "market_intelligence", "financials", "team_culture", "news_sentiment"
+)
+
+def _section_key(company_id: str, section: str) -> str:
+    return f"company:{company_id}:{section}"
+
+def _is_company_head(value: Any) -> bool:
+    """Record heads carry an id and a status; a section key (`<id>:<section>` looked up as an id) does not"""
+    return isinstance(value, dict) and "id" in value and "status" in value
+
+async def get_cached_company(company_id: str, sections: Optional[Sequence[str]] = None) -> Optional[dict]:
+    """
+    Get cached company data by id, slug or session id. With `sections`, `data`
+    holds only those sections (an empty list reads just the head). Whole
+    records cached before sections were stored separately come back as they
+    are, `data` included.
+    """
+    head = await _get_company_head(company_id)
+    if head is None or "data" in head:
+        return head
+
+    wanted = COMPANY_SECTIONS if sections is None else sections
+    if not wanted:
+        return head
+    keys = {name: _section_key(head["id"], name) for name in wanted}
+    values = await redis_cache.get_many(list(keys.values()))
+    return {**head, "data": {name: values[key] for name, key in keys.items() if key in values}}
+
+async def _get_company_head(company_id: str) -> Optional[dict]:
+    store = redis_cache.store
+    if not store:
+        return None
+
+    # L1 keeps alias -> id and id -> record apart, so rewriting the record
+    # invalidates it for every alias at once
+    local = redis_cache.local
+    alias_key = f"company:alias:{company_id}"
+    target = local.get(alias_key) if local.accepts(alias_key) else None
+    record_key = f"company:{target.value if target else company_id}"
+    if local.accepts(record_key):
+        entry = local.get(record_key)
+        if entry is not None:
+            redis_cache.metrics.lookup(record_key, True, l1=True)
+            return entry.value if _is_company_head(entry.value) else None
+
+    try:
+        started = time.perf_counter()
+        value = await store.resolve(f"company:{company_id}", alias_key, "company:")
+        redis_cache.metrics.lookup(
+            f"company:{company_id}", bool(value), (time.perf_counter() - started) * 1000,
+            len(value) if value else None
+        )
+        if not value:
+            return None
+        entry = CacheEntry.decode(value)
+        if not _is_company_head(entry.value):
+            return None
+        record_id = entry.value["id"]
+        if local.accepts(f"company:{record_id}"):
+            local.put(f"company:{record_id}", entry)
+            if record_id != company_id and local.accepts(alias_key):
+                local.put(alias_key, CacheEntry(record_id))
+        return entry.value
+    except Exception as e:
+        redis_cache.metrics.error(f"company:{company_id}")
+        redis_cache._store_failed(store, "company lookup", e)
+        return None
+
+async def get_cached_companies(company_ids: Sequence[str]) -> List[Optional[dict]]:
+    """Resolve several ids, slugs or session ids to their record heads (no `data`) in one round trip"""
+    async with redis_cache.pipeline(transaction=False) as pipe:
+        for company_id in company_ids:
+            pipe.resolve_company(company_id)
+    if len(pipe.results) != len(company_ids):
+        return [None] * len(company_ids)
+    heads = [CacheEntry.decode(value).value if value else None for value in pipe.results]
+    return [head if _is_company_head(head) else None for head in heads]
+
+async def cache_company(company_id: str, data: dict, aliases: Sequence[str] = ()):
+    """
+    Cache the canonical company record and point `aliases` (slug, session ids)
+    at it, atomically and in one round trip. Section freshness is tracked in
+    the record itself.
+    """
+    head = {key: value for key, value in data.items() if key != "data"}
+    await cache_company_sections(company_id, head, data.get("data", {}), aliases)
+
+async def cache_company_sections(
+    company_id: str, head: dict, sections: Dict[str, Any], aliases: Sequence[str] = ()
+):
+    """
+    Write a record head and only the given sections, atomically. Sections
+    left out keep their value; their TTL is extended along with the head's.
+    """
+    ttl = settings.company_cache_ttl_seconds
+    async with redis_cache.pipeline() as pipe:
+        pipe.set(f"company:{company_id}", head, ttl=ttl)
+        for section in COMPANY_SECTIONS:
+            if section in sections:
+                pipe.set(_section_key(company_id, section), sections[section], ttl=ttl)
+            else:
+                pipe.expire(_section_key(company_id, section), ttl)
+        for alias in aliases:
+            if alias and alias != company_id:
+                pipe.set_raw(f"company:alias:{alias}", company_id, ttl=ttl)
+
+async def alias_company(company_id: str, *aliases: str):
+    """Point alias keys at a canonical company record"""
+    async with redis_cache.pipeline(transaction=False) as pipe:
+        for alias in aliases:
+            if alias and alias != company_id:
+                pipe.set_raw(f"company:alias:{alias}", company_id, ttl=settings.company_cache_ttl_seconds)
 
 async def get_progress_updates(session_id: str) -> Optional[dict]:
     """Get progress updates for a session"""
     return await redis_cache.get(f"progress:{session_id}")
 
 async def update_progress(session_id: str, progress_data: dict):
-    """Update progress for a session"""
+    """Update progress for a session and push it to the session's subscribers"""
     await redis_cache.set(f"progress:{session_id}", progress_data, ttl=300)  # 5 min TTL
+    await redis_cache.publish(progress_channel(session_id), {"event": "progress", "data": progress_data})
+
+async def push_section_update(session_id: str, section_data: dict):
+    """Queue a finished result section for a session's progress stream and notify its subscribers"""
+    await redis_cache.push(f"progress:{session_id}:sections", section_data, ttl=300)  # 5 min TTL
+    await redis_cache.publish(progress_channel(session_id), {"event": "section"})
+
+async def get_section_updates(session_id: str, start: int = 0) -> list:
+    """Get the section updates of a session from index `start` on"""
+    return await redis_cache.range(f"progress:{session_id}:sections", start)
 
 async def delete_progress(session_id: str):
     """Delete progress data"""
-    await redis_cache.delete(f"progress:{session_id}")
+    await redis_cache.delete_many([f"progress:{session_id}", f"progress:{session_id}:sections"])
@@ -0,0 +1,70 @@
+from app.config import settings
+from typing import Any, Union
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder, same wire format
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # entries are then written uncompressed
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Envelope: MAGIC, version byte, flags byte, payload. The payload is UTF-8
+# JSON (optionally zstd-compressed). Legacy entries are bare JSON text, which
+# can never start with a NUL byte, so both formats are told apart by the prefix.
+MAGIC = b"\x00CI"
+VERSION = 1
+FLAG_ZSTD = 0x01
+HEADER_SIZE = len(MAGIC) + 2
+
+_compressor = zstandard.ZstdCompressor(level=settings.cache_compression_level) if zstandard else None
+_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def dumps(value: Any) -> bytes:
+    """JSON-encode `value` to bytes, with orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str).encode()
+
+
+def loads(payload: Union[bytes, str]) -> Any:
+    return orjson.loads(payload) if orjson else json.loads(payload)
+
+
+def encode(value: Any) -> bytes:
+    """Serialize `value` into a versioned envelope, compressing large payloads"""
+    payload = dumps(value)
+    flags = 0
+    if (
+        _compressor
+        and settings.cache_compression_enabled
+        and len(payload) >= settings.cache_compression_min_bytes
+    ):
+        payload = _compressor.compress(payload)
+        flags |= FLAG_ZSTD
+    return MAGIC + bytes((VERSION, flags)) + payload
+
+
+def decode(raw: Union[bytes, str]) -> Any:
+    """Deserialize an envelope, or a legacy plain-JSON entry"""
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if not raw.startswith(MAGIC):
+        return loads(raw)
+
+    version, flags = raw[len(MAGIC)], raw[len(MAGIC) + 1]
+    if version != VERSION:
+        raise ValueError(f"Unsupported cache envelope version {version}")
+    payload = raw[HEADER_SIZE:]
+    if flags & FLAG_ZSTD:
+        if not _decompressor:
+            raise ValueError("Cache entry is zstd-compressed but zstandard is not installed")
+        payload = _decompressor.decompress(payload)
+    return loads(payload)
@@ -0,0 +1,99 @@
+from app.config import settings
+from app.core.cache import redis_cache
+from typing import List, Optional, Sequence
+import logging
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Learned alias index: normalized name or slug -> canonical company key, and
+# website domain -> canonical company key
+ALIAS_PREFIX = "entity:alias:"
+DOMAIN_PREFIX = "entity:domain:"
+
+# Trailing legal-form tokens that do not distinguish companies
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "companies",
+    "llc", "llp", "lp", "ltd", "limited", "plc", "gmbh", "ag", "sa", "sas",
+    "bv", "nv", "ab", "oy", "spa", "srl", "pte", "pty", "kk", "holdings",
+    "group",
+}
+
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_company_name(name: str) -> str:
+    """
+    Lowercase ASCII words of a company name without punctuation, a leading
+    "the" or trailing legal suffixes: "The OpenAI, Inc." -> "openai". Names
+    with no Latin letters or digits (e.g. "小米") keep their casefolded
+    Unicode words instead, so they do not all normalize to "".
+    """
+    name = (name or "").replace("'", "")
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    tokens = _NON_ALPHANUMERIC.sub(" ", text).split()
+    if not tokens:
+        tokens = _NON_WORD.sub(" ", unicodedata.normalize("NFKC", name).casefold()).split()
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def company_key(name: str) -> str:
+    """
+    Cache key form of a company name: its normalized words run together, so
+    "Open AI", "openai inc." and "OpenAI, Inc." share one key. Already
+    canonical keys map to themselves.
+    """
+    return normalize_company_name(name).replace(" ", "")
+
+
+def normalize_domain(website: str) -> str:
+    """Bare lowercase host of a URL or domain: "https://www.OpenAI.com/about" -> "openai.com" """
+    host = (website or "").strip().lower()
+    host = host.split("://", 1)[-1].split("/", 1)[0].split("?", 1)[0].split(":", 1)[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+async def resolve_company_key(name: str) -> str:
+    """Canonical key of a company name, following the learned alias index"""
+    key = company_key(name)
+    if not key:
+        return key
+    canonical = await redis_cache.get(f"{ALIAS_PREFIX}{key}")
+    return canonical or key
+
+
+async def resolve_company_keys(names: Sequence[str]) -> List[str]:
+    """Canonical keys of several company names, looked up in one round trip"""
+    keys = [company_key(name) for name in names]
+    aliases = await redis_cache.get_many([f"{ALIAS_PREFIX}{key}" for key in set(keys) if key])
+    return [aliases.get(f"{ALIAS_PREFIX}{key}", key) if key else key for key in keys]
+
+
+async def learn_company_aliases(canonical: str, *names: str, website: Optional[str] = None) -> str:
+    """
+    Record names and slugs resolved to `canonical` in the alias index. If the
+    website's domain already belongs to another company key, that key stays
+    canonical and `canonical` becomes one of its aliases. Returns the
+    canonical key future lookups resolve to.
+    """
+    domain = normalize_domain(website) if website else ""
+    if domain:
+        owner = await redis_cache.get(f"{DOMAIN_PREFIX}{domain}")
+        if owner and owner != canonical:
+            logger.info(f"🔗 {canonical} resolves to {owner} (shared domain {domain})")
+            names, canonical = (*names, canonical), owner
+
+    aliases = {company_key(name) for name in names} - {"", canonical}
+    ttl = settings.entity_alias_ttl_seconds
+    async with redis_cache.pipeline(transaction=False) as pipe:
+        if domain:
+            pipe.set(f"{DOMAIN_PREFIX}{domain}", canonical, ttl=ttl)
+        for alias in aliases:
+            pipe.set(f"{ALIAS_PREFIX}{alias}", canonical, ttl=ttl)
+    return canonical
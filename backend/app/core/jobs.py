@@ -0,0 +1,309 @@
+from app.core.cache import redis_cache
+from app.config import settings
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# job type -> handler, filled by register_job_handler
+_handlers: Dict[str, JobHandler] = {}
+
+# Strong references to jobs run in-process while Redis is unavailable
+_local_jobs: Set[asyncio.Task] = set()
+
+# refresh key -> lock expiry (monotonic), used while Redis is unavailable
+_local_refresh_locks: Dict[str, float] = {}
+
+
+def register_job_handler(job_type: str):
+    """Decorator registering the coroutine that runs jobs of `job_type`"""
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[job_type] = handler
+        return handler
+    return decorator
+
+
+async def _run_handler(job_type: str, payload: Dict[str, Any]):
+    handler = _handlers.get(job_type)
+    if not handler:
+        raise ValueError(f"No handler registered for job type '{job_type}'")
+    await handler(payload)
+
+
+class JobQueue:
+    """
+    Durable job queue on a Redis Stream with a consumer group.
+
+    Jobs survive API restarts and are shared by every worker process reading
+    the group. A job is acknowledged only after its handler succeeds; jobs whose
+    worker crashed or failed are reclaimed by another worker once they have been
+    idle longer than the visibility timeout, and moved to `<stream>:dead` after
+    `job_max_deliveries` attempts. Running jobs keep their claim fresh, so slow
+    Yutori work is not handed out twice. Acked jobs are deleted from the
+    stream and the dead-letter stream is capped at `job_dead_letter_maxlen`
+    entries, so streams hold only outstanding work.
+    """
+
+    def __init__(self, stream: str, concurrency: int, group: str = "workers"):
+        self.stream = stream
+        self.concurrency = concurrency
+        self.group = group
+        self.dead_letter_stream = f"{stream}:dead"
+        self._local_slots = asyncio.Semaphore(concurrency)
+        self._local_running = 0
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any]) -> Optional[str]:
+        """Add a job to the stream. Without Redis the job runs in this process instead."""
+        client = redis_cache.client
+        if client:
+            try:
+                job_id = await client.xadd(self.stream, {
+                    "type": job_type,
+                    "payload": json.dumps(payload, default=str),
+                    "enqueued_at": datetime.utcnow().isoformat(),
+                })
+                logger.info(f"Enqueued {job_type} job {job_id} on {self.stream}")
+                return job_id
+            except Exception as e:
+                logger.warning(f"Could not enqueue {job_type} job on {self.stream}, running in-process: {e}")
+
+        task = asyncio.create_task(self._run_local(job_type, payload))
+        _local_jobs.add(task)
+        task.add_done_callback(_local_jobs.discard)
+        return None
+
+    async def enqueue_many(self, job_type: str, payloads: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Add several jobs to the stream in one round trip. Without Redis they run in this process instead."""
+        if not payloads:
+            return []
+        client = redis_cache.client
+        if client:
+            try:
+                enqueued_at = datetime.utcnow().isoformat()
+                pipe = client.pipeline(transaction=False)
+                for payload in payloads:
+                    pipe.xadd(self.stream, {
+                        "type": job_type,
+                        "payload": json.dumps(payload, default=str),
+                        "enqueued_at": enqueued_at,
+                    })
+                job_ids = await pipe.execute()
+                logger.info(f"Enqueued {len(job_ids)} {job_type} jobs on {self.stream}")
+                return job_ids
+            except Exception as e:
+                logger.warning(f"Could not enqueue {job_type} jobs on {self.stream}, running in-process: {e}")
+
+        for payload in payloads:
+            task = asyncio.create_task(self._run_local(job_type, payload))
+            _local_jobs.add(task)
+            task.add_done_callback(_local_jobs.discard)
+        return [None] * len(payloads)
+
+    async def _run_local(self, job_type: str, payload: Dict[str, Any]):
+        async with self._local_slots:
+            self._local_running += 1
+            try:
+                await _run_handler(job_type, payload)
+            except Exception as e:
+                logger.error(f"In-process {job_type} job failed: {e}", exc_info=True)
+            finally:
+                self._local_running -= 1
+
+    async def metrics(self) -> Dict[str, Any]:
+        """
+        Queue depth: jobs not yet delivered to a worker (`waiting`, the group's
+        lag) plus jobs delivered but not yet acked (`pending`)
+        """
+        client = redis_cache.client
+        if not client:
+            return {"stream": self.stream, "waiting": 0, "pending": 0, "depth": 0, "local_running": self._local_running}
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.xinfo_groups(self.stream)
+            pipe.xlen(self.stream)
+            groups, length = await pipe.execute()
+            group = next((g for g in groups if g.get("name") == self.group), {})
+            pending = group.get("pending", 0)
+            # Redis < 7 has no lag, and it can be unknown after deletions; acked
+            # jobs are deleted, so the stream then holds exactly waiting + pending
+            lag = group.get("lag")
+            waiting = lag if lag is not None else max(length - pending, 0)
+            return {"stream": self.stream, "waiting": waiting, "pending": pending, "depth": waiting + pending}
+        except Exception as e:
+            logger.warning(f"Could not read metrics for {self.stream}: {e}")
+            return {"stream": self.stream, "waiting": 0, "pending": 0, "depth": 0}
+
+    async def consume(self, stop: asyncio.Event, consumer: str = ""):
+        """Process jobs with up to `concurrency` running at once until `stop` is set"""
+        concurrency = self.concurrency
+        consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        visibility_ms = settings.job_visibility_timeout_seconds * 1000
+        running: Set[asyncio.Task] = set()
+        group_ready = False
+
+        logger.info(f"Worker {consumer} consuming {self.stream} (concurrency: {concurrency})")
+        while not stop.is_set():
+            client = redis_cache.client
+            if not client:
+                await asyncio.sleep(5)
+                continue
+
+            try:
+                if not group_ready:
+                    await self._ensure_group(client)
+                    group_ready = True
+
+                free = concurrency - len(running)
+                if free <= 0:
+                    await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                # Reclaim jobs whose worker died or failed before acking
+                claimed = await client.xautoclaim(
+                    self.stream, self.group, consumer, min_idle_time=visibility_ms, count=free
+                )
+                messages = list(claimed[1]) if claimed else []
+
+                if not messages:
+                    response = await client.xreadgroup(
+                        self.group, consumer, {self.stream: ">"}, count=free, block=2000
+                    )
+                    for _, stream_messages in response or []:
+                        messages.extend(stream_messages)
+
+                for message_id, fields in messages:
+                    if not fields:  # deleted from the stream while pending
+                        await self._ack(client, message_id)
+                        continue
+                    task = asyncio.create_task(self._process(client, consumer, message_id, fields))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Worker loop error on {self.stream}: {e}")
+                group_ready = False
+                await asyncio.sleep(2)
+
+        # Let running jobs finish; anything cut short is reclaimed by another worker
+        if running:
+            await asyncio.wait(running, timeout=settings.job_visibility_timeout_seconds)
+        logger.info(f"Worker {consumer} stopped consuming {self.stream}")
+
+    async def _ensure_group(self, client):
+        try:
+            await client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _process(self, client, consumer: str, message_id: str, fields: Dict[str, str]):
+        job_type = fields.get("type", "")
+
+        deliveries = await self._delivery_count(client, message_id)
+        if deliveries > settings.job_max_deliveries:
+            logger.error(f"Job {message_id} ({job_type}) failed {deliveries - 1} times, dead-lettering")
+            await client.xadd(
+                self.dead_letter_stream, {**fields, "failed_at": datetime.utcnow().isoformat()},
+                maxlen=settings.job_dead_letter_maxlen, approximate=True
+            )
+            await self._ack(client, message_id)
+            return
+
+        keepalive = asyncio.create_task(self._keep_claimed(client, consumer, message_id))
+        started = time.monotonic()
+        try:
+            await _run_handler(job_type, json.loads(fields.get("payload") or "{}"))
+        except Exception as e:
+            # Left unacked: redelivered after the visibility timeout
+            logger.error(f"Job {message_id} ({job_type}) failed on attempt {deliveries}: {e}", exc_info=True)
+            return
+        finally:
+            keepalive.cancel()
+
+        await self._ack(client, message_id)
+        logger.info(f"✓ Job {message_id} ({job_type}) done in {time.monotonic() - started:.1f}s")
+
+    async def _ack(self, client, message_id: str):
+        """Acknowledge a job and delete it, so finished jobs do not pile up in the stream"""
+        pipe = client.pipeline(transaction=True)
+        pipe.xack(self.stream, self.group, message_id)
+        pipe.xdel(self.stream, message_id)
+        await pipe.execute()
+
+    async def _delivery_count(self, client, message_id: str) -> int:
+        try:
+            pending = await client.xpending_range(
+                self.stream, self.group, min=message_id, max=message_id, count=1
+            )
+            return pending[0]["times_delivered"] if pending else 1
+        except Exception:
+            return 1
+
+    async def _keep_claimed(self, client, consumer: str, message_id: str):
+        """Reset the job's idle time so it is not reclaimed while still running"""
+        interval = max(1, settings.job_visibility_timeout_seconds // 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await client.xclaim(
+                    self.stream, self.group, consumer, min_idle_time=0,
+                    message_ids=[message_id], justid=True
+                )
+            except Exception as e:
+                logger.warning(f"Could not refresh claim on job {message_id}: {e}")
+
+
+# Fast-path analyses, slow background enrichment and portfolio batches get
+# separate streams so long Yutori jobs and large batches never hold up
+# interactive analyses.
+analysis_queue = JobQueue("jobs:analyze", settings.worker_concurrency)
+enrichment_queue = JobQueue("jobs:enrich", settings.enrichment_worker_concurrency)
+batch_queue = JobQueue("jobs:batch", settings.batch_worker_concurrency)
+# Low-priority cache prewarming, see app.core.prewarm
+prewarm_queue = JobQueue("jobs:prewarm", settings.prewarm_worker_concurrency)
+# Short Yutori status polls that re-queue themselves while a task runs, kept
+# off the enrichment stream so waiting on Yutori never takes enrichment slots
+poll_queue = JobQueue("jobs:poll", settings.poll_worker_concurrency)
+
+
+async def schedule_refresh(
+    refresh_key: str,
+    job_type: str,
+    payload: Dict[str, Any],
+    queue: Optional[JobQueue] = None,
+) -> bool:
+    """
+    Enqueue a background refresh of a stale cache entry, at most once per
+    `refresh_lock_seconds` for the same key, so a burst of readers hitting
+    the stale value triggers a single upstream call.
+    Returns True if a refresh job was enqueued.
+    """
+    queue = queue or enrichment_queue
+    lock_key = f"refresh:lock:{refresh_key}"
+    client = redis_cache.client
+    if client:
+        try:
+            if not await client.set(lock_key, "1", nx=True, ex=settings.refresh_lock_seconds):
+                return False
+        except Exception as e:
+            logger.warning(f"Could not take refresh lock for {refresh_key}: {e}")
+            return False
+    else:
+        now = time.monotonic()
+        if _local_refresh_locks.get(lock_key, 0) > now:
+            return False
+        _local_refresh_locks[lock_key] = now + settings.refresh_lock_seconds
+
+    logger.info(f"♻️ Scheduling background refresh of {refresh_key}")
+    await queue.enqueue(job_type, payload)
+    return True
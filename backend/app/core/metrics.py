@@ -0,0 +1,194 @@
+from app.config import settings
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional
+import time
+
+# Upper bounds of the histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+SIZE_BUCKETS_BYTES = [256, 1024, 4096, 16384, 65536, 262144, 1048576]
+
+
+def namespace_of(key: str) -> str:
+    """Metric namespace of a cache key: the longest configured prefix, else its first segment"""
+    for prefix in sorted(settings.cache_metric_namespaces, key=len, reverse=True):
+        if key.startswith(prefix):
+            return prefix.rstrip(":")
+    return key.split(":", 1)[0]
+
+
+class Histogram:
+    """Fixed-bucket histogram that can be merged across processes"""
+
+    def __init__(self, bounds: List[float], counts: Optional[List[int]] = None, total: float = 0.0):
+        self.bounds = bounds
+        self.counts = counts or [0] * (len(bounds) + 1)
+        self.total = total
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (None past the last bound)"""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for bound, bucket in zip(self.bounds + [None], self.counts):
+            seen += bucket
+            if seen >= rank:
+                return bound
+        return None
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"bounds": self.bounds, "counts": self.counts, "sum": round(self.total, 3)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        return cls(data["bounds"], list(data["counts"]), data.get("sum", 0.0))
+
+
+class NamespaceMetrics:
+    """
+    Hit/miss counts, Redis round-trip latency and value sizes of one key
+    namespace. Read and write latency are kept apart: writes are slower and
+    would skew the lookup percentiles.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.l1_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.write_latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.size_bytes = Histogram(SIZE_BUCKETS_BYTES)
+
+    def merge(self, other: "NamespaceMetrics"):
+        self.hits += other.hits
+        self.l1_hits += other.l1_hits
+        self.misses += other.misses
+        self.writes += other.writes
+        self.errors += other.errors
+        self.latency_ms.merge(other.latency_ms)
+        self.write_latency_ms.merge(other.write_latency_ms)
+        self.size_bytes.merge(other.size_bytes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "l1_hits": self.l1_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+            "latency_ms": self.latency_ms.to_dict(),
+            "write_latency_ms": self.write_latency_ms.to_dict(),
+            "size_bytes": self.size_bytes.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NamespaceMetrics":
+        metrics = cls()
+        for field in ("hits", "l1_hits", "misses", "writes", "errors"):
+            setattr(metrics, field, data.get(field, 0))
+        metrics.latency_ms = Histogram.from_dict(data["latency_ms"])
+        if "write_latency_ms" in data:  # absent from snapshots of processes not yet upgraded
+            metrics.write_latency_ms = Histogram.from_dict(data["write_latency_ms"])
+        metrics.size_bytes = Histogram.from_dict(data["size_bytes"])
+        return metrics
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts, hit rate and percentile estimates, for dashboards and the CLI"""
+        lookups = self.hits + self.misses
+        size = self.size_bytes
+        return {
+            "hits": self.hits,
+            "l1_hits": self.l1_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "errors": self.errors,
+            "latency_ms": self._latency_summary(self.latency_ms),
+            "write_latency_ms": self._latency_summary(self.write_latency_ms),
+            "size_bytes": {
+                "mean": round(size.total / size.count) if size.count else 0,
+                "p50": size.percentile(0.5),
+                "p95": size.percentile(0.95),
+                "max_bucket": size.percentile(1.0),
+            },
+        }
+
+    @staticmethod
+    def _latency_summary(latency: Histogram) -> Dict[str, Any]:
+        return {
+            "mean": round(latency.total / latency.count, 3) if latency.count else 0.0,
+            "p50": latency.percentile(0.5),
+            "p95": latency.percentile(0.95),
+            "p99": latency.percentile(0.99),
+        }
+
+
+class CacheMetrics:
+    """Per-namespace cache instrumentation for one process"""
+
+    def __init__(self):
+        self.namespaces: Dict[str, NamespaceMetrics] = {}
+        self.started_at = time.time()
+
+    def _for(self, key: str) -> NamespaceMetrics:
+        namespace = namespace_of(key)
+        metrics = self.namespaces.get(namespace)
+        if metrics is None:
+            metrics = self.namespaces[namespace] = NamespaceMetrics()
+        return metrics
+
+    def lookup(self, key: str, hit: bool, latency_ms: Optional[float] = None, size: Optional[int] = None, l1: bool = False):
+        metrics = self._for(key)
+        if hit:
+            metrics.hits += 1
+            metrics.l1_hits += l1
+        else:
+            metrics.misses += 1
+        if latency_ms is not None:
+            metrics.latency_ms.observe(latency_ms)
+        if size is not None:
+            metrics.size_bytes.observe(size)
+
+    def write(self, key: str, latency_ms: float, size: int):
+        metrics = self._for(key)
+        metrics.writes += 1
+        metrics.write_latency_ms.observe(latency_ms)
+        metrics.size_bytes.observe(size)
+
+    def error(self, key: str):
+        self._for(key).errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "namespaces": {name: metrics.to_dict() for name, metrics in self.namespaces.items()},
+        }
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Combine snapshots of several processes into one summary per namespace"""
+    merged: Dict[str, NamespaceMetrics] = {}
+    for snapshot in snapshots:
+        for name, data in snapshot.get("namespaces", {}).items():
+            metrics = NamespaceMetrics.from_dict(data)
+            if name in merged:
+                merged[name].merge(metrics)
+            else:
+                merged[name] = metrics
+    return {name: merged[name].summary() for name in sorted(merged)}
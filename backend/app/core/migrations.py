@@ -0,0 +1,254 @@
+from app.core.cache import redis_cache, CacheEntry, SCHEMA_VERSIONS
+from app.core.admission import admission
+from app.config import settings
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+OUTDATED_KEY = "cache:outdated"         # set of keys found with an older schema version
+RUN_LOCK_KEY = "cache:migrate:lock"     # one migration batch per interval, cluster-wide
+SCAN_LOCK_KEY = "cache:migrate:scan"    # one backfill scan per cache_migration_scan_seconds
+
+# Values fetched per round trip while scanning a namespace for outdated entries
+SCAN_BATCH_SIZE = 100
+
+# Re-derives an outdated value: (key, value) -> value in the current schema
+Migration = Callable[[str, Any], Awaitable[Any]]
+
+# Current key of a key written in an older key format under the same prefix;
+# the key itself if it is already current
+KeyMigration = Callable[[str], str]
+
+# key prefix -> migration to the prefix's current version (cache.SCHEMA_VERSIONS),
+# filled by register_cache_migration
+_migrations: Dict[str, Migration] = {}
+
+# key prefix -> key format migration, filled by register_key_migration
+_key_migrations: Dict[str, KeyMigration] = {}
+
+# Keys flagged while Redis is unavailable, and keys this process already flagged
+_local_outdated: Set[str] = set()
+_flagged: Set[str] = set()
+MAX_FLAGGED = 10000
+
+
+def register_cache_migration(prefix: str, version: int):
+    """
+    Decorator registering the coroutine that upgrades values under `prefix`
+    to schema `version`. From then on every write under the prefix is
+    stamped with that version.
+    """
+    def decorator(migration: Migration) -> Migration:
+        _migrations[prefix] = migration
+        SCHEMA_VERSIONS[prefix] = version
+        return migration
+    return decorator
+
+
+def register_key_migration(prefix: str):
+    """
+    Decorator registering the function that maps keys under `prefix` written
+    in an older key format to their current key. The backfill scan moves
+    such entries, keeping their remaining TTL, so a key format change does
+    not orphan everything cached before it.
+    """
+    def decorator(migration: KeyMigration) -> KeyMigration:
+        _key_migrations[prefix] = migration
+        return migration
+    return decorator
+
+
+def _migration_for(key: str) -> Optional[Migration]:
+    for prefix, migration in _migrations.items():
+        if key.startswith(prefix):
+            return migration
+    return None
+
+
+def _current_key(key: str) -> str:
+    for prefix, migration in _key_migrations.items():
+        if key.startswith(prefix):
+            return migration(key)
+    return key
+
+
+async def flag_outdated(*keys: str):
+    """Queue keys holding an older schema version for the background migrator"""
+    keys = [key for key in keys if key not in _flagged]
+    if not keys:
+        return
+    if len(_flagged) >= MAX_FLAGGED:
+        _flagged.clear()
+    _flagged.update(keys)
+    client = redis_cache.client
+    if client:
+        try:
+            await client.sadd(OUTDATED_KEY, *keys)
+            return
+        except Exception as e:
+            logger.warning(f"Could not flag outdated cache keys: {e}")
+    _local_outdated.update(keys)
+
+
+async def take_outdated(count: int) -> List[str]:
+    """Pop up to `count` flagged keys"""
+    client = redis_cache.client
+    if client:
+        try:
+            keys = await client.spop(OUTDATED_KEY, count) or []
+        except Exception as e:
+            logger.warning(f"Could not read outdated cache keys: {e}")
+            keys = []
+    else:
+        keys = []
+    while _local_outdated and len(keys) < count:
+        keys.append(_local_outdated.pop())
+    _flagged.difference_update(keys)
+    return keys
+
+
+class CacheMigrator:
+    """
+    Upgrades cached values stamped with an older schema version in the
+    background, so readers are served the old value at once instead of
+    waiting on the upgrade (e.g. an OpenAI re-parse).
+
+    Outdated keys are flagged by readers (read_through) and by a backfill
+    scan of every registered namespace once per
+    `cache_migration_scan_seconds`. The scan first moves entries stored
+    under an older key format to their current key, so only entries readers
+    can still reach are upgraded. Every `cache_migration_interval_seconds`
+    one process takes the run lock and migrates at most
+    `cache_migration_batch_size` of them, keeping their remaining soft and
+    hard TTLs. Like prewarming, no batch starts while analyses are queued.
+    """
+
+    def __init__(self):
+        self._scanned_at: Optional[float] = None
+
+    async def run(self, stop: asyncio.Event):
+        """Migrate a batch every `cache_migration_interval_seconds` until `stop` is set"""
+        if not settings.cache_migration_enabled or not (_migrations or _key_migrations):
+            return
+        namespaces = len(set(_migrations) | set(_key_migrations))
+        logger.info(f"Cache migrator started ({namespaces} namespaces, every {settings.cache_migration_interval_seconds}s)")
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.cache_migration_interval_seconds)
+                break
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Cache migration run failed: {e}", exc_info=True)
+
+    async def run_once(self) -> int:
+        """One migration batch. Returns the number of values migrated."""
+        client = redis_cache.client
+        if client:
+            if not await client.set(RUN_LOCK_KEY, "1", nx=True, ex=settings.cache_migration_interval_seconds):
+                return 0  # another process ran this interval
+        if (await admission.metrics())["queued"]:
+            logger.info("Cache migration skipped, interactive analyses are queued")
+            return 0
+
+        await self._scan_if_due(client)
+        keys = await take_outdated(settings.cache_migration_batch_size)
+        migrated = 0
+        for key in keys:
+            try:
+                migrated += await self.migrate(key)
+            except Exception as e:
+                logger.warning(f"Could not migrate {key}: {e}")
+        if keys:
+            logger.info(f"🔧 Migrated {migrated} of {len(keys)} outdated cache entries")
+        return migrated
+
+    async def migrate(self, key: str) -> bool:
+        """Upgrade one value to its namespace's current schema, if it is still outdated"""
+        migration = _migration_for(key)
+        store = redis_cache.store
+        if not migration or not store or _current_key(key) != key:
+            return False  # old key formats are moved by the scan, never upgraded in place
+        entry = await redis_cache.get_entry(key)
+        if not entry or not entry.outdated(key):
+            return False  # expired, or rewritten since it was flagged
+
+        value = await migration(key, entry.value)
+
+        # A refresh may have stored a new value while the migration ran
+        current = await redis_cache.get_entry(key)
+        if not current or current.stored_at != entry.stored_at:
+            return False
+        now = time.time()
+        ttl = entry.expires_at - now if entry.expires_at else await store.ttl(key)
+        if ttl <= 0:
+            return False
+        soft_ttl = max(entry.fresh_until - now, 0) if entry.fresh_until else None
+        await redis_cache.set(key, value, ttl=max(int(ttl), 1), soft_ttl=soft_ttl, delta=entry.delta)
+        return True
+
+    async def _scan_if_due(self, client):
+        """Flag every outdated value of the registered namespaces, once per scan interval"""
+        if client:
+            if not await client.set(SCAN_LOCK_KEY, "1", nx=True, ex=settings.cache_migration_scan_seconds):
+                return
+        elif self._scanned_at and time.monotonic() - self._scanned_at < settings.cache_migration_scan_seconds:
+            return
+        self._scanned_at = time.monotonic()
+
+        store = redis_cache.store
+        if not store:
+            return
+        moved = 0
+        for prefix, key_migration in _key_migrations.items():
+            async for key in store.scan(f"{prefix}*"):
+                current = key_migration(key)
+                if current != key:
+                    moved += await self._move(store, key, current)
+        if moved:
+            logger.info(f"Cache migration scan moved {moved} entries to their current keys")
+
+        flagged = 0
+        for prefix in _migrations:
+            batch: List[str] = []
+            async for key in store.scan(f"{prefix}*"):
+                batch.append(key)
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    flagged += await self._flag_batch(store, batch)
+                    batch = []
+            if batch:
+                flagged += await self._flag_batch(store, batch)
+        if flagged:
+            logger.info(f"Cache migration scan found {flagged} outdated entries")
+
+    async def _move(self, store, key: str, current: str) -> bool:
+        """
+        Move an entry to its current key with its remaining TTL, unless the
+        current key already holds a (newer) value. The old key is dropped either way.
+        """
+        value, existing = await store.mget([key, current])
+        ttl = await store.ttl(key)
+        moved = value is not None and existing is None and ttl > 0
+        if moved:
+            await store.set(current, value, ttl)
+        await store.delete(key)
+        return moved
+
+    async def _flag_batch(self, store, keys: List[str]) -> int:
+        values = await store.mget(keys)
+        outdated = [
+            key for key, value in zip(keys, values)
+            if value and CacheEntry.decode(value).outdated(key)
+        ]
+        if outdated:
+            await flag_outdated(*outdated)
+        return len(outdated)
+
+
+# Global instance
+cache_migrator = CacheMigrator()
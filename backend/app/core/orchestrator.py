@@ -4,18 +4,184 @@ from app.services.financial import FinancialService
 from app.services.competitor import CompetitorService
 from app.services.sentiment import SentimentService
 from app.services.graph import GraphService
-from app.core.cache import update_progress, cache_company, get_cached_company
+from app.core.cache import (
+    update_progress, push_section_update, cache_company, cache_company_sections, alias_company,
+    get_cached_company
+)
+from app.core.singleflight import AnalysisFlight
+from app.core.entities import resolve_company_key, learn_company_aliases
+from app.core.jobs import enrichment_queue, register_job_handler, schedule_refresh
+from app.core.admission import admission
+from app.config import settings
 from app.models import (
     CompanyData, CompanyOverview, ProductsAPIs, MarketIntelligence,
     Financials, TeamCulture, NewsSentiment, CompanyMetadata
 )
 from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
 import asyncio
+import copy
 import logging
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# AnalyzeOptions flag -> stage it enables. The overview stage always runs.
+STAGE_OPTIONS = {
+    "competitors": "include_competitors",
+    "financials": "include_financials",
+    "team": "include_team",
+    "news": "include_news",
+    "apis": "include_apis",
+    "graph": "include_graph",
+}
+
+# Stage -> section of CompanyData it produces
+STAGE_SECTIONS = {
+    "overview": "overview",
+    "competitors": "market_intelligence",
+    "financials": "financials",
+    "team": "team_culture",
+    "news": "news_sentiment",
+    "apis": "products_apis",
+}
+
+# Stage -> model its section is validated with
+STAGE_MODELS = {
+    "overview": CompanyOverview,
+    "competitors": MarketIntelligence,
+    "financials": Financials,
+    "team": TeamCulture,
+    "news": NewsSentiment,
+    "apis": ProductsAPIs,
+}
+
+ENRICHMENT_STAGES = ("apis", "graph")
+
+# Section of CompanyData -> stage that produces it
+SECTION_STAGES = {section: stage for stage, section in STAGE_SECTIONS.items()}
+
+
+def plan_stages(options: Optional[dict]) -> Set[str]:
+    """Turn AnalyzeOptions into the set of stages to run for an analysis"""
+    options = options or {}
+    plan = {"overview"}
+    plan.update(stage for stage, flag in STAGE_OPTIONS.items() if options.get(flag, True))
+    return plan
+
+
+def section_freshness(record: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Age and staleness of every section of a cached company record, measured
+    against settings.section_soft_ttls. Sections without their own timestamp
+    (records cached before per-section tracking) are as old as the analysis.
+    """
+    now = datetime.utcnow()
+    updated = record.get("section_updated_at") or {}
+    freshness = {}
+    for section in record.get("sections", []):
+        stamp = updated.get(section) or record.get("analyzed_at")
+        try:
+            age = (now - datetime.fromisoformat(stamp)).total_seconds()
+        except (TypeError, ValueError):
+            age = None
+        soft_ttl = settings.section_soft_ttls.get(section)
+        freshness[section] = {
+            "age_seconds": age,
+            "stale": age is not None and soft_ttl is not None and age >= soft_ttl,
+        }
+    return freshness
+
+
+async def schedule_company_refresh(record: Dict[str, Any], freshness: Dict[str, Dict[str, Any]]) -> bool:
+    """
+    Queue one background refresh of the stale sections of a completed record.
+    Readers keep getting the stale record until the refresh patches it in.
+    """
+    if record.get("status") != "completed":
+        return False
+    stages = sorted(
+        SECTION_STAGES[section] for section, info in freshness.items()
+        if info["stale"] and section in SECTION_STAGES
+    )
+    if not stages:
+        return False
+    return await schedule_refresh(f"company:{record['id']}", "refresh_company", {
+        "company_id": record["id"],
+        "stages": stages,
+    })
+
+
+class Stage:
+    """
+    One unit of analysis work. `inputs` names the stages whose results this
+    stage consumes; they are passed to `run` as keyword arguments.
+
+    A stage that fails or misses its `budget` (seconds) is degraded: its
+    `fallback` result is used if it has one; otherwise, unless it is
+    `required`, it is skipped together with every stage that depends on it,
+    and the skipped dependents are degraded too.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[..., Awaitable[Any]],
+        inputs: Sequence[str] = (),
+        progress_stage: str = "",
+        message: str = "",
+        required: bool = True,
+        budget: Optional[float] = None,
+        fallback: Optional[Callable[[], Any]] = None,
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.progress_stage = progress_stage or name
+        self.message = message
+        self.required = required
+        self.budget = budget
+        self.fallback = fallback
+
+
+class AnalysisContext:
+    """
+    Artifacts of a single analysis. Every stage result produced on the fast path
+    is kept here and handed to background enrichment and graph building, so each
+    stage is fetched at most once per analysis.
+    """
+
+    def __init__(self, company_name: str, company_id: str, plan: Set[str]):
+        self.company_name = company_name
+        self.company_id = company_id
+        self.plan = plan
+        self.slug = ""
+        self.sessions: List[str] = []
+        self.artifacts: Dict[str, Any] = {}
+        self.degraded: Set[str] = set()  # stages that missed their budget, failed or were skipped
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for an enrichment job payload"""
+        return {
+            "company_name": self.company_name,
+            "company_id": self.company_id,
+            "plan": sorted(self.plan),
+            "slug": self.slug,
+            "sessions": self.sessions,
+            "artifacts": self.artifacts,
+            "degraded": sorted(self.degraded),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AnalysisContext":
+        context = cls(data["company_name"], data["company_id"], set(data["plan"]))
+        context.slug = data.get("slug", "")
+        context.sessions = data.get("sessions", [])
+        context.artifacts = data.get("artifacts", {})
+        context.degraded = set(data.get("degraded", []))
+        return context
+
+
 class CompanyOrchestrator:
     def __init__(self, session_id: str):
         self.session_id = session_id
@@ -25,56 +191,90 @@ class CompanyOrchestrator:
         self.competitor = CompetitorService()
         self.sentiment = SentimentService()
         self.graph = GraphService()
+        self.flight: Optional[AnalysisFlight] = None
     
     async def analyze(self, company_name: str, options: dict):
         """
-        Fast-path analysis: Tavily + OpenAI finish in ~30-60s, result shown immediately.
+        Fast-path analysis: Tavily + OpenAI stages run concurrently, so the result
+        is ready after the slowest stage (~30s sentiment) instead of the sum of all.
         Yutori Browsing and graph building run in the background and enrich the cache.
+
+        Concurrent requests for the same company are coalesced: only the first
+        session runs the analysis, later ones attach to its progress and result.
+
+        `options` (AnalyzeOptions) select the stages to run; skipped stages make
+        no upstream calls and their sections are left out of `sections`.
+
+        Each stage has a latency budget and the fast path an overall deadline.
+        Stages that miss them are finalized as `degraded_sections` and filled
+        in by background enrichment, so results arrive within a fixed SLO.
+
+        Every section is pushed to the progress stream and written to the
+        cached result as soon as its stage finishes, overview first.
         """
+        plan = plan_stages(options)
+        company_key = await resolve_company_key(company_name)
+        self.flight = AnalysisFlight(company_key, self.session_id, variant=self._plan_variant(plan))
+        if not await self.flight.join():
+            return
+
         company_id = str(uuid.uuid4())
+        context = AnalysisContext(company_name, company_id, plan)
+        enrich = any(stage in plan for stage in ENRICHMENT_STAGES)
         self._current_progress = 0.0
 
         try:
-            logger.info(f"Starting analysis for {company_name} (session: {self.session_id})")
+            logger.info(f"Starting analysis for {company_name} (session: {self.session_id}, stages: {sorted(plan)})")
 
-            # Stage 1: Quick company overview via Tavily (~2s), Yutori starts in background
             await self._update_progress(0.1, "researching_company", "Searching company info...")
-            overview_data = await self.research.get_quick_overview(company_name)
-            overview = CompanyOverview(**overview_data)
-
-            # Stage 2: Competitors via Tavily (~3s)
-            await self._update_progress(0.3, "analyzing_competitors", "Analyzing competitors...")
-            competitors_data = await self.competitor.find_competitors(company_name)
-            competitors = MarketIntelligence(**competitors_data)
-
-            # Stage 3: Financials (~2s)
-            await self._update_progress(0.5, "gathering_financials", "Gathering financial data...")
-            financials_data = await self.financial.get_financial_data(company_name)
-            financials = Financials(**financials_data)
+            stages = [
+                stage for stage in self._fast_path_stages(company_name, deep_research=enrich)
+                if stage.name in plan
+            ]
+            partial = {
+                "id": company_id,
+                "company_name": company_name,
+                "company_key": company_key,
+                "slug": "",
+                "analyzed_at": datetime.utcnow().isoformat(),
+                "status": "processing",
+                "enrichment_status": "pending" if enrich else "skipped",
+                "sections": [],
+                "degraded_sections": [],
+                "section_updated_at": {},
+                "data": {},
+                "metadata": CompanyMetadata(
+                    sources_count=0, confidence_score=0.0, last_updated=datetime.utcnow().isoformat()
+                ).model_dump()
+            }
 
-            # Stage 4: Team (instant, mock)
-            await self._update_progress(0.6, "analyzing_team", "Analyzing team & culture...")
-            team_data = self._get_mock_team_data(company_name)
-            team = TeamCulture(**team_data)
+            async def publish(stage: Stage):
+                await self._publish_section(context, partial, stage)
 
-            # Stage 5: News & sentiment via Tavily + OpenAI (~30s)
-            await self._update_progress(0.7, "processing_news", "Processing news & sentiment...")
-            news_data = await self.sentiment.analyze_news(company_name)
-            news_data = self._normalize_sentiment_data(news_data)
-            news = NewsSentiment(**news_data)
+            deadline = asyncio.get_running_loop().time() + settings.analysis_deadline_seconds
+            results = await self._run_stages(
+                stages, context, progress_range=(0.1, 0.9), deadline=deadline, on_stage_done=publish
+            )
 
-            # API docs start empty — Yutori Browsing fills this in the background
-            apis = ProductsAPIs()
+            overview = CompanyOverview(**results["overview"])
+            context.slug = overview.slug
+            if "overview" not in context.degraded:
+                # A `{slug}.com` website may be ResearchService's guess and says nothing about identity
+                website = "" if overview.website == f"https://{overview.slug}.com" else overview.website
+                await learn_company_aliases(
+                    company_key, company_name, overview.name, overview.slug, website=website
+                )
 
             await self._update_progress(0.9, "finalizing", "Finalizing results...")
 
+            # Skipped and degraded sections keep their empty defaults; API docs
+            # start empty and Yutori Browsing fills them in the background.
             company_data = CompanyData(
                 overview=overview,
-                products_apis=apis,
-                market_intelligence=competitors,
-                financials=financials,
-                team_culture=team,
-                news_sentiment=news
+                market_intelligence=MarketIntelligence(**results.get("competitors", {})),
+                financials=Financials(**results.get("financials", {})),
+                team_culture=TeamCulture(**results.get("team", {})),
+                news_sentiment=NewsSentiment(**results.get("news", {}))
             )
 
             metadata = CompanyMetadata(
@@ -86,79 +286,461 @@ class CompanyOrchestrator:
             result = {
                 "id": company_id,
                 "company_name": company_name,
+                "company_key": company_key,
                 "slug": overview.slug,
                 "analyzed_at": datetime.utcnow().isoformat(),
                 "status": "completed",
-                "enrichment_status": "pending",
+                "enrichment_status": "pending" if enrich else "skipped",
+                "sections": [STAGE_SECTIONS[s.name] for s in stages if s.name not in context.degraded],
+                "degraded_sections": [STAGE_SECTIONS[s.name] for s in stages if s.name in context.degraded],
+                "section_updated_at": partial["section_updated_at"],
                 "data": company_data.model_dump(),
                 "metadata": metadata.model_dump()
             }
 
-            await cache_company(company_id, result)
-            await cache_company(overview.slug, result)
-            await cache_company(self.session_id, result)
+            await cache_company(company_id, result, aliases=[overview.slug, company_key])
 
-            await self._update_progress(1.0, "completed", "Analysis complete! Deep API research running in background...")
+            await self.flight.complete(company_id)
+            context.sessions = await self.flight.sessions()
+            await alias_company(company_id, *context.sessions)
+
+            if not enrich and not context.degraded:
+                await self._update_progress(1.0, "completed", "Analysis complete!")
+                logger.info(f"✓ Analysis complete for {company_name}, no enrichment requested")
+                return
+
+            if context.degraded:
+                message = f"Analysis complete! Still loading: {', '.join(result['degraded_sections'])}..."
+            else:
+                message = "Analysis complete! Deep API research running in background..."
+            # Progress streams stay open until the degraded sections arrive
+            await self._update_progress(1.0, "completed", message, degraded_sections=result["degraded_sections"])
             logger.info(f"✓ Fast analysis complete for {company_name}, launching background enrichment")
 
-            # Fire and forget: Yutori Browsing + graph building
-            asyncio.create_task(
-                self._background_enrich(company_name, company_id, overview.slug, overview_data)
-            )
+            # Degraded sections, Yutori Browsing and graph building run on a
+            # worker from the enrichment queue
+            await enrichment_queue.enqueue("enrich", {
+                "session_id": self.session_id,
+                "context": context.to_dict(),
+            })
 
         except Exception as e:
             logger.error(f"Error analyzing {company_name}: {e}", exc_info=True)
+            await self.flight.complete()
             await self._update_progress(self._current_progress, "error", f"Error: {str(e)}")
 
-    async def _background_enrich(self, company_name: str, company_id: str, slug: str, overview_data: dict):
+    async def _background_enrich(self, context: AnalysisContext):
         """
         Background enrichment — runs after the user already has results.
-        1. Yutori Browsing for deep API docs (5-10 min)
-        2. Neo4j knowledge graph
-        Updates the cache so the next lookup gets richer data.
+        1. Re-run fast-path stages that were degraded, without a budget
+        2. Yutori Browsing for deep API docs (5-10 min)
+        3. Neo4j knowledge graph, built from the fast-path artifacts in `context`
+        A recovered section is published and cached as soon as its stage
+        finishes, without waiting for the slow Yutori and graph stages.
+        Updates the cache so the next lookup gets richer data, then tells the
+        sessions enrichment is over with an `enriched` progress event.
         """
+        company_name, company_id, slug = context.company_name, context.company_id, context.slug
         logger.info(f"🔄 Background enrichment started for {company_name}")
 
-        apis_data = {"products": [], "apis": [], "documentation_quality": 0.0, "sdk_languages": [], "pricing": []}
+        retry = set(context.degraded)
+        for name in retry:
+            context.artifacts.pop(name, None)
+        context.degraded.clear()
+
+        stages = [
+            stage for stage in self._fast_path_stages(company_name, budgets=False)
+            if stage.name in retry
+        ] + [
+            stage for stage in self._enrichment_stages(company_name, company_id, context.plan)
+            if stage.name in context.plan
+        ]
+
+        async def publish(stage: Stage):
+            if stage.name in retry:
+                await self._publish_recovered(context, stage)
+
+        results = await self._run_stages(stages, context, on_stage_done=publish)
 
-        # Yutori Browsing (slow — browser-use agent)
+        # Push enriched API docs into the cached result, writing only the head
+        # and the sections that changed
         try:
-            website = overview_data.get("website", "")
-            if website:
-                logger.info(f"Starting Yutori browsing for {website}")
-                apis_data = await self.browsing.extract_api_docs(website, company_name)
-                logger.info(f"✓ Yutori browsing complete for {company_name}")
+            head = await get_cached_company(company_id, sections=())
+            if head:
+                # Heads are shared with the L1 tier; patch a copy. A record cached
+                # whole (before section storage) is split into sections here.
+                head = copy.deepcopy(head)
+                changed = head.pop("data", {})
+                sections = head.setdefault("sections", [])
+                updated = head.setdefault("section_updated_at", {})
+                if "apis" in results and "apis" not in context.degraded:
+                    section = STAGE_SECTIONS["apis"]
+                    changed[section] = STAGE_MODELS["apis"](**results["apis"]).model_dump()
+                    updated[section] = datetime.utcnow().isoformat()
+                    if section not in sections:
+                        sections.append(section)
+                head["degraded_sections"] = [
+                    STAGE_SECTIONS[name] for name in sorted(context.degraded) if name in STAGE_SECTIONS
+                ]
+                if any(stage in context.plan for stage in ENRICHMENT_STAGES):
+                    head["enrichment_status"] = "completed"
+                    head["metadata"]["sources_count"] = 45
+                    head["metadata"]["confidence_score"] = 0.92
+                # Slug, company key and session lookups are aliases of the same record
+                await cache_company_sections(
+                    company_id, head, changed, aliases=[slug, head.get("company_key"), *context.sessions]
+                )
+                logger.info(f"✅ Cache enriched with deep API data for {company_name}")
+        except Exception as e:
+            logger.warning(f"Cache enrichment update failed for {company_name}: {e}")
+
+        # Final event: sections still degraded will not arrive on this stream
+        still_degraded = [STAGE_SECTIONS[name] for name in sorted(context.degraded) if name in STAGE_SECTIONS]
+        for session_id in context.sessions or [self.session_id]:
+            await update_progress(session_id, {
+                "type": "enriched",
+                "session_id": session_id,
+                "stage": "enrichment_complete",
+                "progress": 1.0,
+                "message": "Background enrichment complete",
+                "degraded_sections": still_degraded,
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+    async def refresh_sections(self, company_id: str, stages: List[str]):
+        """
+        Stale-while-revalidate refresh of a cached record: re-fetch the given
+        stages bypassing the service caches, then patch only those sections.
+        The record stays readable (stale) the whole time.
+        """
+        cached = await get_cached_company(company_id, sections=["overview"])
+        if not cached:
+            return
+        company_name = cached["company_name"]
+        logger.info(f"♻️ Refreshing stale sections of {company_name}: {stages}")
+
+        context = AnalysisContext(company_name, company_id, set(stages))
+        context.slug = cached.get("slug", "")
+        if "overview" not in stages:
+            context.artifacts["overview"] = cached["data"]["overview"]
+
+        refresh = [
+            stage for stage in self._fast_path_stages(company_name, budgets=False, force_refresh=True)
+            if stage.name in stages
+        ] + [
+            stage for stage in self._enrichment_stages(company_name, company_id, context.plan, force_refresh=True)
+            if stage.name == "apis" and "apis" in stages
+        ]
+        results = await self._run_stages(refresh, context)
+
+        # Re-read the head so section lists patched meanwhile by enrichment are
+        # kept; only the refreshed sections are written
+        head = copy.deepcopy(await get_cached_company(company_id, sections=()) or cached)
+        changed = head.pop("data", {})
+        updated = head.setdefault("section_updated_at", {})
+        for name in stages:
+            if name in results and name not in context.degraded:
+                section = STAGE_SECTIONS[name]
+                data = STAGE_MODELS[name](**results[name]).model_dump()
+                if name == "overview" and data == cached["data"].get("overview"):
+                    # Still the cached research: Yutori re-researches in the
+                    # background and its poll writes and stamps the overview
+                    continue
+                changed[section] = data
+                updated[section] = datetime.utcnow().isoformat()
+        if changed:
+            head["metadata"]["last_updated"] = datetime.utcnow().isoformat()
+
+        await cache_company_sections(
+            company_id, head, changed, aliases=[context.slug, head.get("company_key")]
+        )
+        logger.info(f"✓ Refreshed {sorted(changed)} for {company_name}")
+
+    async def _publish_section(self, context: AnalysisContext, record: Dict[str, Any], stage: Stage):
+        """
+        Push a finished section to every attached session's progress stream and
+        into the partial cached result. The partial result is only written once
+        it has an overview, so readers always get a valid CompanyResponse.
+        """
+        section = STAGE_SECTIONS.get(stage.name)
+        if not section:
+            return
+
+        try:
+            data = STAGE_MODELS[stage.name](**context.artifacts[stage.name]).model_dump()
         except Exception as e:
-            logger.warning(f"Browsing enrichment failed for {company_name}: {e}")
+            logger.warning(f"Could not publish {section} for {context.company_name}: {e}")
+            return
+
+        degraded = stage.name in context.degraded
+        record["data"][section] = data
+        record["degraded_sections" if degraded else "sections"].append(section)
+        if not degraded:
+            record["section_updated_at"][section] = datetime.utcnow().isoformat()
+        if stage.name == "overview":
+            record["slug"] = data["slug"]
 
-        # Neo4j graph building
+        sessions = await self.flight.sessions() if self.flight else [self.session_id]
+        message = {
+            "type": "section",
+            "stage": stage.progress_stage,
+            "progress": self._current_progress,
+            "message": f"{section.replace('_', ' ').capitalize()} ready",
+            "section": section,
+            "degraded": degraded,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        for session_id in sessions:
+            await push_section_update(session_id, {**message, "session_id": session_id})
+
+        if "overview" in record["data"]:
+            # Only this section is written, except when the overview arrives:
+            # sections finished before it are written along with it
+            head = {key: value for key, value in record.items() if key != "data"}
+            changed = record["data"] if stage.name == "overview" else {section: data}
+            await cache_company_sections(context.company_id, head, changed, aliases=sessions)
+
+    async def _publish_recovered(self, context: AnalysisContext, stage: Stage):
+        """
+        Push a degraded section that enrichment recovered to the analysis'
+        sessions and patch it into the cached result, writing only the head
+        and that section.
+        """
+        section = STAGE_SECTIONS.get(stage.name)
+        if not section or stage.name in context.degraded:
+            return  # not a section (graph), or failed again; the fallback placeholder stays
         try:
-            competitors_data = await self.competitor.find_competitors(company_name)
-            financials_data = await self.financial.get_financial_data(company_name)
-            team_data = self._get_mock_team_data(company_name)
-            news_data = await self.sentiment.analyze_news(company_name)
+            data = STAGE_MODELS[stage.name](**context.artifacts[stage.name]).model_dump()
+            head = await get_cached_company(context.company_id, sections=())
+            if not head:
+                return
+            head = copy.deepcopy(head)
+            head.pop("data", None)
+            if section not in head.setdefault("sections", []):
+                head["sections"].append(section)
+            head["degraded_sections"] = [s for s in head.get("degraded_sections", []) if s != section]
+            head.setdefault("section_updated_at", {})[section] = datetime.utcnow().isoformat()
+            sessions = context.sessions or [self.session_id]
+            await cache_company_sections(
+                context.company_id, head, {section: data},
+                aliases=[context.slug, head.get("company_key"), *sessions]
+            )
+        except Exception as e:
+            logger.warning(f"Could not publish recovered {section} for {context.company_name}: {e}")
+            return
+
+        message = {
+            "type": "section",
+            "stage": stage.progress_stage,
+            "progress": 1.0,
+            "message": f"{section.replace('_', ' ').capitalize()} ready",
+            "section": section,
+            "degraded": False,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        for session_id in sessions:
+            await push_section_update(session_id, {**message, "session_id": session_id})
+        logger.info(f"✅ Recovered {section} for {context.company_name}")
+
+    def _plan_variant(self, plan: Set[str]) -> str:
+        """Analyses with different stage plans produce different results and must not be coalesced"""
+        full = {"overview", *STAGE_OPTIONS}
+        return "" if plan == full else "+".join(sorted(plan))
+
+    def _fast_path_stages(
+        self, company_name: str, deep_research: bool = True, budgets: bool = True,
+        force_refresh: bool = False
+    ) -> List[Stage]:
+        """
+        Stages shown to the user. None depends on another, so all run at once.
+        With `budgets`, each stage gets its latency budget from settings.stage_budgets.
+        With `force_refresh`, service caches are bypassed and rewritten.
+        """
+
+        async def overview():
+            return await self.research.get_quick_overview(
+                company_name, deep_research=deep_research, force_refresh=force_refresh
+            )
+
+        async def competitors():
+            return await self.competitor.find_competitors(company_name, force_refresh=force_refresh)
+
+        async def financials():
+            return await self.financial.get_financial_data(company_name)
+
+        async def team():
+            return self._get_mock_team_data(company_name)
+
+        async def news():
+            news_data = await self.sentiment.analyze_news(company_name, force_refresh=force_refresh)
+            return self._normalize_sentiment_data(news_data)
+
+        stages = [
+            Stage("overview", overview, progress_stage="researching_company",
+                  message="Searching company info...",
+                  fallback=lambda: self._fallback_overview(company_name)),
+            Stage("competitors", competitors, progress_stage="analyzing_competitors",
+                  message="Analyzing competitors...", required=False),
+            Stage("financials", financials, progress_stage="gathering_financials",
+                  message="Gathering financial data...", required=False),
+            Stage("team", team, progress_stage="analyzing_team",
+                  message="Analyzing team & culture...", required=False),
+            Stage("news", news, progress_stage="processing_news",
+                  message="Processing news & sentiment...", required=False),
+        ]
+        if budgets:
+            for stage in stages:
+                stage.budget = settings.stage_budgets.get(stage.name)
+        return stages
+
+    def _enrichment_stages(
+        self, company_name: str, company_id: str, plan: Set[str], force_refresh: bool = False
+    ) -> List[Stage]:
+        """Slow background stages. Failures are logged and never abort enrichment."""
+
+        async def apis(overview):
+            empty = {"products": [], "apis": [], "documentation_quality": 0.0, "sdk_languages": [], "pricing": []}
+            website = overview.get("website", "")
+            if not website:
+                return empty
+            try:
+                logger.info(f"Starting Yutori browsing for {website}")
+                apis_data = await self.browsing.extract_api_docs(
+                    website, company_name, force_refresh=force_refresh
+                )
+                logger.info(f"✓ Yutori browsing complete for {company_name}")
+                return apis_data
+            except Exception as e:
+                logger.warning(f"Browsing enrichment failed for {company_name}: {e}")
+                return empty
+
+        async def graph(overview, **sections):
             await self.graph.build_knowledge_graph(
-                company_id, overview_data, apis_data,
-                competitors_data, financials_data, team_data, news_data
+                company_id, overview,
+                sections.get("apis", {}), sections.get("competitors", {}),
+                sections.get("financials", {}), sections.get("team", {}), sections.get("news", {})
             )
             logger.info(f"✓ Knowledge graph built for {company_name}")
-        except Exception as e:
-            logger.warning(f"Graph building failed for {company_name}: {e}")
 
-        # Push enriched API docs into the cached result
+        graph_inputs = [
+            stage for stage in ("overview", "apis", "competitors", "financials", "team", "news")
+            if stage in plan
+        ]
+        return [
+            Stage("apis", apis, inputs=("overview",), required=False),
+            Stage("graph", graph, inputs=graph_inputs, required=False),
+        ]
+
+    async def _run_stages(
+        self,
+        stages: List[Stage],
+        context: AnalysisContext,
+        progress_range: Optional[Tuple[float, float]] = None,
+        deadline: Optional[float] = None,
+        on_stage_done: Optional[Callable[[Stage], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run `stages` as a dependency DAG. A stage starts as soon as all of its
+        inputs are in the context's artifacts; independent stages run concurrently.
+        Completed stage outputs are stored in `context.artifacts` under the stage
+        name, and degraded stages are recorded in `context.degraded`, along with
+        the stages skipped because an input failed, so enrichment retries them.
+
+        Each stage is cut off at its budget or at `deadline` (event loop time),
+        whichever comes first. With `progress_range`, progress advances from start
+        to end as stages finish, and `on_stage_done` is awaited for every stage
+        that produced a result (including a fallback). The first failure of a
+        required stage without a fallback cancels the stages still running and
+        is re-raised.
+        """
+        results = context.artifacts
+        loop = asyncio.get_running_loop()
+        pending = {stage.name: stage for stage in stages if stage.name not in results}
+        running: Dict[asyncio.Task, Stage] = {}
+        cut_off_at: Dict[asyncio.Task, float] = {}  # timeouts set by the deadline
+        failed: set = set()
+        total = len(pending)
+        finished = 0
+
         try:
-            cached = await get_cached_company(company_id)
-            if cached:
-                cached["data"]["products_apis"] = apis_data
-                cached["enrichment_status"] = "completed"
-                cached["metadata"]["sources_count"] = 45
-                cached["metadata"]["confidence_score"] = 0.92
-                await cache_company(company_id, cached)
-                await cache_company(slug, cached)
-                await cache_company(self.session_id, cached)  # also update the session lookup
-                logger.info(f"✅ Cache enriched with deep API data for {company_name}")
-        except Exception as e:
-            logger.warning(f"Cache enrichment update failed for {company_name}: {e}")
+            while pending or running:
+                blocked = [s for s in pending.values() if failed.intersection(s.inputs)]
+                while blocked:
+                    for stage in blocked:
+                        del pending[stage.name]
+                        failed.add(stage.name)
+                        context.degraded.add(stage.name)
+                        logger.warning(f"Skipping stage {stage.name}: an input stage failed")
+                    blocked = [s for s in pending.values() if failed.intersection(s.inputs)]
+
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.inputs):
+                        del pending[name]
+                        kwargs = {dep: results[dep] for dep in stage.inputs}
+                        timeout = stage.budget
+                        by_deadline = False
+                        if deadline is not None:
+                            remaining = max(0.0, deadline - loop.time())
+                            by_deadline = timeout is None or remaining < timeout
+                            timeout = remaining if by_deadline else timeout
+                        task = asyncio.create_task(asyncio.wait_for(stage.run(**kwargs), timeout))
+                        running[task] = stage
+                        if by_deadline:
+                            cut_off_at[task] = timeout
+                        if progress_range and stage.message:
+                            await self._update_progress(self._current_progress, stage.progress_stage, stage.message)
+
+                if not running:
+                    if pending:
+                        raise RuntimeError(f"Stages with unsatisfiable inputs: {sorted(pending)}")
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    remaining = cut_off_at.pop(task, None)
+                    finished += 1
+                    try:
+                        results[stage.name] = task.result()
+                    except Exception as e:
+                        if isinstance(e, asyncio.TimeoutError) and remaining is not None:
+                            logger.warning(f"Stage {stage.name} cut off by the deadline after {remaining:.1f}s")
+                        elif isinstance(e, asyncio.TimeoutError):
+                            logger.warning(f"Stage {stage.name} missed its {stage.budget}s budget")
+                        else:
+                            logger.warning(f"Stage {stage.name} failed: {e}")
+                        if stage.fallback is None and stage.required:
+                            raise
+                        if stage.name in STAGE_SECTIONS:
+                            context.degraded.add(stage.name)
+                        if progress_range and stage.name in STAGE_SECTIONS:
+                            await self._update_progress(
+                                self._current_progress, stage.progress_stage,
+                                f"{stage.name.capitalize()} delayed, will be filled in shortly"
+                            )
+                        if stage.fallback is None:
+                            failed.add(stage.name)
+                            continue
+                        results[stage.name] = stage.fallback()
+                        if on_stage_done:
+                            await on_stage_done(stage)
+                        continue
+                    if progress_range:
+                        start, end = progress_range
+                        await self._update_progress(
+                            start + (end - start) * finished / total,
+                            stage.progress_stage,
+                            f"{stage.name.capitalize()} ready",
+                        )
+                    if on_stage_done:
+                        await on_stage_done(stage)
+        finally:
+            for task in running:
+                task.cancel()
+
+        return results
 
     def _normalize_sentiment_data(self, data: dict) -> dict:
         """
@@ -204,8 +786,11 @@ class CompanyOrchestrator:
 
         return normalized
     
-    async def _update_progress(self, progress: float, stage: str, message: str = ""):
-        """Update progress in Redis"""
+    async def _update_progress(self, progress: float, stage: str, message: str = "", **extra: Any):
+        """
+        Update progress in Redis for this session and every session attached to
+        it; `extra` fields are added to the progress message
+        """
         self._current_progress = progress
         progress_data = {
             "type": "progress" if progress < 1.0 else "completed",
@@ -213,11 +798,25 @@ class CompanyOrchestrator:
             "stage": stage,
             "progress": progress,
             "message": message or f"Processing {stage}...",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow().isoformat(),
+            **extra
         }
-        await update_progress(self.session_id, progress_data)
+        sessions = await self.flight.sessions() if self.flight else [self.session_id]
+        for session_id in sessions:
+            await update_progress(session_id, {**progress_data, "session_id": session_id})
         logger.info(f"Progress: {int(progress * 100)}% - {stage}")
     
+    def _fallback_overview(self, company_name: str) -> dict:
+        """Minimal overview used when the overview stage misses its budget"""
+        slug = company_name.lower().replace(" ", "-")
+        return {
+            "name": company_name,
+            "slug": slug,
+            "description": f"{company_name} - analysis in progress",
+            "website": f"https://{slug}.com",
+            "logo_url": f"https://logo.clearbit.com/{slug}.com",
+        }
+
     def _get_mock_team_data(self, company_name: str) -> dict:
         """Get mock team data"""
         slug = company_name.lower().replace(" ", "-")
@@ -287,3 +886,26 @@ class CompanyOrchestrator:
             "open_positions_count": 20,
             "hiring_focus": ["Engineering", "Product"]
         })
+
+
+@register_job_handler("analyze")
+async def run_analysis_job(payload: Dict[str, Any]):
+    session_id = payload["session_id"]
+    await admission.start(session_id)
+    try:
+        orchestrator = CompanyOrchestrator(session_id)
+        await orchestrator.analyze(payload["company_name"], payload.get("options") or {})
+    finally:
+        await admission.finish(session_id, payload.get("client_id", ""))
+
+
+@register_job_handler("enrich")
+async def run_enrichment_job(payload: Dict[str, Any]):
+    orchestrator = CompanyOrchestrator(payload["session_id"])
+    await orchestrator._background_enrich(AnalysisContext.from_dict(payload["context"]))
+
+
+@register_job_handler("refresh_company")
+async def run_company_refresh_job(payload: Dict[str, Any]):
+    orchestrator = CompanyOrchestrator(f"refresh-{payload['company_id']}")
+    await orchestrator.refresh_sections(payload["company_id"], payload["stages"])
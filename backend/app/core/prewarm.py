@@ -0,0 +1,200 @@
+from app.core.cache import redis_cache, get_cached_company
+from app.core.entities import resolve_company_key
+from app.core.jobs import prewarm_queue, schedule_refresh
+from app.core.admission import admission
+from app.services.research import ResearchService
+from app.services.competitor import CompetitorService
+from app.services.sentiment import SentimentService
+from app.services.browsing import BrowsingService
+from app.config import settings
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+ACCESS_KEY = "prewarm:access"      # sorted set: company key -> decayed access count
+RUN_LOCK_KEY = "prewarm:lock"      # one prewarm run per interval, cluster-wide
+DECAY_LOCK_KEY = "prewarm:decay"   # one decay per prewarm_decay_seconds
+
+
+def _budget_key(hour: int) -> str:
+    return f"prewarm:budget:{hour}"
+
+
+# Decayed counts below this are dropped from the access set
+MIN_SCORE = 0.1
+
+
+async def record_company_access(company_name: str, company_key: Optional[str] = None):
+    """Count a request for a company towards its prewarm priority"""
+    company_key = company_key or await resolve_company_key(company_name)
+    if company_key:
+        await prewarm_scheduler.record(company_key)
+
+
+class PrewarmScheduler:
+    """
+    Keeps the service caches of popular companies warm.
+
+    Every `prewarm_interval_seconds` one process takes the run lock, picks the
+    `prewarm_top_n` companies by access count (halved every
+    `prewarm_decay_seconds`) and queues a refresh of each research, competitor,
+    sentiment and browsing entry that turns stale within
+    `prewarm_lead_seconds`. Refreshes run on the prewarm stream, at most
+    `prewarm_max_refreshes_per_hour` of them, and no run starts while
+    interactive analyses are queued, so prewarming only uses spare capacity.
+    """
+
+    def __init__(self):
+        self.research = ResearchService()
+        self.competitors = CompetitorService()
+        self.sentiment = SentimentService()
+        self.browsing = BrowsingService()
+        # In-process fallback when Redis is unavailable
+        self._access: Counter = Counter()
+        self._spent: Dict[int, int] = {}
+        self._decayed_at = time.monotonic()
+
+    async def record(self, company_key: str):
+        client = redis_cache.client
+        if client:
+            try:
+                await client.zincrby(ACCESS_KEY, 1, company_key)
+                return
+            except Exception as e:
+                logger.warning(f"Could not record access to {company_key}: {e}")
+        self._access[company_key] += 1
+
+    async def run(self, stop: asyncio.Event):
+        """Prewarm every `prewarm_interval_seconds` until `stop` is set"""
+        if not settings.prewarm_enabled:
+            return
+        logger.info(f"Prewarm scheduler started (top {settings.prewarm_top_n}, every {settings.prewarm_interval_seconds}s)")
+        await self._start_decay_period()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.prewarm_interval_seconds)
+                break
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Prewarm run failed: {e}", exc_info=True)
+
+    async def run_once(self) -> int:
+        """One prewarm pass. Returns the number of refreshes queued."""
+        client = redis_cache.client
+        if client:
+            if not await client.set(RUN_LOCK_KEY, "1", nx=True, ex=settings.prewarm_interval_seconds):
+                return 0  # another process ran this interval
+        if (await admission.metrics())["queued"]:
+            logger.info("Prewarm skipped, interactive analyses are queued")
+            return 0
+
+        await self._decay(client)
+        budget = await self._remaining_budget(client)
+        if budget <= 0:
+            return 0
+
+        scheduled = 0
+        companies = await self._top_companies(client)
+        for company_key in companies:
+            if scheduled >= budget:
+                break
+            for cache_key, job_type, payload in await self._due_entries(company_key):
+                if scheduled >= budget:
+                    break
+                if await schedule_refresh(cache_key, job_type, payload, queue=prewarm_queue):
+                    scheduled += 1
+        if scheduled:
+            await self._spend(client, scheduled)
+            logger.info(f"🔥 Prewarm queued {scheduled} refreshes across the top {len(companies)} companies")
+        return scheduled
+
+    async def _top_companies(self, client) -> List[str]:
+        if client:
+            return await client.zrevrange(ACCESS_KEY, 0, settings.prewarm_top_n - 1)
+        return [key for key, _ in self._access.most_common(settings.prewarm_top_n)]
+
+    async def _due_entries(self, company_key: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """(cache key, refresh job, payload) of the company's entries that turn stale soon"""
+        record = await get_cached_company(company_key, sections=["overview"])
+        if not record:
+            return []  # never analyzed successfully, or aged out
+        name = record["company_name"]
+        website = record.get("data", {}).get("overview", {}).get("website", "")
+
+        targets = [
+            (self.research._get_cache_key(company_key), "refresh_research", {"company_name": name}),
+            (self.competitors._get_cache_key(company_key), "refresh_competitors", {"company_name": name}),
+            (self.sentiment._get_cache_key(company_key), "refresh_sentiment", {"company_name": name}),
+        ]
+        if website:
+            targets.append((
+                self.browsing._get_cache_key(website), "refresh_browsing",
+                {"website": website, "company_name": name},
+            ))
+
+        due = []
+        horizon = time.time() + settings.prewarm_lead_seconds
+        for target in targets:
+            entry = await redis_cache.get_entry(target[0])
+            # Only entries with a soft TTL are refreshed ahead of time; short-lived
+            # stand-ins (e.g. the Tavily overview) are replaced on demand
+            if entry and entry.fresh_until is not None and entry.fresh_until <= horizon:
+                due.append(target)
+        return due
+
+    async def _start_decay_period(self):
+        """
+        Take the decay lock for a full period unless another process holds it,
+        so counts are not halved on the first run after the cluster starts
+        """
+        client = redis_cache.client
+        if not client:
+            return  # the in-process period starts with the scheduler
+        try:
+            await client.set(DECAY_LOCK_KEY, "1", nx=True, ex=settings.prewarm_decay_seconds)
+        except Exception as e:
+            logger.warning(f"Could not start the prewarm decay period: {e}")
+
+    async def _decay(self, client):
+        """Halve all access counts once per `prewarm_decay_seconds`, dropping companies nobody asks for"""
+        if client:
+            if await client.set(DECAY_LOCK_KEY, "1", nx=True, ex=settings.prewarm_decay_seconds):
+                pipe = client.pipeline(transaction=True)
+                pipe.zunionstore(ACCESS_KEY, {ACCESS_KEY: 0.5})
+                pipe.zremrangebyscore(ACCESS_KEY, "-inf", f"({MIN_SCORE}")
+                await pipe.execute()
+            return
+        if time.monotonic() - self._decayed_at >= settings.prewarm_decay_seconds:
+            self._decayed_at = time.monotonic()
+            self._access = Counter({
+                key: count / 2 for key, count in self._access.items() if count / 2 >= MIN_SCORE
+            })
+
+    async def _remaining_budget(self, client) -> int:
+        hour = int(time.time() // 3600)
+        if client:
+            spent = int(await client.get(_budget_key(hour)) or 0)
+        else:
+            spent = self._spent.get(hour, 0)
+        return settings.prewarm_max_refreshes_per_hour - spent
+
+    async def _spend(self, client, refreshes: int):
+        hour = int(time.time() // 3600)
+        if client:
+            pipe = client.pipeline(transaction=True)
+            pipe.incrby(_budget_key(hour), refreshes)
+            pipe.expire(_budget_key(hour), 3600)
+            await pipe.execute()
+        else:
+            self._spent = {hour: self._spent.get(hour, 0) + refreshes}
+
+
+# Global instance
+prewarm_scheduler = PrewarmScheduler()
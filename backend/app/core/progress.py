@@ -0,0 +1,114 @@
+from app.core.cache import redis_cache, progress_channel, PROGRESS_CHANNEL_PREFIX
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sent to every subscriber after the shared connection (re)subscribed: events
+# published meanwhile were missed, so the stored progress must be re-read
+RESYNC = {"event": "resync"}
+
+
+class ProgressHub:
+    """
+    Delivers a session's progress events (published by update_progress and
+    push_section_update) to this process's WebSockets over one shared Redis
+    pub/sub connection. A session's channel is only subscribed while a local
+    socket follows it, so idle sessions cost no Redis traffic.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, Set[asyncio.Queue]] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return redis_cache.client is not None
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: str) -> AsyncIterator["asyncio.Queue[Dict[str, Any]]"]:
+        """Queue receiving the session's events while the context is open"""
+        queue: asyncio.Queue = asyncio.Queue()
+        queues = self._queues.setdefault(session_id, set())
+        queues.add(queue)
+        try:
+            if len(queues) == 1:
+                await self._send("subscribe", session_id)
+            self._start_listener()
+            yield queue
+        finally:
+            queues.discard(queue)
+            if not queues and self._queues.get(session_id) is queues:
+                del self._queues[session_id]
+                await self._send("unsubscribe", session_id)
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+
+    async def _send(self, command: str, session_id: str):
+        pubsub = self._pubsub
+        if pubsub is None:
+            return  # the listener subscribes every followed session once connected
+        try:
+            await getattr(pubsub, command)(progress_channel(session_id))
+        except Exception as e:
+            logger.warning(f"Progress {command} failed for session {session_id}: {e}")
+
+    def _start_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    def _dispatch(self, session_id: str, event: Dict[str, Any]):
+        for queue in self._queues.get(session_id, ()):
+            queue.put_nowait(event)
+
+    async def _listen(self):
+        """Fan published events out to local subscribers until none are left"""
+        while True:
+            client = redis_cache.client
+            if not client:
+                await asyncio.sleep(1)
+                continue
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                self._pubsub = pubsub
+                channels = [progress_channel(session_id) for session_id in self._queues]
+                if not channels:
+                    # Every socket left while (re)connecting; SUBSCRIBE needs a channel
+                    self._listener = None
+                    return
+                await pubsub.subscribe(*channels)
+                for session_id in list(self._queues):
+                    self._dispatch(session_id, RESYNC)
+                while redis_cache.client:
+                    if not self._queues:
+                        self._listener = None  # the next subscriber starts a new listener
+                        return
+                    # Bounded wait, so an idle channel never trips the socket timeout
+                    message = await pubsub.get_message(timeout=1.0)
+                    if not message or message.get("type") != "message":
+                        continue
+                    session_id = message["channel"][len(PROGRESS_CHANNEL_PREFIX):]
+                    self._dispatch(session_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Progress listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                if self._pubsub is pubsub:
+                    self._pubsub = None
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+
+# Global instance
+progress_hub = ProgressHub()
@@ -0,0 +1,216 @@
+from app.core.cache import (
+    redis_cache, alias_company, get_cached_company,
+    get_progress_updates, update_progress, get_section_updates, push_section_update
+)
+from app.core.entities import company_key
+from app.config import settings
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Delete the lease only if this session still owns it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Extend the lease only if this session still owns it
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# In-process fallback when Redis is unavailable: flight key -> attached sessions,
+# and flight key -> leader session
+_local_flights: Dict[str, Set[str]] = {}
+_local_leaders: Dict[str, str] = {}
+
+
+def flight_key(company_name: str) -> str:
+    """Normalize a company name into the key analyses are coalesced on"""
+    return company_key(company_name)
+
+
+class AnalysisFlight:
+    """
+    Single-flight coalescing of analyses for the same company (and, via
+    `variant`, the same stage plan).
+
+    The first session to `join` takes a Redis lease and runs the analysis.
+    Sessions joining while the lease is held are attached to the flight: the
+    leader fans its progress updates and result out to every attached session,
+    so all of them see the same stream without paying for their own Tavily,
+    OpenAI and Yutori work. Sessions joining mid-analysis first get the
+    sections and progress the leader already published. The lease is renewed while the leader is alive, so
+    this works across worker processes.
+    """
+
+    def __init__(self, company_name: str, session_id: str, variant: str = ""):
+        self.key = flight_key(company_name)
+        if variant:
+            self.key = f"{self.key}|{variant}"
+        self.session_id = session_id
+        self.is_leader = False
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._local_sessions: Optional[Set[str]] = None
+
+    @property
+    def _lease_key(self) -> str:
+        return f"analysis:lease:{self.key}"
+
+    def _sessions_key(self, leader: str) -> str:
+        return f"analysis:sessions:{self.key}:{leader}"
+
+    @property
+    def _done_key(self) -> str:
+        return f"analysis:done:{self.key}"
+
+    async def join(self) -> bool:
+        """
+        Join the flight for this company.
+        Returns True if this session is the leader and must run the analysis.
+        """
+        client = redis_cache.client
+        if not client:
+            return await self._join_local()
+
+        ttl_ms = settings.analysis_lease_ttl_seconds * 1000
+        try:
+            for _ in range(3):
+                if await client.set(self._lease_key, self.session_id, nx=True, px=ttl_ms):
+                    await client.sadd(self._sessions_key(self.session_id), self.session_id)
+                    await client.pexpire(self._sessions_key(self.session_id), ttl_ms)
+                    self.is_leader = True
+                    self._heartbeat = asyncio.create_task(self._renew_lease(ttl_ms))
+                    return True
+
+                leader = await client.get(self._lease_key)
+                if leader:
+                    await client.sadd(self._sessions_key(leader), self.session_id)
+                    # Still the same flight after attaching? Then the leader's
+                    # final fan-out is guaranteed to include this session.
+                    if await client.get(self._lease_key) == leader:
+                        logger.info(f"Attached session {self.session_id} to in-flight analysis of '{self.key}' (leader: {leader})")
+                        await self._catch_up(leader)
+                        return False
+
+                # The leader finished in the meantime — serve its result if it succeeded
+                company_id = await client.get(self._done_key)
+                if company_id and await self._serve_finished(company_id):
+                    return False
+        except Exception as e:
+            logger.warning(f"Analysis lease unavailable for '{self.key}', running uncoalesced: {e}")
+            return True
+
+        return True
+
+    async def _join_local(self) -> bool:
+        sessions = _local_flights.get(self.key)
+        if sessions is None:
+            self._local_sessions = _local_flights[self.key] = {self.session_id}
+            _local_leaders[self.key] = self.session_id
+            self.is_leader = True
+            return True
+        sessions.add(self.session_id)
+        logger.info(f"Attached session {self.session_id} to in-process analysis of '{self.key}'")
+        await self._catch_up(_local_leaders[self.key])
+        return False
+
+    async def _catch_up(self, leader: str):
+        """
+        Copy the sections and progress the leader published before this session
+        attached. Sections the leader fanned out to this session meanwhile are
+        not copied again.
+        """
+        published = await get_section_updates(leader)
+        if published:
+            received = {item.get("section") for item in await get_section_updates(self.session_id)}
+            for item in published:
+                if item.get("section") not in received:
+                    await push_section_update(self.session_id, {**item, "session_id": self.session_id})
+        leader_progress = await get_progress_updates(leader)
+        if leader_progress:
+            await update_progress(self.session_id, {**leader_progress, "session_id": self.session_id})
+
+    async def sessions(self) -> List[str]:
+        """All sessions attached to this flight, leader first"""
+        if not self.is_leader:
+            return [self.session_id]
+
+        attached: Set[str] = set()
+        client = redis_cache.client
+        if self._local_sessions is not None:
+            attached = set(self._local_sessions)
+        elif client:
+            try:
+                attached = set(await client.smembers(self._sessions_key(self.session_id)))
+            except Exception as e:
+                logger.warning(f"Could not read attached sessions for '{self.key}': {e}")
+
+        attached.discard(self.session_id)
+        return [self.session_id, *sorted(attached)]
+
+    async def complete(self, company_id: Optional[str] = None):
+        """
+        End the flight. `company_id` is set when the analysis succeeded; it is
+        published briefly so sessions that join right after the lease is
+        released still get the finished result. Call this before the final
+        fan-out to `sessions()` so no attached session is missed.
+        """
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        if not self.is_leader:
+            return
+
+        if self._local_sessions is not None:
+            _local_flights.pop(self.key, None)
+            _local_leaders.pop(self.key, None)
+            return
+
+        client = redis_cache.client
+        if not client:
+            return
+
+        try:
+            # Publish the result before releasing the lease: a session that sees no
+            # lease is then guaranteed to find the done marker.
+            if company_id:
+                await client.set(self._done_key, company_id, ex=60)
+            await client.eval(_RELEASE_SCRIPT, 1, self._lease_key, self.session_id)
+        except Exception as e:
+            logger.warning(f"Could not release analysis lease for '{self.key}': {e}")
+
+    async def _serve_finished(self, company_id: str) -> bool:
+        result = await get_cached_company(company_id, sections=())
+        if not result:
+            return False
+        await alias_company(company_id, self.session_id)
+        await update_progress(self.session_id, {
+            "type": "completed",
+            "session_id": self.session_id,
+            "stage": "completed",
+            "progress": 1.0,
+            "message": "Analysis complete!",
+            "timestamp": datetime.utcnow().isoformat()
+        })
+        logger.info(f"Session {self.session_id} served finished analysis of '{self.key}'")
+        return True
+
+    async def _renew_lease(self, ttl_ms: int):
+        """Keep the lease (and the attached-session set) alive while the leader runs"""
+        while True:
+            await asyncio.sleep(ttl_ms / 3000)
+            try:
+                client = redis_cache.client
+                if client and await client.eval(_RENEW_SCRIPT, 1, self._lease_key, self.session_id, ttl_ms):
+                    await client.pexpire(self._sessions_key(self.session_id), ttl_ms)
+            except Exception as e:
+                logger.warning(f"Analysis lease renewal failed for '{self.key}': {e}")
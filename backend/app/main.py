@@ -3,7 +3,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.database import init_neo4j, close_neo4j
 from app.core.cache import init_redis, close_redis
+from app.core.progress import progress_hub
 from app.api import routes, websocket
+from app.config import settings
+from app.worker import run_workers
+import asyncio
 import logging
 
 # Configure logging
@@ -16,10 +20,19 @@ async def lifespan(app: FastAPI):
     logger.info("Starting CompanyIntel API...")
     await init_neo4j()
     await init_redis()
+    stop_workers = asyncio.Event()
+    worker_task = None
+    if settings.embedded_worker:
+        worker_task = asyncio.create_task(run_workers(stop_workers))
+        logger.info("Embedded job worker started")
     logger.info("All services initialized")
     yield
     # Shutdown
     logger.info("Shutting down...")
+    stop_workers.set()
+    if worker_task:
+        await worker_task
+    await progress_hub.close()
     await close_neo4j()
     await close_redis()
 
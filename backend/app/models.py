@@ -15,11 +15,31 @@ class AnalyzeRequest(BaseModel):
     company_name: str
     options: AnalyzeOptions = AnalyzeOptions()
 
+class BatchAnalyzeRequest(BaseModel):
+    company_names: List[str]
+    options: AnalyzeOptions = AnalyzeOptions()
+
 # Response Models
 class AnalyzeResponse(BaseModel):
     session_id: str
     status: str = "processing"
     estimated_time_seconds: int = 30
+    queue_position: int = 0
+    websocket_url: str
+
+class BatchItem(BaseModel):
+    company_name: str
+    status: str  # "cached" or "queued"
+    company_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+class BatchAnalyzeResponse(BaseModel):
+    batch_id: str
+    total: int
+    cached: int
+    queued: int
+    items: List[BatchItem]
+    rejected: List[str] = []  # names without a usable company name
     websocket_url: str
 
 class CompanyOverview(BaseModel):
@@ -163,26 +183,46 @@ class NewsSentiment(BaseModel):
 
 class CompanyData(BaseModel):
     overview: CompanyOverview
-    products_apis: ProductsAPIs
-    market_intelligence: MarketIntelligence
-    financials: Financials
-    team_culture: TeamCulture
-    news_sentiment: NewsSentiment
+    products_apis: ProductsAPIs = ProductsAPIs()
+    market_intelligence: MarketIntelligence = MarketIntelligence()
+    financials: Financials = Financials()
+    team_culture: TeamCulture = TeamCulture()
+    news_sentiment: NewsSentiment = NewsSentiment()
 
 class CompanyMetadata(BaseModel):
     sources_count: int
     confidence_score: float
     last_updated: str
 
+class SectionFreshness(BaseModel):
+    age_seconds: Optional[float] = None
+    stale: bool = False
+
 class CompanyResponse(BaseModel):
     id: str
     company_name: str
     slug: str
     analyzed_at: str
     status: str
+    sections: List[str] = []
+    degraded_sections: List[str] = []
+    freshness: Dict[str, SectionFreshness] = {}
     data: CompanyData
     metadata: CompanyMetadata
 
+class CompanySectionsResponse(BaseModel):
+    """A company record with only the requested sections in `data`"""
+    id: str
+    company_name: str
+    slug: str
+    analyzed_at: str
+    status: str
+    sections: List[str] = []
+    degraded_sections: List[str] = []
+    freshness: Dict[str, SectionFreshness] = {}
+    data: Dict[str, Any] = {}
+    metadata: CompanyMetadata
+
 class GraphNode(BaseModel):
     id: str
     label: str
@@ -229,6 +269,12 @@ class CompanyListResponse(BaseModel):
     limit: int
     offset: int
 
+class MetricsResponse(BaseModel):
+    admission: Dict[str, Any]
+    jobs: List[Dict[str, Any]]
+    cache: Dict[str, Any] = {}
+    timestamp: str
+
 class HealthResponse(BaseModel):
     status: str
     services: Dict[str, str]
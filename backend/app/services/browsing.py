@@ -2,13 +2,20 @@ import httpx
 import asyncio
 import json
 from app.config import settings
-from app.core.cache import redis_cache
+from app.core.cache import read_through
+from app.core.entities import normalize_domain
+from app.core.jobs import register_job_handler, schedule_refresh
+from app.core.migrations import register_cache_migration, register_key_migration
 from typing import Dict, Any, List
 import logging
 import hashlib
 
 logger = logging.getLogger(__name__)
 
+# Schema version of cached extractions. 1: products and apis parsed out of
+# the browsed content (entries cached before could hold raw_content only).
+BROWSING_SCHEMA_VERSION = 1
+
 class BrowsingService:
     def __init__(self):
         self.api_key = settings.yutori_api_key
@@ -16,11 +23,13 @@ class BrowsingService:
         self.tavily_key = settings.tavily_api_key
         self.base_url = "https://api.yutori.com/v1"
         self.timeout = 60.0
-        self.cache_ttl = 86400 * 7  # 7 days cache for browsing results
+        self.cache_ttl = 86400 * 7  # 7 days fresh for browsing results
+        self.cache_stale_ttl = 86400 * 30  # served stale while re-browsing for up to 30 days
 
     def _get_cache_key(self, website: str) -> str:
-        url_hash = hashlib.md5(website.lower().encode()).hexdigest()
-        return f"yutori:browsing:{url_hash}:{website.replace('https://', '').replace('http://', '')[:50]}"
+        domain = normalize_domain(website)
+        domain_hash = hashlib.md5(domain.encode()).hexdigest()
+        return f"yutori:browsing:{domain_hash}:{domain}"
 
     async def _gather_tavily_intelligence(self, company_name: str, website: str) -> Dict[str, Any]:
         """Run parallel Tavily searches to find docs URL, pre-research the API landscape,
@@ -137,67 +146,77 @@ class BrowsingService:
             "answers": answers,
         }
 
-    async def extract_api_docs(self, website: str, company_name: str = "") -> Dict[str, Any]:
-        """Gather Tavily intelligence first, then send a targeted Yutori browse."""
+    async def extract_api_docs(self, website: str, company_name: str = "", force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Gather Tavily intelligence first, then send a targeted Yutori browse.
+        Concurrent misses for the same site wait for a single browse; results
+        past their soft TTL, or in an older schema, are returned as-is and
+        re-browsed or migrated in the background.
+        """
         logger.info(f"Extracting API docs for {company_name or website}")
 
         cache_key = self._get_cache_key(website)
-        cached_result = await redis_cache.get(cache_key)
+        store = False  # only real extractions are cached, not failure placeholders
 
-        if cached_result:
-            if cached_result.get("raw_content") and not cached_result.get("products") and not cached_result.get("apis"):
-                logger.info(f"Cache HIT for {website} but stale — re-parsing with OpenAI")
-                reparsed = await self._parse_api_docs(website, {"result": cached_result["raw_content"]})
-                await redis_cache.set(cache_key, reparsed, ttl=self.cache_ttl)
-                return reparsed
-            logger.info(f"✓ Cache HIT for {website}")
-            return cached_result
+        async def fetch():
+            nonlocal store
+            if not self.api_key:
+                raise Exception("Yutori API key not configured")
 
-        if not self.api_key:
-            raise Exception("Yutori API key not configured")
+            try:
+                # Step 1: Tavily gathers intelligence in parallel (docs URL + API/SDK/pricing context)
+                intel = await self._gather_tavily_intelligence(company_name or website, website)
+                docs_url = intel["docs_url"]
+                tavily_snippets = intel["snippets"]
+                yutori_context = intel["context"]
 
-        try:
-            # Step 1: Tavily gathers intelligence in parallel (docs URL + API/SDK/pricing context)
-            intel = await self._gather_tavily_intelligence(company_name or website, website)
-            docs_url = intel["docs_url"]
-            tavily_snippets = intel["snippets"]
-            yutori_context = intel["context"]
+                logger.info(f"Sending Yutori to: {docs_url}")
 
-            logger.info(f"Sending Yutori to: {docs_url}")
+                # Step 2: One targeted Yutori browse, enriched with Tavily context
+                try:
+                    result = await self._browse_page(docs_url, company_name=company_name, context=yutori_context)
+                    if result:
+                        parsed_data = await self._parse_api_docs(docs_url, result, tavily_snippets=tavily_snippets)
+                        store = True
+                        logger.info(f"✓ Cached browsing results for {website} (TTL: 7 days)")
+                        return parsed_data
+                except Exception as e:
+                    logger.warning(f"Yutori browse failed for {docs_url}: {e}")
+
+                # Step 3: Yutori failed — fall back to parsing Tavily snippets alone
+                if tavily_snippets:
+                    logger.info(f"Falling back to Tavily snippets for {company_name}")
+                    fallback = await self._parse_api_docs(docs_url, {"result": tavily_snippets}, tavily_snippets="")
+                    if fallback.get("products") or fallback.get("apis"):
+                        fallback["note"] = "Extracted from web search (Yutori unavailable)"
+                        store = True
+                        return fallback
+
+                return {
+                    "products": [], "apis": [], "documentation_quality": 0.0,
+                    "sdk_languages": [], "pricing": [],
+                    "note": "API documentation extraction failed"
+                }
 
-            # Step 2: One targeted Yutori browse, enriched with Tavily context
-            try:
-                result = await self._browse_page(docs_url, company_name=company_name, context=yutori_context)
-                if result:
-                    parsed_data = await self._parse_api_docs(docs_url, result, tavily_snippets=tavily_snippets)
-                    await redis_cache.set(cache_key, parsed_data, ttl=self.cache_ttl)
-                    logger.info(f"✓ Cached browsing results for {website} (TTL: 7 days)")
-                    return parsed_data
             except Exception as e:
-                logger.warning(f"Yutori browse failed for {docs_url}: {e}")
-
-            # Step 3: Yutori failed — fall back to parsing Tavily snippets alone
-            if tavily_snippets:
-                logger.info(f"Falling back to Tavily snippets for {company_name}")
-                fallback = await self._parse_api_docs(docs_url, {"result": tavily_snippets}, tavily_snippets="")
-                if fallback.get("products") or fallback.get("apis"):
-                    fallback["note"] = "Extracted from web search (Yutori unavailable)"
-                    await redis_cache.set(cache_key, fallback, ttl=self.cache_ttl)
-                    return fallback
-
-            return {
-                "products": [], "apis": [], "documentation_quality": 0.0,
-                "sdk_languages": [], "pricing": [],
-                "note": "API documentation extraction failed"
-            }
+                logger.error(f"Error extracting API docs: {e}")
+                return {
+                    "products": [], "apis": [], "documentation_quality": 0.0,
+                    "sdk_languages": [], "pricing": [],
+                    "note": f"Error: {str(e)}"
+                }
+
+        async def refresh():
+            if self.api_key:
+                await schedule_refresh(cache_key, "refresh_browsing", {
+                    "website": website, "company_name": company_name
+                })
 
-        except Exception as e:
-            logger.error(f"Error extracting API docs: {e}")
-            return {
-                "products": [], "apis": [], "documentation_quality": 0.0,
-                "sdk_languages": [], "pricing": [],
-                "note": f"Error: {str(e)}"
-            }
+        return await read_through(
+            cache_key, fetch, ttl=self.cache_stale_ttl, soft_ttl=self.cache_ttl,
+            on_stale=refresh, cacheable=lambda _: store,
+            force_refresh=force_refresh
+        )
 
     async def _browse_page(self, url: str, company_name: str = "", context: str = "") -> Dict[str, Any]:
         """Browse a page using Yutori Browsing API. Task prompt is enriched with Tavily pre-research."""
@@ -419,3 +438,39 @@ Rules:
                 "pricing": [],
                 "raw_content": yutori_text,
             }
+
+
+@register_cache_migration("yutori:browsing:", BROWSING_SCHEMA_VERSION)
+async def migrate_browsing_entry(key: str, cached_result: Any) -> Any:
+    """Re-parse extractions cached as raw content only; anything else is just restamped"""
+    if (
+        isinstance(cached_result, dict) and cached_result.get("raw_content")
+        and not cached_result.get("products") and not cached_result.get("apis")
+    ):
+        domain = key.rsplit(":", 1)[-1]
+        logger.info(f"Re-parsing cached browsing result for {domain} with OpenAI")
+        return await BrowsingService()._parse_api_docs(
+            f"https://{domain}", {"result": cached_result["raw_content"]}
+        )
+    return cached_result
+
+
+@register_key_migration("yutori:browsing:")
+def browsing_key_from_url_key(key: str) -> str:
+    """
+    Browsing results used to be keyed by their full URL (scheme stripped,
+    cut at 50 characters); they are now keyed by the bare domain. Current
+    keys hash exactly their suffix and are left alone.
+    """
+    key_hash, _, suffix = key[len("yutori:browsing:"):].partition(":")
+    if hashlib.md5(suffix.encode()).hexdigest() == key_hash:
+        return key
+    return BrowsingService()._get_cache_key(suffix)
+
+
+@register_job_handler("refresh_browsing")
+async def run_browsing_refresh_job(payload: Dict[str, Any]):
+    """Re-browse API docs whose cached extraction went stale"""
+    await BrowsingService().extract_api_docs(
+        payload["website"], company_name=payload.get("company_name", ""), force_refresh=True
+    )
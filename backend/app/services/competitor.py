@@ -2,7 +2,9 @@ import httpx
 import asyncio
 import json
 from app.config import settings
-from app.core.cache import redis_cache
+from app.core.cache import read_through
+from app.core.entities import resolve_company_key
+from app.core.jobs import register_job_handler, schedule_refresh
 from typing import Dict, Any, List
 import logging
 import hashlib
@@ -15,40 +17,46 @@ class CompetitorService:
         self.openai_key = settings.openai_api_key
         self.base_url = "https://api.tavily.com"
         self.timeout = 30.0
-        self.cache_ttl = 86400 * 3  # 3 days cache for competitor data
-
-    def _get_cache_key(self, company_name: str) -> str:
-        name_hash = hashlib.md5(company_name.lower().encode()).hexdigest()
-        return f"tavily:competitors:{name_hash}:{company_name.lower().replace(' ', '_')}"
-
-    async def find_competitors(self, company_name: str) -> Dict[str, Any]:
-        """Identify competitors using Tavily search + OpenAI extraction with Redis caching"""
+        self.cache_ttl = 86400 * 3  # 3 days fresh for competitor data
+        self.cache_stale_ttl = 86400 * 14  # served stale while refreshing for up to 14 days
+
+    def _get_cache_key(self, company_key: str) -> str:
+        key_hash = hashlib.md5(company_key.encode()).hexdigest()
+        return f"tavily:competitors:{key_hash}:{company_key}"
+
+    async def find_competitors(self, company_name: str, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Identify competitors using Tavily search + OpenAI extraction with Redis caching.
+        Concurrent misses share one upstream call; stale cached data is returned
+        immediately and refreshed in the background.
+        """
         logger.info(f"Analyzing competitors for: {company_name}")
+        cache_key = self._get_cache_key(await resolve_company_key(company_name))
 
-        cache_key = self._get_cache_key(company_name)
-        cached_result = await redis_cache.get(cache_key)
-        if cached_result:
-            logger.info(f"✓ Cache HIT for competitors of {company_name}")
-            return cached_result
+        async def fetch():
+            logger.info(f"Cache MISS for competitors - calling Tavily API")
 
-        logger.info(f"Cache MISS for competitors - calling Tavily API")
+            if not self.tavily_key:
+                raise Exception("Tavily API key not configured")
 
-        if not self.tavily_key:
-            raise Exception("Tavily API key not configured")
+            try:
+                query = f"{company_name} competitors alternatives comparison market analysis"
+                search_results = await self._search_tavily(query)
+                parsed_data = await self._parse_competitors(company_name, search_results)
+                logger.info(f"✓ Cached competitor data for {company_name} (TTL: 3 days)")
+                return parsed_data
 
-        try:
-            query = f"{company_name} competitors alternatives comparison market analysis"
-            search_results = await self._search_tavily(query)
-            parsed_data = await self._parse_competitors(company_name, search_results)
+            except Exception as e:
+                logger.error(f"Error finding competitors: {e}")
+                raise
 
-            await redis_cache.set(cache_key, parsed_data, ttl=self.cache_ttl)
-            logger.info(f"✓ Cached competitor data for {company_name} (TTL: 3 days)")
+        async def refresh():
+            await schedule_refresh(cache_key, "refresh_competitors", {"company_name": company_name})
 
-            return parsed_data
-
-        except Exception as e:
-            logger.error(f"Error finding competitors: {e}")
-            raise
+        return await read_through(
+            cache_key, fetch, ttl=self.cache_stale_ttl, soft_ttl=self.cache_ttl,
+            on_stale=refresh, force_refresh=force_refresh
+        )
 
     async def _search_tavily(self, query: str) -> Dict[str, Any]:
         async with httpx.AsyncClient(timeout=self.timeout) as client:
@@ -208,3 +216,9 @@ Return ONLY the JSON object."""
         except Exception as e:
             logger.warning(f"OpenAI market info extraction failed: {e}")
             return {}
+
+
+@register_job_handler("refresh_competitors")
+async def run_competitors_refresh_job(payload: Dict[str, Any]):
+    """Re-fetch competitor data whose cache entry went stale"""
+    await CompetitorService().find_competitors(payload["company_name"], force_refresh=True)
@@ -3,10 +3,15 @@ import asyncio
 import json
 from app.config import settings
 from app.models import CompanyOverview
-from app.core.cache import redis_cache
+from app.core.cache import redis_cache, read_through, get_cached_company, cache_company_sections
+from app.core.entities import company_key, resolve_company_key
+from app.core.migrations import register_key_migration
+from app.core.jobs import poll_queue, register_job_handler, schedule_refresh
 import logging
 from typing import Dict, Any, Optional
+from datetime import datetime
 import hashlib
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -15,56 +20,84 @@ class ResearchService:
         self.api_key = settings.yutori_api_key
         self.base_url = "https://api.yutori.com/v1"
         self.timeout = 30.0  # Short timeout for quick checks
-        self.cache_ttl = 86400 * 7  # 7 days cache for research results
+        self.cache_ttl = 86400 * 7  # 7 days fresh for research results
+        self.cache_stale_ttl = 86400 * 30  # served stale while re-researching for up to 30 days
+        self.quick_cache_ttl = 600  # Tavily stand-in until Yutori research lands
     
-    def _get_cache_key(self, company_name: str) -> str:
-        """Generate cache key for company research"""
-        name_hash = hashlib.md5(company_name.lower().encode()).hexdigest()
-        return f"yutori:research:{name_hash}:{company_name.lower().replace(' ', '_')}"
+    def _get_cache_key(self, company_key: str) -> str:
+        """Generate cache key for company research from its canonical company key"""
+        key_hash = hashlib.md5(company_key.encode()).hexdigest()
+        return f"yutori:research:{key_hash}:{company_key}"
     
-    def _get_task_key(self, company_name: str) -> str:
+    def _get_task_key(self, company_key: str) -> str:
         """Generate key for storing task ID"""
-        name_hash = hashlib.md5(company_name.lower().encode()).hexdigest()
-        return f"yutori:task:{name_hash}:{company_name.lower().replace(' ', '_')}"
+        key_hash = hashlib.md5(company_key.encode()).hexdigest()
+        return f"yutori:task:{key_hash}:{company_key}"
     
-    async def get_quick_overview(self, company_name: str) -> Dict[str, Any]:
+    async def get_quick_overview(
+        self, company_name: str, deep_research: bool = True, force_refresh: bool = False
+    ) -> Dict[str, Any]:
         """
         Fast company overview:
-        1. Check cache - may already have Yutori-quality data from a previous background run
-        2. Use Tavily for instant results (~2s) so the user never waits
+        1. Check cache - may already have Yutori-quality data from a previous background run.
+           Stale research is still returned while Yutori re-researches in the background.
+        2. Use Tavily for instant results (~2s) so the user never waits. Concurrent
+           misses share one search, cached briefly until Yutori's result replaces it.
         3. Start Yutori deep research in background to enrich cache for next time
+           (skipped with deep_research=False, e.g. for overview-only analyses)
         """
         logger.info(f"Getting quick overview for: {company_name}")
+        cache_key = self._get_cache_key(await resolve_company_key(company_name))
+
+        async def fetch():
+            # Step 2: Tavily instant search for immediate results
+            logger.info(f"Cache MISS - using Tavily for quick overview of {company_name}")
+            overview_data = await self._quick_tavily_search(company_name)
+
+            # Step 3: Start Yutori deep research in background if not already running
+            if self.api_key and deep_research:
+                await self._start_deep_research(company_name)
+
+            return overview_data
+
+        async def refresh():
+            await schedule_refresh(cache_key, "refresh_research", {"company_name": company_name})
+
+        if force_refresh:
+            # Re-research with Yutori; the cached overview is served until its result lands
+            await self._start_deep_research(company_name)
 
         # Step 1: Check cache (could be Yutori-enriched from a previous background run)
-        cache_key = self._get_cache_key(company_name)
-        cached_result = await redis_cache.get(cache_key)
-        if cached_result:
-            logger.info(f"✓ Cache HIT for {company_name} - returning cached research")
-            return cached_result
-
-        # Step 2: Tavily instant search for immediate results
-        logger.info(f"Cache MISS - using Tavily for quick overview of {company_name}")
-        overview_data = await self._quick_tavily_search(company_name)
-
-        # Step 3: Start Yutori deep research in background if not already running
-        if self.api_key:
-            task_key = self._get_task_key(company_name)
-            existing_task_id = await redis_cache.get(task_key)
-            if not existing_task_id:
-                try:
-                    task_id = await self._create_task(company_name)
-                    await redis_cache.set(task_key, task_id, ttl=3600)
-                    asyncio.create_task(
-                        self._background_poll_and_cache(task_id, company_name, cache_key, task_key)
-                    )
-                    logger.info(f"✓ Yutori deep research started in background for {company_name}")
-                except Exception as e:
-                    logger.warning(f"Could not start Yutori background research: {e}")
-            else:
-                logger.info(f"Yutori research already running for {company_name} (task: {existing_task_id})")
+        return await read_through(
+            cache_key, fetch, ttl=self.quick_cache_ttl, on_stale=refresh,
+            cacheable=lambda overview: overview != self._empty_overview(company_name)
+        )
 
-        return overview_data
+    async def _start_deep_research(self, company_name: str):
+        """Start a Yutori research task and queue its polling, unless one is already running"""
+        if not self.api_key:
+            return
+        company_key = await resolve_company_key(company_name)
+        cache_key = self._get_cache_key(company_key)
+        task_key = self._get_task_key(company_key)
+        existing_task_id = await redis_cache.get(task_key)
+        if existing_task_id:
+            logger.info(f"Yutori research already running for {company_name} (task: {existing_task_id})")
+            return
+        try:
+            task_id = await self._create_task(company_name)
+            await redis_cache.set(task_key, task_id, ttl=3600)
+            await poll_queue.enqueue("research_poll", {
+                "task_id": task_id,
+                "company_name": company_name,
+                "company_key": company_key,
+                "cache_key": cache_key,
+                "task_key": task_key,
+                "deadline": time.time() + settings.research_poll_timeout_seconds,
+            })
+            logger.info(f"✓ Yutori deep research started in background for {company_name}")
+        except Exception as e:
+            logger.warning(f"Could not start Yutori background research: {e}")
 
     async def _quick_tavily_search(self, company_name: str) -> Dict[str, Any]:
         """Use Tavily to get an instant company overview"""
@@ -190,67 +223,80 @@ class ResearchService:
             logger.error(f"Error checking task: {e}")
             return None
     
-    async def _background_poll_and_cache(
-        self, 
-        task_id: str, 
-        company_name: str, 
-        cache_key: str, 
-        task_key: str
-    ):
+    async def _poll_and_cache(self, payload: Dict[str, Any]):
         """
-        Poll task in background until complete, then cache result.
-        This runs independently and doesn't block the main request.
+        One status check of a background Yutori research task, run as a short
+        job. While the task is still running the poll re-queues itself, so
+        waiting on Yutori never holds a worker slot for minutes. A finished
+        task's overview is parsed, cached and patched into the company's
+        cached record.
         """
+        task_id, company_name = payload["task_id"], payload["company_name"]
+        cache_key, task_key = payload["cache_key"], payload["task_key"]
+        deadline = payload.get("deadline") or time.time() + settings.research_poll_timeout_seconds
+
+        await asyncio.sleep(settings.research_poll_interval_seconds)
+        status = None
         try:
-            logger.info(f"🔄 Background polling started for {company_name} (task: {task_id})")
-            
-            max_attempts = 300  # 10 minutes (300 * 2 seconds)
-            
-            async with httpx.AsyncClient(timeout=600.0) as client:
-                for attempt in range(max_attempts):
-                    try:
-                        response = await client.get(
-                            f"{self.base_url}/research/tasks/{task_id}",
-                            headers={"X-API-Key": self.api_key}
-                        )
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            status = data.get("status")
-                            
-                            if attempt % 30 == 0:  # Log every minute
-                                logger.info(f"Background poll: {company_name} - {status} ({attempt}/{max_attempts})")
-                            
-                            if status == "succeeded":
-                                # Parse and cache
-                                parsed_data = await self._parse_overview(company_name, data)
-                                await redis_cache.set(cache_key, parsed_data, ttl=self.cache_ttl)
-                                await redis_cache.delete(task_key)
-                                
-                                logger.info(f"✅ Background poll complete: {company_name} cached successfully!")
-                                return
-                            
-                            elif status == "failed":
-                                error_msg = data.get('error', 'Unknown error')
-                                logger.error(f"❌ Background poll failed: {company_name} - {error_msg}")
-                                await redis_cache.delete(task_key)
-                                return
-                        
-                        # Still running, wait 2 seconds
-                        await asyncio.sleep(2)
-                    
-                    except Exception as e:
-                        logger.error(f"Background poll error (attempt {attempt}): {e}")
-                        await asyncio.sleep(2)
-                
-                # Timeout
-                logger.warning(f"⏱️ Background poll timeout for {company_name} after 10 minutes")
-                await redis_cache.delete(task_key)
-        
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.get(
+                    f"{self.base_url}/research/tasks/{task_id}",
+                    headers={"X-API-Key": self.api_key}
+                )
+            if response.status_code == 200:
+                data = response.json()
+                status = data.get("status")
+
+                if status == "succeeded":
+                    parsed_data = await self._parse_overview(company_name, data)
+                    await redis_cache.set(
+                        cache_key, parsed_data,
+                        ttl=self.cache_stale_ttl, soft_ttl=self.cache_ttl
+                    )
+                    await redis_cache.delete(task_key)
+                    logger.info(f"✅ Background poll complete: {company_name} cached successfully!")
+                    company_key = payload.get("company_key") or await resolve_company_key(company_name)
+                    await self._update_company_record(company_key, parsed_data)
+                    return
+
+                if status == "failed":
+                    error_msg = data.get('error', 'Unknown error')
+                    logger.error(f"❌ Background poll failed: {company_name} - {error_msg}")
+                    await redis_cache.delete(task_key)
+                    return
+            else:
+                logger.warning(f"Background poll for {company_name}: HTTP {response.status_code}")
         except Exception as e:
-            logger.error(f"Background polling crashed for {company_name}: {e}")
+            logger.error(f"Background poll error for {company_name}: {e}")
+
+        if time.time() >= deadline:
+            logger.warning(f"⏱️ Background poll timeout for {company_name} (task: {task_id})")
             await redis_cache.delete(task_key)
+            return
+        logger.debug(f"Background poll: {company_name} - {status or 'unknown'}, checking again shortly")
+        await poll_queue.enqueue("research_poll", {**payload, "deadline": deadline})
     
+    async def _update_company_record(self, company_key: str, overview: Dict[str, Any]):
+        """
+        Write a finished research overview into the company's cached record,
+        if it has one, and mark the overview section fresh. Only the head and
+        the overview section are written.
+        """
+        try:
+            head = await get_cached_company(company_key, sections=())
+            if not head:
+                return
+            now = datetime.utcnow().isoformat()
+            # A record cached whole is split into sections on the way
+            sections = {**head.get("data", {}), "overview": CompanyOverview(**overview).model_dump()}
+            head = {key: value for key, value in head.items() if key != "data"}
+            head["section_updated_at"] = {**head.get("section_updated_at", {}), "overview": now}
+            head["metadata"] = {**head.get("metadata", {}), "last_updated": now}
+            await cache_company_sections(head["id"], head, sections)
+            logger.info(f"✓ Research overview written to the cached record of {company_key}")
+        except Exception as e:
+            logger.warning(f"Could not update the cached record of {company_key}: {e}")
+
     async def _parse_overview(self, company_name: str, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Pass Yutori raw content to OpenAI for structured JSON extraction."""
         result = raw_data.get("result", "")
@@ -337,3 +383,23 @@ Rules:
         except Exception as e:
             logger.warning(f"OpenAI overview parsing failed for {company_name}: {e}")
             return fallback
+
+
+@register_job_handler("research_poll")
+async def run_research_poll_job(payload: Dict[str, Any]):
+    await ResearchService()._poll_and_cache(payload)
+
+
+@register_key_migration("yutori:research:")
+def research_key_from_name_key(key: str) -> str:
+    """
+    Research results used to be keyed by the lowercased company name with
+    underscores for spaces; they are now keyed by the canonical company key.
+    """
+    return ResearchService()._get_cache_key(company_key(key.split(":", 3)[-1].replace("_", " ")))
+
+
+@register_job_handler("refresh_research")
+async def run_research_refresh_job(payload: Dict[str, Any]):
+    """Re-research a company whose cached overview went stale"""
+    await ResearchService()._start_deep_research(payload["company_name"])
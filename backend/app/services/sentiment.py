@@ -1,7 +1,9 @@
 import httpx
 import asyncio
 from app.config import settings
-from app.core.cache import redis_cache
+from app.core.cache import read_through
+from app.core.entities import resolve_company_key
+from app.core.jobs import register_job_handler, schedule_refresh
 from typing import Dict, Any, List
 import logging
 from datetime import datetime, timedelta
@@ -17,48 +19,53 @@ class SentimentService:
         self.tavily_base_url = "https://api.tavily.com"
         self.openai_base_url = "https://api.openai.com/v1"
         self.timeout = 30.0
-        self.cache_ttl = 3600 * 6  # 6 hours cache for news (news changes frequently)
+        self.cache_ttl = 3600 * 6  # 6 hours fresh for news (news changes frequently)
+        self.cache_stale_ttl = 86400 * 2  # served stale while refreshing for up to 2 days
     
-    def _get_cache_key(self, company_name: str) -> str:
-        """Generate cache key for sentiment analysis"""
-        name_hash = hashlib.md5(company_name.lower().encode()).hexdigest()
-        return f"sentiment:news:{name_hash}:{company_name.lower().replace(' ', '_')}"
+    def _get_cache_key(self, company_key: str) -> str:
+        """Generate cache key for sentiment analysis from its canonical company key"""
+        key_hash = hashlib.md5(company_key.encode()).hexdigest()
+        return f"sentiment:news:{key_hash}:{company_key}"
     
-    async def analyze_news(self, company_name: str) -> Dict[str, Any]:
-        """Analyze news sentiment using Tavily + OpenAI with Redis caching"""
+    async def analyze_news(self, company_name: str, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Analyze news sentiment using Tavily + OpenAI with Redis caching.
+        Concurrent misses share one Tavily + OpenAI pipeline; stale cached
+        sentiment is returned immediately and refreshed in the background.
+        """
         logger.info(f"Analyzing news sentiment for: {company_name}")
+        cache_key = self._get_cache_key(await resolve_company_key(company_name))
         
-        # Check cache first
-        cache_key = self._get_cache_key(company_name)
-        cached_result = await redis_cache.get(cache_key)
-        
-        if cached_result:
-            logger.info(f"✓ Cache HIT for sentiment of {company_name}")
-            return cached_result
-        
-        logger.info(f"Cache MISS for sentiment - calling Tavily + OpenAI APIs")
-        
-        if not self.tavily_key:
-            raise Exception("Tavily API key not configured")
-        if not self.openai_key:
-            raise Exception("OpenAI API key not configured")
-        
-        try:
-            # Search for recent news using Tavily
-            news_results = await self._search_news(company_name)
+        async def fetch():
+            logger.info(f"Cache MISS for sentiment - calling Tavily + OpenAI APIs")
             
-            # Analyze sentiment using OpenAI
-            sentiment_data = await self._analyze_sentiment_with_openai(company_name, news_results)
+            if not self.tavily_key:
+                raise Exception("Tavily API key not configured")
+            if not self.openai_key:
+                raise Exception("OpenAI API key not configured")
             
-            # Cache the result for 6 hours (news changes frequently)
-            await redis_cache.set(cache_key, sentiment_data, ttl=self.cache_ttl)
-            logger.info(f"✓ Cached sentiment data for {company_name} (TTL: 6 hours)")
+            try:
+                # Search for recent news using Tavily
+                news_results = await self._search_news(company_name)
+                
+                # Analyze sentiment using OpenAI
+                sentiment_data = await self._analyze_sentiment_with_openai(company_name, news_results)
+                logger.info(f"✓ Cached sentiment data for {company_name} (TTL: 6 hours)")
+                
+                return sentiment_data
             
-            return sentiment_data
+            except Exception as e:
+                logger.error(f"Error analyzing sentiment: {e}")
+                raise
+        
+        async def refresh():
+            await schedule_refresh(cache_key, "refresh_sentiment", {"company_name": company_name})
         
-        except Exception as e:
-            logger.error(f"Error analyzing sentiment: {e}")
-            raise
+        # Fresh for 6 hours (news changes frequently), served stale for 2 days
+        return await read_through(
+            cache_key, fetch, ttl=self.cache_stale_ttl, soft_ttl=self.cache_ttl,
+            on_stale=refresh, force_refresh=force_refresh
+        )
     
     async def _search_news(self, company_name: str) -> Dict[str, Any]:
         """Search for news using Tavily API"""
@@ -209,3 +216,9 @@ Return ONLY valid JSON, no markdown or explanation."""
         
         timeline.reverse()
         return timeline
+
+
+@register_job_handler("refresh_sentiment")
+async def run_sentiment_refresh_job(payload: Dict[str, Any]):
+    """Re-analyze news whose cached sentiment went stale"""
+    await SentimentService().analyze_news(payload["company_name"], force_refresh=True)
@@ -0,0 +1,61 @@
+"""
+Background job worker for CompanyIntel.
+
+Consumes the analysis, enrichment, batch, prewarm and poll job streams in Redis and runs
+the cache prewarm scheduler and schema migrator. Run as many of these as needed, on any number of nodes:
+
+    python -m app.worker
+
+The API process also runs an embedded worker unless EMBEDDED_WORKER=false.
+"""
+
+from app.core.database import init_neo4j, close_neo4j
+from app.core.cache import init_redis, close_redis
+from app.core.jobs import analysis_queue, enrichment_queue, batch_queue, prewarm_queue, poll_queue
+from app.core.prewarm import prewarm_scheduler
+from app.core.migrations import cache_migrator
+import app.core.batch  # noqa: F401 — registers the job handlers
+import asyncio
+import logging
+import signal
+
+logger = logging.getLogger(__name__)
+
+
+async def run_workers(stop: asyncio.Event):
+    """Consume every job stream, prewarm popular companies and migrate outdated cache entries until `stop` is set"""
+    await asyncio.gather(
+        analysis_queue.consume(stop),
+        enrichment_queue.consume(stop),
+        batch_queue.consume(stop),
+        prewarm_queue.consume(stop),
+        poll_queue.consume(stop),
+        prewarm_scheduler.run(stop),
+        cache_migrator.run(stop),
+    )
+
+
+async def main():
+    logger.info("Starting CompanyIntel worker...")
+    await init_neo4j()
+    await init_redis()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await run_workers(stop)
+    finally:
+        logger.info("Shutting down worker...")
+        await close_neo4j()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
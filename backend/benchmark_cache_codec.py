@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark cache payload encodings on real company records
+
+Compares the legacy plain-JSON format with the binary envelope of
+app.core.codec, uncompressed and zstd-compressed: stored size and
+encode/decode time per record.
+
+Usage:
+    python benchmark_cache_codec.py                  # Sample up to 50 records from the cache
+    python benchmark_cache_codec.py <file.json>...   # Use records exported to JSON files
+    python benchmark_cache_codec.py --limit 200      # Sample more records from the cache
+
+Records are read from the configured cache backend, so CACHE_BACKEND=sqlite
+benchmarks a local cache file without a Redis server.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from app.core import codec
+from app.core.cache import redis_cache, CacheEntry
+from app.config import settings
+
+ROUNDS = 200
+
+async def load_from_cache(limit):
+    """Sample company records and Yutori/Tavily payloads from the cache"""
+    await redis_cache.connect()
+    store = redis_cache.store
+    if not store:
+        return []
+    try:
+        records = []
+        for pattern in ("company:*", "yutori:*", "tavily:*", "sentiment:*"):
+            async for key in store.scan(pattern):
+                if key.startswith(("company:alias:", "yutori:task:")):
+                    continue
+                value = await redis_cache.get(key)
+                if isinstance(value, (dict, list)):
+                    records.append(value)
+                if len(records) >= limit:
+                    return records
+        return records
+    finally:
+        await redis_cache.close()
+
+def load_from_files(paths):
+    records = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        records.extend(data if isinstance(data, list) else [data])
+    return records
+
+def legacy_encode(value):
+    return json.dumps(value, default=str).encode()
+
+def envelope_encode(value):
+    enabled = settings.cache_compression_enabled
+    settings.cache_compression_enabled = False
+    try:
+        return codec.encode(value)
+    finally:
+        settings.cache_compression_enabled = enabled
+
+def compressed_encode(value):
+    enabled, threshold = settings.cache_compression_enabled, settings.cache_compression_min_bytes
+    settings.cache_compression_enabled, settings.cache_compression_min_bytes = True, 0
+    try:
+        return codec.encode(value)
+    finally:
+        settings.cache_compression_enabled, settings.cache_compression_min_bytes = enabled, threshold
+
+def measure(records, encode, decode):
+    """Total stored bytes and mean encode/decode microseconds per record"""
+    encoded = [encode(record) for record in records]
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for record in records:
+            encode(record)
+    encode_us = (time.perf_counter() - start) / (ROUNDS * len(records)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for raw in encoded:
+            decode(raw)
+    decode_us = (time.perf_counter() - start) / (ROUNDS * len(records)) * 1e6
+
+    return sum(len(raw) for raw in encoded), encode_us, decode_us
+
+async def main():
+    args = sys.argv[1:]
+    limit = 50
+    if "--limit" in args:
+        index = args.index("--limit")
+        limit = int(args[index + 1])
+        del args[index:index + 2]
+
+    records = load_from_files(args) if args else await load_from_cache(limit)
+    if not records:
+        print("\n✗ No records found. Analyze a few companies first or pass JSON files.\n")
+        return
+
+    formats = [
+        ("Legacy JSON", legacy_encode, lambda raw: CacheEntry.decode(raw.decode())),
+        ("Envelope (orjson)" if codec.orjson else "Envelope (json)", envelope_encode, CacheEntry.decode),
+    ]
+    if codec.zstandard:
+        formats.append((f"Envelope + zstd-{settings.cache_compression_level}", compressed_encode, CacheEntry.decode))
+    else:
+        print("\n⚠️  zstandard is not installed, skipping compressed format")
+
+    print(f"\n📊 {len(records)} records, {ROUNDS} rounds each:\n")
+    print(f"  {'Format':<24} {'Total size':>12} {'Ratio':>7} {'Encode µs':>11} {'Decode µs':>11}")
+    baseline = None
+    for name, encode, decode in formats:
+        size, encode_us, decode_us = measure(records, encode, decode)
+        baseline = baseline or size
+        print(f"  {name:<24} {size:>12,} {size / baseline:>7.2f} {encode_us:>11.1f} {decode_us:>11.1f}")
+    print()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,40 +3,119 @@
 Redis Cache Manager for CompanyIntel
 
 Usage:
-    python cache_manager.py list              # List all cached keys
+    python cache_manager.py list [pattern]    # Stream cached keys with their TTL
     python cache_manager.py get <key>         # Get value for a key
     python cache_manager.py delete <key>      # Delete a key
-    python cache_manager.py clear <pattern>   # Clear keys matching pattern
-    python cache_manager.py stats             # Show cache statistics
+    python cache_manager.py clear <pattern>   # Clear keys matching pattern, in chunks
+    python cache_manager.py clear <pattern> --dry-run    # Count matching keys, delete nothing
+    python cache_manager.py clear <pattern> --rate 500   # Delete at most 500 keys/s (0: no limit)
+    python cache_manager.py stats             # Per-namespace counts, sizes, TTLs and biggest keys
+    python cache_manager.py stats --sample 0.1  # Measure sizes of 10% of keys (large keyspaces)
+    python cache_manager.py migrate-aliases   # Replace duplicated company records with alias keys
+
+Add --json to list (one JSON object per line) or stats for machine-readable output.
 """
 
 import asyncio
+import heapq
+import time
+import random
 import sys
 import json
-from app.core.cache import redis_cache
+from collections import Counter
+from app.core.cache import redis_cache, COMPANY_SECTIONS
+from app.core.metrics import namespace_of
 from app.config import settings
 import redis.asyncio as redis
 
-async def list_keys(pattern="*"):
-    """List all keys matching pattern"""
+# Keys per pipelined TTL / MEMORY USAGE round trip
+BATCH_SIZE = 500
+
+# Upper bounds (seconds) of the TTL distribution buckets
+TTL_BUCKETS = [(3600, "< 1h"), (86400, "< 1d"), (86400 * 7, "< 7d"), (None, ">= 7d")]
+
+async def connect(require_redis=False):
+    """
+    Connect to the cache the API uses, or exit non-zero. With Redis down the
+    manager would otherwise read its own empty in-process fallback and report
+    an empty cache as if it were real.
+    """
     await redis_cache.connect()
+    if (settings.cache_backend == "redis" or require_redis) and not redis_cache.client:
+        await redis_cache.close()
+        sys.exit("\n✗ Redis is unreachable (check REDIS_URL); refusing to report on an in-process fallback\n")
+    if settings.cache_backend == "memory":
+        await redis_cache.close()
+        sys.exit("\n✗ The memory cache backend lives inside each API process and cannot be inspected from here\n")
+
+async def scan_batches(pattern="*"):
+    """Stream keys matching pattern in batches, never holding the whole keyspace"""
+    batch = []
+    async for key in redis_cache.store.scan(pattern):
+        batch.append(key)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def inspect_keys(keys, sample=0.0):
+    """
+    (key, ttl, size) for a batch of keys in one round trip. Sizes are only
+    measured for a `sample` fraction of the keys and are None for the rest.
+    Keys that expired since the scan are left out.
+    """
+    sized = [key for key in keys if sample >= 1 or random.random() < sample]
+    async with redis_cache.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.ttl(key)
+        for key in sized:
+            pipe.size(key)
+    if len(pipe.results) != len(keys) + len(sized):
+        return []  # the pipeline failed, already logged
+    sizes = dict(zip(sized, pipe.results[len(keys):]))
+    return [
+        (key, ttl, sizes.get(key))
+        for key, ttl in zip(keys, pipe.results[:len(keys)])
+        if ttl != -2
+    ]
+
+def _ttl_bucket(ttl):
+    if ttl < 0:
+        return "no expiry"
+    for bound, label in TTL_BUCKETS:
+        if bound is None or ttl < bound:
+            return label
+
+def _human(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+async def list_keys(pattern="*", as_json=False):
+    """List keys matching pattern as they are scanned (unsorted), as JSON lines with --json"""
+    await connect()
     try:
-        keys = []
-        async for key in redis_cache.client.scan_iter(match=pattern):
-            ttl = await redis_cache.client.ttl(key)
-            keys.append({"key": key, "ttl": ttl})
-        
-        print(f"\n📦 Found {len(keys)} keys matching '{pattern}':\n")
-        for item in sorted(keys, key=lambda x: x['key']):
-            ttl_str = f"{item['ttl']}s" if item['ttl'] > 0 else "no expiry"
-            print(f"  • {item['key']} (TTL: {ttl_str})")
-        print()
+        if not as_json:
+            print(f"\n📦 Keys matching '{pattern}':\n")
+        count = 0
+        async for batch in scan_batches(pattern):
+            for key, ttl, _ in await inspect_keys(batch):
+                count += 1
+                if as_json:
+                    print(json.dumps({"key": key, "ttl": ttl}))
+                else:
+                    ttl_str = f"{ttl}s" if ttl > 0 else "no expiry"
+                    print(f"  • {key} (TTL: {ttl_str})")
+        if not as_json:
+            print(f"\n  {count} keys\n")
     finally:
         await redis_cache.close()
 
 async def get_key(key):
     """Get value for a specific key"""
-    await redis_cache.connect()
+    await connect()
     try:
         value = await redis_cache.get(key)
         if value:
@@ -50,77 +129,199 @@ async def get_key(key):
 
 async def delete_key(key):
     """Delete a specific key"""
-    await redis_cache.connect()
+    await connect()
     try:
         await redis_cache.delete(key)
         print(f"\n✓ Deleted key: {key}\n")
     finally:
         await redis_cache.close()
 
-async def clear_pattern(pattern):
-    """Clear all keys matching pattern"""
-    await redis_cache.connect()
+# Default cap on keys deleted per second by `clear`, so the live API keeps its latency
+CLEAR_RATE = 2000
+
+async def clear_pattern(pattern, dry_run=False, rate=CLEAR_RATE):
+    """
+    Clear keys matching pattern while scanning: each chunk of BATCH_SIZE keys
+    is UNLINKed (freed off the Redis main thread) and dropped from every
+    process's L1, at most `rate` keys per second. With `dry_run` the matching
+    keys are only counted.
+    """
+    await connect()
     try:
-        keys = []
-        async for key in redis_cache.client.scan_iter(match=pattern):
-            keys.append(key)
-        
-        if keys:
-            await redis_cache.client.delete(*keys)
-            print(f"\n✓ Deleted {len(keys)} keys matching '{pattern}'\n")
+        store = redis_cache.store
+        matched = 0
+        deleted = 0
+        examples = []
+        started = time.monotonic()
+        async for batch in scan_batches(pattern):
+            matched += len(batch)
+            if dry_run:
+                examples.extend(batch[:10 - len(examples)])
+                continue
+            try:
+                deleted += await store.unlink(*batch)
+            except Exception as e:
+                print(f"\n✗ Delete failed after {deleted:,} keys: {e}\n")
+                return
+            await redis_cache.invalidate(*batch)
+            elapsed = time.monotonic() - started
+            print(f"\r  🗑️  {deleted:,} keys deleted ({deleted / max(elapsed, 1e-3):,.0f}/s)", end="", flush=True)
+            if rate:
+                # Sleep off any lead over the allowed rate before the next chunk
+                await asyncio.sleep(max(0.0, deleted / rate - elapsed))
+
+        if dry_run:
+            print(f"\n🔍 Dry run: {matched:,} keys match '{pattern}', nothing deleted")
+            for key in examples:
+                print(f"  • {key}")
+            print()
+        elif matched:
+            print(f"\n\n✓ Deleted {deleted:,} keys matching '{pattern}' in {time.monotonic() - started:.1f}s\n")
         else:
             print(f"\n✗ No keys found matching '{pattern}'\n")
     finally:
         await redis_cache.close()
 
-async def show_stats():
+def _bound(value):
+    """Histogram percentiles are bucket upper bounds; None means past the last bucket"""
+    return "over" if value is None else f"{value:g}"
+
+def _summarize(namespace):
+    """Report of one namespace; sizes are extrapolated from the sampled keys"""
+    avg = namespace["sampled_bytes"] / namespace["sampled"] if namespace["sampled"] else 0
+    return {
+        "keys": namespace["keys"],
+        "sampled": namespace["sampled"],
+        "total_bytes": round(avg * namespace["keys"]),
+        "avg_bytes": round(avg),
+        "ttl": dict(namespace["ttl"]),
+        "biggest": [{"key": key, "bytes": size} for size, key in sorted(namespace["biggest"], reverse=True)],
+    }
+
+async def collect_stats(sample=1.0):
+    """
+    Per-namespace key counts, sizes, TTL distribution and biggest keys, from
+    one streaming pass over the keyspace. Sizes are measured (Redis MEMORY
+    USAGE) for a `sample` fraction of the keys.
+    """
+    namespaces = {}
+    biggest = []
+    total = 0
+    async for batch in scan_batches():
+        for key, ttl, size in await inspect_keys(batch, sample):
+            total += 1
+            name = namespace_of(key)
+            namespace = namespaces.get(name)
+            if namespace is None:
+                namespace = namespaces[name] = {
+                    "keys": 0, "sampled": 0, "sampled_bytes": 0, "ttl": Counter(), "biggest": []
+                }
+            namespace["keys"] += 1
+            namespace["ttl"][_ttl_bucket(ttl)] += 1
+            if size is None:
+                continue
+            namespace["sampled"] += 1
+            namespace["sampled_bytes"] += size
+            for heap, limit in ((namespace["biggest"], 3), (biggest, 10)):
+                item = (size, key)
+                if len(heap) < limit:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+    report = {
+        "total_keys": total,
+        "sample": sample,
+        "namespaces": {name: _summarize(namespaces[name]) for name in sorted(namespaces)},
+        "biggest": [{"key": key, "bytes": size} for size, key in sorted(biggest, reverse=True)],
+        "backend": redis_cache.store.name,
+    }
+    if redis_cache.store.name == "redis":
+        info = await redis_cache.client.info("memory")
+        report["memory_used"] = info.get("used_memory_human", "unknown")
+    # Lookup metrics flushed by the API and worker processes
+    report["lookups"] = await redis_cache.namespace_metrics(include_local=False)
+    return report
+
+async def show_stats(sample=1.0, as_json=False):
     """Show cache statistics"""
-    await redis_cache.connect()
+    await connect()
     try:
-        # Count keys by type
-        yutori_research = 0
-        yutori_browsing = 0
-        tavily_competitors = 0
-        sentiment_news = 0
-        company_data = 0
-        progress_data = 0
-        other = 0
-        
-        async for key in redis_cache.client.scan_iter(match="*"):
-            if key.startswith("yutori:research:"):
-                yutori_research += 1
-            elif key.startswith("yutori:browsing:"):
-                yutori_browsing += 1
-            elif key.startswith("tavily:competitors:"):
-                tavily_competitors += 1
-            elif key.startswith("sentiment:news:"):
-                sentiment_news += 1
-            elif key.startswith("company:"):
-                company_data += 1
-            elif key.startswith("progress:"):
-                progress_data += 1
-            else:
-                other += 1
-        
-        total = yutori_research + yutori_browsing + tavily_competitors + sentiment_news + company_data + progress_data + other
-        
-        print("\n📊 Cache Statistics:\n")
-        print(f"  Total Keys: {total}")
-        print(f"\n  By Type:")
-        print(f"    • Yutori Research:    {yutori_research} (TTL: 7 days)")
-        print(f"    • Yutori Browsing:    {yutori_browsing} (TTL: 7 days)")
-        print(f"    • Tavily Competitors: {tavily_competitors} (TTL: 3 days)")
-        print(f"    • Sentiment/News:     {sentiment_news} (TTL: 6 hours)")
-        print(f"    • Company Data:       {company_data}")
-        print(f"    • Progress Data:      {progress_data} (TTL: 5 min)")
-        print(f"    • Other:              {other}")
-        print()
-        
-        # Memory info
-        info = await redis_cache.client.info("memory")
-        used_memory = info.get("used_memory_human", "unknown")
-        print(f"  Memory Used: {used_memory}")
+        report = await collect_stats(sample)
+        if as_json:
+            print(json.dumps(report, indent=2))
+            return
+
+        sampled = "" if sample >= 1 else f", sizes from a {sample:.0%} sample"
+        print(f"\n📊 Cache Statistics ({report['backend']}{sampled}):\n")
+        print(f"  Total Keys: {report['total_keys']:,}")
+        if "memory_used" in report:
+            print(f"  Memory Used: {report['memory_used']}")
+
+        ttl_labels = ["no expiry"] + [label for _, label in TTL_BUCKETS]
+        print(f"\n  {'Namespace':<22} {'Keys':>9} {'Total':>10} {'Avg':>9}  " + " ".join(f"{label:>9}" for label in ttl_labels))
+        for name, namespace in report["namespaces"].items():
+            print(f"  {name:<22} {namespace['keys']:>9,} {_human(namespace['total_bytes']):>10} "
+                  f"{_human(namespace['avg_bytes']):>9}  "
+                  + " ".join(f"{namespace['ttl'].get(label, 0):>9,}" for label in ttl_labels))
+
+        if report["biggest"]:
+            print("\n  Biggest keys:\n")
+            for item in report["biggest"]:
+                print(f"    {_human(item['bytes']):>10}  {item['key']}")
         print()
+
+        lookups = report["lookups"]
+        if lookups:
+            print("  Lookups (last hour, all processes):\n")
+            print(f"    {'Namespace':<20} {'Hits':>8} {'Misses':>8} {'Hit %':>7} {'L1 %':>6} "
+                  f"{'p50 ms':>7} {'p95 ms':>7} {'Write p95':>9} {'Mean size':>10} {'p95 size':>9}")
+            for name, m in lookups.items():
+                hit_pct = m["hit_rate"] * 100
+                l1_pct = m["l1_hits"] / m["hits"] * 100 if m["hits"] else 0.0
+                latency, writes, size = m["latency_ms"], m["write_latency_ms"], m["size_bytes"]
+                print(f"    {name:<20} {m['hits']:>8} {m['misses']:>8} {hit_pct:>6.1f}% {l1_pct:>5.0f}% "
+                      f"{_bound(latency['p50']):>7} {_bound(latency['p95']):>7} {_bound(writes['p95']):>9} "
+                      f"{size['mean']:>10,} {_bound(size['p95']):>9}")
+            print()
+    finally:
+        await redis_cache.close()
+
+async def migrate_company_aliases():
+    """
+    Collapse company records duplicated under slug and session keys into one
+    canonical `company:{id}` record plus `company:alias:{alias}` pointers.
+    When copies diverged, the most recently updated one becomes canonical.
+    """
+    await connect(require_redis=True)
+    try:
+        client = redis_cache.client
+        migrated = 0
+        canonical = 0
+        async for key in client.scan_iter(match="company:*"):
+            if key.startswith("company:alias:") or key.rsplit(":", 1)[-1] in COMPANY_SECTIONS:
+                continue
+            alias = key[len("company:"):]
+            record = await redis_cache.get(key)
+            if not isinstance(record, dict) or not record.get("id"):
+                continue
+            company_id = record["id"]
+            if company_id == alias:
+                canonical += 1
+                continue
+
+            ttl = await client.ttl(key)
+            ttl = ttl if ttl > 0 else settings.company_cache_ttl_seconds
+            current = await redis_cache.get(f"company:{company_id}")
+            updated = record.get("metadata", {}).get("last_updated", "")
+            if not current or updated > current.get("metadata", {}).get("last_updated", ""):
+                await redis_cache.set(f"company:{company_id}", record, ttl=ttl)
+            await client.set(f"company:alias:{alias}", company_id, ex=ttl)
+            await client.delete(key)
+            migrated += 1
+            print(f"  • {key} -> company:{company_id}")
+
+        print(f"\n✓ Migrated {migrated} duplicated records to aliases ({canonical} canonical records kept)\n")
     finally:
         await redis_cache.close()
 
@@ -129,6 +330,25 @@ def print_usage():
     print(__doc__)
 
 async def main():
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    if as_json:
+        args.remove("--json")
+    dry_run = "--dry-run" in args
+    if dry_run:
+        args.remove("--dry-run")
+    sample = 1.0
+    if "--sample" in args:
+        index = args.index("--sample")
+        sample = float(args[index + 1])
+        del args[index:index + 2]
+    rate = CLEAR_RATE
+    if "--rate" in args:
+        index = args.index("--rate")
+        rate = int(args[index + 1])
+        del args[index:index + 2]
+    sys.argv[1:] = args
+
     if len(sys.argv) < 2:
         print_usage()
         return
@@ -137,7 +357,7 @@ async def main():
     
     if command == "list":
         pattern = sys.argv[2] if len(sys.argv) > 2 else "*"
-        await list_keys(pattern)
+        await list_keys(pattern, as_json)
     
     elif command == "get":
         if len(sys.argv) < 3:
@@ -163,14 +383,20 @@ async def main():
             print()
             return
         pattern = sys.argv[2]
+        if dry_run:
+            await clear_pattern(pattern, dry_run=True)
+            return
         confirm = input(f"⚠️  Are you sure you want to delete all keys matching '{pattern}'? (yes/no): ")
         if confirm.lower() == "yes":
-            await clear_pattern(pattern)
+            await clear_pattern(pattern, rate=rate)
         else:
             print("\n✗ Cancelled\n")
     
     elif command == "stats":
-        await show_stats()
+        await show_stats(sample, as_json)
+
+    elif command == "migrate-aliases":
+        await migrate_company_aliases()
     
     else:
         print(f"\n✗ Unknown command: {command}\n")
@@ -11,7 +11,6 @@ Steps:
 import asyncio
 import json
 import re
-import hashlib
 import sys
 import httpx
 import os
@@ -19,6 +18,13 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Keys and values in the backend's own formats
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app.core.cache import CacheEntry
+from app.core.entities import company_key
+from app.services.browsing import BrowsingService
+from app.services.research import ResearchService
+
 YUTORI_KEY = os.environ["YUTORI_API_KEY"]
 YUTORI_BASE = "https://api.yutori.com/v1"
 HEADERS = {"X-API-Key": YUTORI_KEY}
@@ -37,20 +43,18 @@ REDIS_URL = os.environ["REDIS_URL"]
 
 async def redis_get(client, key):
     val = await client.get(key)
-    return json.loads(val) if val else None
+    return CacheEntry.decode(val).value if val else None
 
 async def redis_set(client, key, value, ttl=86400 * 7):
     await client.setex(key, ttl, json.dumps(value, default=str))
     print(f"  ✓ Cached → {key}")
 
 def research_key(name):
-    h = hashlib.md5(name.lower().encode()).hexdigest()
-    return f"yutori:research:{h}:{name.lower().replace(' ', '_')}"
+    # The canonical key, unless the alias index maps the name elsewhere
+    return ResearchService()._get_cache_key(company_key(name))
 
 def browsing_key(url):
-    h = hashlib.md5(url.lower().encode()).hexdigest()
-    clean = url.replace("https://","").replace("http://","")[:50]
-    return f"yutori:browsing:{h}:{clean}"
+    return BrowsingService()._get_cache_key(url)
 
 # ── HTML parsing helpers ───────────────────────────────────────────────────────
 
@@ -189,7 +193,7 @@ def parse_browsing_result(result_data: dict) -> dict:
 async def main():
     print("\n🚀 CompanyIntel Cache Populator\n")
 
-    redis = await aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+    redis = await aioredis.from_url(REDIS_URL)
 
     # ── Step 1: Re-parse research cache ───────────────────────────────────────
     print("━━━ Step 1: Re-parsing research cache ━━━")
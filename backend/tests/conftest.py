@@ -0,0 +1,15 @@
+import pytest
+
+from app.core.backends import MemoryBackend
+from app.core.cache import redis_cache
+
+
+@pytest.fixture
+def memory_cache(monkeypatch):
+    """Run the cache on an in-process memory backend, without Redis"""
+    monkeypatch.setattr(redis_cache, "_client", None)
+    monkeypatch.setattr(redis_cache, "_raw", None)
+    monkeypatch.setattr(redis_cache, "backend", MemoryBackend(1000))
+    redis_cache.local.clear()
+    yield redis_cache
+    redis_cache.local.clear()
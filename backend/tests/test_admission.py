@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.api.routes import _client_id
+from app.config import settings
+from app.core.admission import AdmissionController, AdmissionRejected, _client_key, QUEUED_KEY
+from app.core.cache import redis_cache
+from app.core.jobs import analysis_queue
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def request(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers(monkeypatch):
+    monkeypatch.setattr(settings, "admission_trusted_proxies", [])
+    assert _client_id(request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_forwarded_for_from_trusted_proxy_names_the_client(monkeypatch):
+    monkeypatch.setattr(settings, "admission_trusted_proxies", ["10.0.0.0/8"])
+    # The leftmost hop is whatever the caller sent; the proxy appended the real peer
+    assert _client_id(request("10.1.2.3", "198.51.100.1, 203.0.113.7")) == "203.0.113.7"
+    assert _client_id(request("10.1.2.3", "203.0.113.7, 10.9.9.9")) == "203.0.113.7"
+    assert _client_id(request("10.1.2.3")) == "10.1.2.3"
+
+
+def test_local_admission_enforces_the_per_client_limit(memory_cache, monkeypatch):
+    monkeypatch.setattr(settings, "admission_max_per_client", 2)
+    controller = AdmissionController()
+
+    async def go():
+        await controller.admit("s1", "client")
+        await controller.admit("s2", "client")
+        with pytest.raises(AdmissionRejected):
+            await controller.admit("s3", "client")
+        await controller.admit("s4", "other")
+
+    run(go())
+
+
+def test_concurrent_redis_admissions_cannot_exceed_the_per_client_limit(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    monkeypatch.setattr(settings, "admission_max_per_client", 3)
+    monkeypatch.setattr(redis_cache.breaker, "opened_at", None)
+
+    async def go():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        monkeypatch.setattr(redis_cache, "_client", client)
+        controller = AdmissionController()
+        results = await asyncio.gather(
+            *(controller.admit(f"s{i}", "client") for i in range(10)),
+            return_exceptions=True,
+        )
+        admitted = [r for r in results if not isinstance(r, Exception)]
+        rejected = [r for r in results if isinstance(r, AdmissionRejected)]
+        assert len(admitted) == 3 and len(rejected) == 7
+        assert await client.zcard(_client_key("client")) == 3
+        assert await client.zcard(QUEUED_KEY) == 3
+
+    run(go())
+
+
+def test_queue_positions_follow_the_live_analysis_consumers(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    monkeypatch.setattr(settings, "admission_max_per_client", 10)
+    monkeypatch.setattr(analysis_queue, "concurrency", 1)
+    monkeypatch.setattr(redis_cache.breaker, "opened_at", None)
+
+    async def go():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        monkeypatch.setattr(redis_cache, "_client", client)
+        controller = AdmissionController()
+        before = [(await controller.admit(f"a{i}", "client"))["queue_position"] for i in range(2)]
+
+        # Two workers register on the analysis stream
+        await client.xgroup_create(analysis_queue.stream, analysis_queue.group, id="0", mkstream=True)
+        for consumer in ("worker-1", "worker-2"):
+            await client.xreadgroup(analysis_queue.group, consumer, {analysis_queue.stream: ">"})
+        after = [(await controller.admit(f"b{i}", "client"))["queue_position"] for i in range(2)]
+        return before, after
+
+    assert run(go()) == ([0, 1], [1, 2])
@@ -0,0 +1,101 @@
+import asyncio
+import types
+
+import pytest
+
+from app.core import batch
+from app.core.cache import (
+    cache_company, get_progress_updates, get_section_updates, redis_cache, update_progress
+)
+from app.core.entities import ALIAS_PREFIX
+from app.core.orchestrator import STAGE_SECTIONS
+
+ALL_SECTIONS = list(STAGE_SECTIONS.values())
+
+
+@pytest.fixture
+def enqueued(monkeypatch, memory_cache):
+    calls = []
+
+    async def enqueue_many(job_type, payloads):
+        calls.append((job_type, payloads))
+        return [None] * len(payloads)
+
+    monkeypatch.setattr(batch.batch_queue, "enqueue_many", enqueue_many)
+    return calls
+
+
+def test_batch_queues_misses_in_one_call_and_returns_cached_hits(enqueued):
+    async def go():
+        await redis_cache.set(f"{ALIAS_PREFIX}openai", "openaicanonical")
+        await cache_company("openai-id", {"id": "openai-id", "status": "completed", "sections": ALL_SECTIONS,
+                                          "data": {}}, aliases=["openaicanonical"])
+        return await batch.start_batch(["OpenAI", "Stripe", "Anthropic"], {})
+
+    result = asyncio.run(go())
+
+    assert result["cached"] == 1 and result["queued"] == 2
+    assert [item["status"] for item in result["items"]] == ["cached", "queued", "queued"]
+    assert len(enqueued) == 1
+    job_type, payloads = enqueued[0]
+    assert job_type == "batch_analyze"
+    assert [payload["company_name"] for payload in payloads] == ["Stripe", "Anthropic"]
+
+
+def test_batch_dedupes_names_and_reports_rejected_ones(enqueued):
+    result = asyncio.run(batch.start_batch(["Stripe", "stripe inc.", "  ", "小米", "!!!", "华为"], {}))
+
+    assert [item["company_name"] for item in result["items"]] == ["Stripe", "小米", "华为"]
+    assert result["rejected"] == ["  ", "!!!"]
+
+
+def test_cached_result_missing_requested_sections_is_queued(enqueued):
+    async def go():
+        await cache_company("stripe-id", {
+            "id": "stripe-id", "status": "completed", "data": {},
+            "sections": [s for s in ALL_SECTIONS if s != "products_apis"],
+        }, aliases=["stripe"])
+        with_apis = await batch.start_batch(["Stripe"], {})
+        without_apis = await batch.start_batch(["Stripe"], {"include_apis": False})
+        return with_apis, without_apis
+
+    with_apis, without_apis = asyncio.run(go())
+
+    assert [item["status"] for item in with_apis["items"]] == ["queued"]
+    assert [item["status"] for item in without_apis["items"]] == ["cached"]
+
+
+def test_coalesced_item_is_recorded_by_a_poll_job_without_holding_its_slot(memory_cache, monkeypatch):
+    polls = []
+
+    class FollowerOrchestrator:
+        def __init__(self, session_id):
+            self.flight = types.SimpleNamespace(is_leader=False)
+
+        async def analyze(self, company_name, options):
+            pass
+
+    async def enqueue(job_type, payload):
+        polls.append((job_type, payload))
+
+    monkeypatch.setattr(batch, "CompanyOrchestrator", FollowerOrchestrator)
+    monkeypatch.setattr(batch.poll_queue, "enqueue", enqueue)
+    monkeypatch.setattr(batch.settings, "batch_poll_interval_seconds", 0)
+    payload = {"batch_id": "b1", "session_id": "s1", "company_name": "Stripe", "options": {}}
+
+    async def go():
+        await batch._init_counters("b1", 1)
+        await batch.run_batch_item_job(payload)
+        before = await get_section_updates("b1")
+
+        # The leader finishes and fans its result out to the attached session
+        await cache_company("stripe-id", {"id": "stripe-id", "status": "completed", "data": {}}, aliases=["s1"])
+        await update_progress("s1", {"type": "completed"})
+        await batch.run_batch_item_poll_job(polls[-1][1])
+        return before, await get_section_updates("b1"), await get_progress_updates("b1")
+
+    before, after, progress = asyncio.run(go())
+
+    assert before == [] and [job_type for job_type, _ in polls] == ["batch_item_poll"]
+    assert [(item["status"], item["company_id"]) for item in after] == [("completed", "stripe-id")]
+    assert progress["done"] == 1 and progress["type"] == "completed"
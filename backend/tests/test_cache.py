@@ -0,0 +1,29 @@
+import asyncio
+
+from app.core.cache import cache_company, get_cached_companies, get_cached_company
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_section_keys_do_not_resolve_as_company_records(memory_cache):
+    async def go():
+        await cache_company("acme-id", {
+            "id": "acme-id",
+            "status": "completed",
+            "data": {"overview": {"name": "Acme"}},
+        })
+        # Read the record first, so the section is in L1 as well
+        record = await get_cached_company("acme-id")
+        return (
+            record,
+            await get_cached_company("acme-id:overview"),
+            await get_cached_company("acme-id:overview"),
+            await get_cached_companies(["acme-id:overview", "acme-id"]),
+        )
+
+    record, first, second, batch = run(go())
+    assert record["data"]["overview"] == {"name": "Acme"}
+    assert first is None and second is None
+    assert batch[0] is None and batch[1]["id"] == "acme-id"
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app.config import settings
+from app.core import codec
+
+
+def test_round_trip_small_value_is_uncompressed():
+    value = {"name": "Acme", "apis": [{"path": "/v1/charges", "method": "GET"}], "score": 4.5}
+    raw = codec.encode(value)
+
+    assert raw.startswith(codec.MAGIC)
+    assert raw[len(codec.MAGIC)] == codec.VERSION
+    assert raw[len(codec.MAGIC) + 1] & codec.FLAG_ZSTD == 0
+    assert codec.decode(raw) == value
+
+
+@pytest.mark.skipif(codec.zstandard is None, reason="zstandard is not installed")
+def test_round_trip_large_value_is_compressed():
+    value = {"raw_content": "endpoint " * settings.cache_compression_min_bytes}
+    raw = codec.encode(value)
+
+    assert raw[len(codec.MAGIC) + 1] & codec.FLAG_ZSTD
+    assert len(raw) < len(json.dumps(value))
+    assert codec.decode(raw) == value
+
+
+def test_compression_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "cache_compression_enabled", False)
+    value = {"raw_content": "x" * (settings.cache_compression_min_bytes * 2)}
+    raw = codec.encode(value)
+
+    assert raw[len(codec.MAGIC) + 1] & codec.FLAG_ZSTD == 0
+    assert codec.decode(raw) == value
+
+
+def test_non_string_keys_and_unserializable_values_are_encoded():
+    raw = codec.encode({1: "one", "when": object.__new__(object)})
+    decoded = codec.decode(raw)
+
+    assert decoded["1"] == "one"
+    assert isinstance(decoded["when"], str)
+
+
+@pytest.mark.parametrize("legacy", [
+    json.dumps({"name": "Acme"}).encode(),
+    json.dumps({"name": "Acme"}),
+])
+def test_legacy_plain_json_entries_still_decode(legacy):
+    assert codec.decode(legacy) == {"name": "Acme"}
+
+
+def test_unknown_envelope_version_is_rejected():
+    raw = codec.MAGIC + bytes((codec.VERSION + 1, 0)) + b"{}"
+
+    with pytest.raises(ValueError, match="version"):
+        codec.decode(raw)
+
+
+def test_compressed_entry_without_zstandard_is_rejected(monkeypatch):
+    raw = codec.MAGIC + bytes((codec.VERSION, codec.FLAG_ZSTD)) + b"\x28\xb5\x2f\xfd"
+    monkeypatch.setattr(codec, "_decompressor", None)
+
+    with pytest.raises(ValueError, match="zstandard"):
+        codec.decode(raw)
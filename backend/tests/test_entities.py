@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.core.entities import (
+    ALIAS_PREFIX, company_key, learn_company_aliases, normalize_domain,
+    resolve_company_key, resolve_company_keys
+)
+from app.core.cache import redis_cache
+
+
+@pytest.mark.parametrize("name", ["OpenAI", "Open AI", "openai inc.", "The OpenAI, Inc.", "  OPENAI  "])
+def test_spellings_of_a_company_share_one_key(name):
+    assert company_key(name) == "openai"
+
+
+@pytest.mark.parametrize("name, key", [
+    ("Bain & Company", "bain"),
+    ("AT&T", "att"),
+    ("Johnson & Johnson", "johnsonjohnson"),
+    ("McDonald's", "mcdonalds"),
+    ("Société Générale", "societegenerale"),
+    ("The Group", "group"),
+])
+def test_punctuation_accents_and_legal_suffixes(name, key):
+    assert company_key(name) == key
+
+
+def test_non_latin_names_keep_distinct_keys():
+    assert company_key("小米") == "小米"
+    assert company_key("Яндекс") == "яндекс"
+    assert company_key("小米") != company_key("华为")
+
+
+@pytest.mark.parametrize("name", ["", "   ", "!!!", None])
+def test_names_without_words_have_no_key(name):
+    assert company_key(name) == ""
+
+
+@pytest.mark.parametrize("website, domain", [
+    ("https://www.OpenAI.com/about", "openai.com"),
+    ("http://stripe.com:8080/docs?x=1", "stripe.com"),
+    ("openai.com", "openai.com"),
+    ("docs.stripe.com/api", "docs.stripe.com"),
+    ("", ""),
+])
+def test_normalize_domain(website, domain):
+    assert normalize_domain(website) == domain
+
+
+def test_resolve_company_key_follows_learned_aliases(memory_cache):
+    async def go():
+        before = await resolve_company_key("Facebook")
+        await learn_company_aliases("meta", "Facebook", "Meta Platforms")
+        return before, await resolve_company_key("facebook inc"), await resolve_company_key("Unknown Co")
+
+    assert asyncio.run(go()) == ("facebook", "meta", "unknown")
+
+
+def test_shared_domain_keeps_the_first_owner_canonical(memory_cache):
+    async def go():
+        await learn_company_aliases("google", "Google", website="https://google.com")
+        canonical = await learn_company_aliases("alphabet", "Alphabet", website="https://www.google.com/")
+        return canonical, await resolve_company_key("Alphabet Inc.")
+
+    assert asyncio.run(go()) == ("google", "google")
+
+
+def test_resolve_company_keys_matches_single_lookups(memory_cache):
+    names = ["Facebook", "Stripe", "", "小米"]
+
+    async def go():
+        await redis_cache.set(f"{ALIAS_PREFIX}facebook", "meta")
+        return await resolve_company_keys(names), [await resolve_company_key(name) for name in names]
+
+    batched, single = asyncio.run(go())
+    assert batched == single == ["meta", "stripe", "", "小米"]
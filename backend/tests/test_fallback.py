@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.core.backends import CacheBackend, MemoryBackend, RedisBackend
+from app.core.cache import CacheEntry, redis_cache
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+@pytest.fixture
+def outage(monkeypatch):
+    """Redis (fakeredis) behind an open circuit, with values in the memory fallback"""
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(settings, "redis_reconnect_backoff_base_seconds", 0)
+    text = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    raw = fakeredis.aioredis.FakeRedis(server=text.connection_pool.connection_kwargs["server"])
+    monkeypatch.setattr(redis_cache, "_client", text)
+    monkeypatch.setattr(redis_cache, "_raw", raw)
+    monkeypatch.setattr(redis_cache, "_redis_store", RedisBackend(raw))
+    monkeypatch.setattr(redis_cache, "backend", None)
+    monkeypatch.setattr(redis_cache, "fallback", MemoryBackend(100))
+    monkeypatch.setattr(redis_cache, "_start_listener", lambda: None)
+    monkeypatch.setattr(redis_cache.breaker, "opened_at", None)
+    redis_cache.local.clear()
+    redis_cache.breaker.open()
+    yield raw
+    redis_cache.breaker.record_success()
+    redis_cache.local.clear()
+
+
+def test_reconnect_writes_outage_values_back_to_redis(outage):
+    raw = outage
+
+    async def go():
+        # Stored in Redis before the outage, then recomputed during it
+        await raw.setex("tavily:old", 3600, CacheEntry.encode({"v": "before"}))
+        await asyncio.sleep(0.01)
+        await redis_cache.set("tavily:old", {"v": "during"}, ttl=3600)
+        await redis_cache.set("tavily:new", {"v": "new"}, ttl=600)
+        await redis_cache.push("progress:s1:sections", {"section": "overview"}, ttl=300)
+
+        await redis_cache._reconnect()
+
+        return (
+            CacheEntry.decode(await raw.get("tavily:old")).value,
+            CacheEntry.decode(await raw.get("tavily:new")).value,
+            await raw.ttl("tavily:new"),
+            await redis_cache.range("progress:s1:sections"),
+            await redis_cache.fallback.get("tavily:new"),
+        )
+
+    old, new, ttl, sections, left_in_fallback = asyncio.run(go())
+    assert old == {"v": "during"}
+    assert new == {"v": "new"}
+    assert 0 < ttl <= 600
+    assert sections == [{"section": "overview"}]
+    assert left_in_fallback is None
+
+
+def test_reconnect_keeps_values_redis_stored_later(outage):
+    raw = outage
+
+    async def go():
+        await redis_cache.set("tavily:key", {"v": "fallback"}, ttl=3600, soft_ttl=600)
+        await asyncio.sleep(0.01)
+        # Another process could still reach Redis and stored a newer value
+        await raw.setex("tavily:key", 3600, CacheEntry.encode({"v": "redis"}, soft_ttl=600))
+        await redis_cache._reconnect()
+        return CacheEntry.decode(await raw.get("tavily:key")).value
+
+    assert asyncio.run(go()) == {"v": "redis"}
+
+
+def test_writes_made_during_the_write_back_stay_in_the_fallback(outage):
+    fallback = redis_cache.fallback
+    target = redis_cache._redis_store
+    copy = target.set
+
+    async def set_while_writing_back(key, value, ttl=None):
+        await copy(key, value, ttl)
+        if key == "tavily:a":
+            # Still failing over: these land in the fallback mid-scan
+            await fallback.set("tavily:a", CacheEntry.encode({"v": "rewritten"}), 600)
+            await fallback.set("tavily:late", CacheEntry.encode({"v": "late"}), 600)
+
+    async def go():
+        await redis_cache.set("tavily:a", {"v": "a"}, ttl=600)
+        await redis_cache.set("tavily:b", {"v": "b"}, ttl=600)
+        target.set = set_while_writing_back
+        try:
+            await redis_cache._reconnect()
+        finally:
+            del target.set
+        return [await fallback.get(key) for key in ("tavily:a", "tavily:b", "tavily:late")]
+
+    rewritten, copied, late = asyncio.run(go())
+    assert CacheEntry.decode(rewritten).value == {"v": "rewritten"}
+    assert copied is None
+    assert CacheEntry.decode(late).value == {"v": "late"}
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.core.cache import redis_cache
+from app.core import jobs
+from app.core.jobs import JobQueue
+
+
+def test_finished_jobs_leave_the_stream_and_depth_counts_the_backlog(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(redis_cache.breaker, "opened_at", None)
+    done = []
+
+    async def handle(payload):
+        done.append(payload["n"])
+
+    monkeypatch.setitem(jobs._handlers, "test_job", handle)
+
+    async def go():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        monkeypatch.setattr(redis_cache, "_client", client)
+        queue = JobQueue("jobs:test", concurrency=2)
+        await queue._ensure_group(client)
+        await queue.enqueue_many("test_job", [{"n": i} for i in range(3)])
+
+        # One delivered but unacked, two never delivered
+        response = await client.xreadgroup(queue.group, "w1", {queue.stream: ">"}, count=1)
+        (message_id, fields), = response[0][1]
+        before = await queue.metrics()
+
+        await queue._process(client, "w1", message_id, fields)
+        after = await queue.metrics()
+        return before, after, await client.xlen(queue.stream)
+
+    before, after, length = asyncio.run(go())
+    assert done == [0]
+    assert (before["waiting"], before["pending"], before["depth"]) == (2, 1, 3)
+    assert (after["waiting"], after["pending"], after["depth"]) == (2, 0, 2)
+    assert length == 2
+
+
+def test_dead_lettered_jobs_are_deleted_from_the_stream(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(redis_cache.breaker, "opened_at", None)
+    monkeypatch.setattr(settings, "job_max_deliveries", 1)
+
+    async def go():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        monkeypatch.setattr(redis_cache, "_client", client)
+        queue = JobQueue("jobs:test", concurrency=1)
+        await queue._ensure_group(client)
+        await queue.enqueue("missing_job", {})
+        await client.xreadgroup(queue.group, "w1", {queue.stream: ">"})
+        # Second delivery of the same job exceeds job_max_deliveries
+        claimed = await client.xautoclaim(queue.stream, queue.group, "w2", min_idle_time=0)
+        (message_id, fields), = claimed[1]
+        await queue._process(client, "w2", message_id, fields)
+        return await client.xlen(queue.stream), await client.xlen(queue.dead_letter_stream)
+
+    assert asyncio.run(go()) == (0, 1)
@@ -0,0 +1,21 @@
+from app.core.metrics import CacheMetrics, NamespaceMetrics, merge_snapshots
+
+
+def test_write_latency_does_not_skew_read_percentiles():
+    metrics = CacheMetrics()
+    for _ in range(10):
+        metrics.lookup("tavily:a", True, latency_ms=0.8, size=100)
+    for _ in range(10):
+        metrics.write("tavily:a", latency_ms=40, size=100)
+
+    summary = merge_snapshots([metrics.snapshot()])["tavily"]
+    assert summary["latency_ms"]["p95"] == 1
+    assert summary["write_latency_ms"]["p50"] == 50
+
+
+def test_snapshots_without_write_latency_still_merge():
+    old = NamespaceMetrics().to_dict()
+    del old["write_latency_ms"]
+
+    summary = merge_snapshots([{"namespaces": {"tavily": old}}])["tavily"]
+    assert summary["write_latency_ms"]["p50"] == 0.0
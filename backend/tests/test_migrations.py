@@ -0,0 +1,75 @@
+import asyncio
+
+from app.core.cache import redis_cache
+from app.core.migrations import CacheMigrator
+from app.services.browsing import BrowsingService
+from app.services.research import ResearchService
+
+OLD_BROWSING_KEY = "yutori:browsing:0123456789abcdef0123456789abcdef:www.stripe.com/docs"
+OLD_RESEARCH_KEY = "yutori:research:0123456789abcdef0123456789abcdef:open_ai"
+
+
+def scan(migrator=None):
+    return asyncio.run((migrator or CacheMigrator())._scan_if_due(None))
+
+
+def test_scan_moves_entries_from_old_key_formats(memory_cache):
+    async def seed():
+        await redis_cache.set(OLD_BROWSING_KEY, {"products": ["Payments"]}, ttl=3600)
+        await redis_cache.set(OLD_RESEARCH_KEY, {"name": "OpenAI"}, ttl=3600)
+
+    asyncio.run(seed())
+    scan()
+
+    async def read():
+        store = redis_cache.store
+        browsing_key = BrowsingService()._get_cache_key("stripe.com")
+        research_key = ResearchService()._get_cache_key("openai")
+        return (
+            await redis_cache.get(browsing_key), await redis_cache.get(research_key),
+            await store.get(OLD_BROWSING_KEY), await store.get(OLD_RESEARCH_KEY),
+            await store.ttl(browsing_key),
+        )
+
+    browsing, research, old_browsing, old_research, ttl = asyncio.run(read())
+    assert browsing == {"products": ["Payments"]}
+    assert research == {"name": "OpenAI"}
+    assert old_browsing is None and old_research is None
+    assert 0 < ttl <= 3600
+
+
+def test_scan_keeps_newer_values_under_the_current_key(memory_cache):
+    current = BrowsingService()._get_cache_key("stripe.com")
+
+    async def go():
+        await redis_cache.set(OLD_BROWSING_KEY, {"products": ["old"]}, ttl=3600)
+        await redis_cache.set(current, {"products": ["new"]}, ttl=3600)
+        await CacheMigrator()._scan_if_due(None)
+        return await redis_cache.get(current), await redis_cache.store.get(OLD_BROWSING_KEY)
+
+    assert asyncio.run(go()) == ({"products": ["new"]}, None)
+
+
+def test_current_keys_are_left_in_place(memory_cache):
+    keys = [
+        BrowsingService()._get_cache_key("stripe.com"),
+        BrowsingService()._get_cache_key(f"https://{'developer-platform-' * 4}example.com/docs"),
+        ResearchService()._get_cache_key("小米"),
+    ]
+
+    async def go():
+        for key in keys:
+            await redis_cache.set(key, {"name": key}, ttl=3600)
+        await CacheMigrator()._scan_if_due(None)
+        return [await redis_cache.get(key) for key in keys]
+
+    assert asyncio.run(go()) == [{"name": key} for key in keys]
+
+
+def test_old_format_keys_are_never_migrated_in_place(memory_cache):
+    async def go():
+        # Plain JSON, written before schema versions: outdated
+        await redis_cache.store.set(OLD_BROWSING_KEY, b'{"raw_content": "docs"}', 3600)
+        return await CacheMigrator().migrate(OLD_BROWSING_KEY)
+
+    assert asyncio.run(go()) is False
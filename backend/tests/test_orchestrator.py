@@ -0,0 +1,308 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import cache_company, get_cached_company, get_progress_updates, get_section_updates
+from app.core.orchestrator import (
+    AnalysisContext, CompanyOrchestrator, Stage, STAGE_OPTIONS, plan_stages
+)
+from app.models import CompanyOverview
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def run_stages(stages, deadline_in=None, context=None):
+    """Run stages on a fresh orchestrator, without progress updates"""
+    orchestrator = CompanyOrchestrator("test-session")
+    context = context or AnalysisContext("Acme", "acme-id", {stage.name for stage in stages})
+
+    async def go():
+        deadline = None
+        if deadline_in is not None:
+            deadline = asyncio.get_running_loop().time() + deadline_in
+        return await orchestrator._run_stages(stages, context, deadline=deadline)
+
+    return run(go()), context
+
+
+def test_plan_stages_defaults_to_every_stage():
+    assert plan_stages(None) == {"overview", *STAGE_OPTIONS}
+    assert plan_stages({}) == {"overview", *STAGE_OPTIONS}
+
+
+def test_plan_stages_drops_disabled_stages_but_keeps_overview():
+    plan = plan_stages({"include_news": False, "include_graph": False})
+    assert "news" not in plan and "graph" not in plan
+    assert "overview" in plan and "competitors" in plan
+
+    everything_off = {flag: False for flag in STAGE_OPTIONS.values()}
+    assert plan_stages(everything_off) == {"overview"}
+
+
+def test_dependent_stage_runs_after_its_inputs_and_receives_them():
+    order = []
+
+    async def overview():
+        await asyncio.sleep(0.01)
+        order.append("overview")
+        return {"name": "Acme"}
+
+    async def apis(overview):
+        order.append("apis")
+        return {"from": overview["name"]}
+
+    results, _ = run_stages([
+        Stage("apis", apis, inputs=("overview",)),
+        Stage("overview", overview),
+    ])
+
+    assert order == ["overview", "apis"]
+    assert results["apis"] == {"from": "Acme"}
+
+
+def test_independent_stages_run_concurrently():
+    started = []
+    release = None
+
+    async def stage(name):
+        started.append(name)
+        await release.wait()
+        return name
+
+    async def go():
+        nonlocal release
+        release = asyncio.Event()
+        orchestrator = CompanyOrchestrator("test-session")
+        context = AnalysisContext("Acme", "acme-id", {"financials", "team"})
+        task = asyncio.create_task(orchestrator._run_stages([
+            Stage("financials", lambda: stage("financials")),
+            Stage("team", lambda: stage("team")),
+        ], context))
+        await asyncio.sleep(0.01)
+        # Both started before either could finish
+        assert sorted(started) == ["financials", "team"]
+        release.set()
+        return await task
+
+    assert run(go()) == {"financials": "financials", "team": "team"}
+
+
+def test_stage_past_its_budget_uses_fallback_and_is_degraded():
+    async def slow():
+        await asyncio.sleep(1)
+        return {"name": "late"}
+
+    results, context = run_stages([
+        Stage("overview", slow, budget=0.01, fallback=lambda: {"name": "fallback"}),
+    ])
+
+    assert results["overview"] == {"name": "fallback"}
+    assert context.degraded == {"overview"}
+
+
+def test_deadline_cuts_off_stages_without_their_own_budget(caplog):
+    async def slow():
+        await asyncio.sleep(1)
+        return {}
+
+    async def fast():
+        return {"revenue": 1}
+
+    results, context = run_stages([
+        Stage("news", slow, required=False, budget=5),
+        Stage("financials", fast, required=False),
+    ], deadline_in=0.05)
+
+    assert results == {"financials": {"revenue": 1}}
+    assert context.degraded == {"news"}
+    assert "news cut off by the deadline" in caplog.text and "5s budget" not in caplog.text
+
+
+def test_failed_optional_stage_skips_its_dependents():
+    async def broken():
+        raise ValueError("upstream down")
+
+    async def dependent(competitors):
+        raise AssertionError("must not run")
+
+    async def other():
+        return "ok"
+
+    results, context = run_stages([
+        Stage("competitors", broken, required=False),
+        Stage("graph", dependent, inputs=("competitors",), required=False),
+        Stage("team", other, required=False),
+    ])
+
+    assert results == {"team": "ok"}
+    assert context.degraded == {"competitors", "graph"}
+
+
+def test_required_stage_failure_is_raised_and_cancels_the_rest():
+    cancelled = False
+
+    async def broken():
+        raise ValueError("no overview")
+
+    async def slow():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    with pytest.raises(ValueError, match="no overview"):
+        run_stages([Stage("overview", broken), Stage("news", slow, required=False)])
+    assert cancelled
+
+
+def test_stages_already_in_the_context_are_not_rerun():
+    async def overview():
+        raise AssertionError("must not run")
+
+    async def apis(overview):
+        return overview["name"]
+
+    context = AnalysisContext("Acme", "acme-id", {"overview", "apis"})
+    context.artifacts["overview"] = {"name": "Acme"}
+    results, _ = run_stages([Stage("overview", overview), Stage("apis", apis, inputs=("overview",))], context=context)
+
+    assert results["apis"] == "Acme"
+
+
+def test_unsatisfiable_inputs_raise():
+    async def apis(overview):
+        return {}
+
+    with pytest.raises(RuntimeError, match="unsatisfiable"):
+        run_stages([Stage("apis", apis, inputs=("overview",))])
+
+
+def test_enrichment_publishes_recovered_sections_before_slow_stages_finish(memory_cache):
+    orchestrator = CompanyOrchestrator("test-session")
+    context = AnalysisContext("Acme", "acme-id", {"overview", "financials", "apis"})
+    context.slug = "acme"
+    context.sessions = ["test-session"]
+    context.degraded = {"financials"}
+    seen_by_apis = {}
+
+    async def financials():
+        return {"status": "public", "stock_symbol": "ACME"}
+
+    async def apis():
+        await asyncio.sleep(0.05)
+        # The recovered section is readable while the slow stage still runs
+        cached = await get_cached_company("acme-id", sections=["financials"])
+        seen_by_apis.update(cached)
+        return {}
+
+    orchestrator._fast_path_stages = lambda *args, **kwargs: [Stage("financials", financials)]
+    orchestrator._enrichment_stages = lambda *args, **kwargs: [Stage("apis", apis, required=False)]
+
+    async def go():
+        await cache_company("acme-id", {
+            "id": "acme-id",
+            "status": "completed",
+            "company_name": "Acme",
+            "sections": ["overview"],
+            "degraded_sections": ["financials"],
+            "section_updated_at": {},
+            "metadata": {"sources_count": 20, "confidence_score": 0.75},
+            "data": {"overview": {"name": "Acme"}, "financials": {"status": "private"}},
+        })
+        await orchestrator._background_enrich(context)
+        return (
+            await get_cached_company("acme-id"),
+            await get_section_updates("test-session"),
+            await get_progress_updates("test-session"),
+        )
+
+    record, updates, progress = run(go())
+
+    assert seen_by_apis["data"]["financials"]["stock_symbol"] == "ACME"
+    assert "financials" not in seen_by_apis["degraded_sections"]
+    assert "financials" in seen_by_apis["section_updated_at"]
+    assert [update["section"] for update in updates] == ["financials"]
+    assert record["degraded_sections"] == []
+    assert record["enrichment_status"] == "completed"
+    assert "products_apis" in record["sections"]
+    assert progress["type"] == "enriched" and progress["degraded_sections"] == []
+
+
+def test_refresh_does_not_stamp_an_overview_still_awaiting_research(memory_cache):
+    overview = {"name": "Acme", "slug": "acme", "description": "Rockets", "website": "https://acme.com"}
+    orchestrator = CompanyOrchestrator("test-session")
+
+    async def unchanged_overview():
+        return overview
+
+    async def financials():
+        return {"status": "public"}
+
+    orchestrator._fast_path_stages = lambda *args, **kwargs: [
+        Stage("overview", unchanged_overview), Stage("financials", financials)
+    ]
+    orchestrator._enrichment_stages = lambda *args, **kwargs: []
+
+    async def go():
+        await cache_company("acme-id", {
+            "id": "acme-id",
+            "status": "completed",
+            "company_name": "Acme",
+            "slug": "acme",
+            "sections": ["overview", "financials"],
+            "section_updated_at": {"overview": "2020-01-01T00:00:00", "financials": "2020-01-01T00:00:00"},
+            "metadata": {},
+            "data": {
+                "overview": CompanyOverview(**overview).model_dump(),
+                "financials": {"status": "private"},
+            },
+        })
+        await orchestrator.refresh_sections("acme-id", ["overview", "financials"])
+        return await get_cached_company("acme-id")
+
+    record = run(go())
+
+    assert record["section_updated_at"]["overview"] == "2020-01-01T00:00:00"
+    assert record["section_updated_at"]["financials"] > "2020-01-01T00:00:00"
+    assert record["data"]["financials"]["status"] == "public"
+
+
+def test_enrichment_degrades_the_dependents_of_a_stage_that_fails_again(memory_cache):
+    orchestrator = CompanyOrchestrator("test-session")
+    context = AnalysisContext("Acme", "acme-id", {"overview", "competitors", "graph"})
+    context.artifacts["overview"] = {"name": "Acme"}
+    context.sessions = ["test-session"]
+    context.degraded = {"competitors"}
+
+    async def competitors():
+        raise ValueError("still down")
+
+    async def graph(overview, competitors):
+        raise AssertionError("must not run")
+
+    orchestrator._fast_path_stages = lambda *args, **kwargs: [Stage("competitors", competitors, required=False)]
+    orchestrator._enrichment_stages = lambda *args, **kwargs: [
+        Stage("graph", graph, inputs=("overview", "competitors"), required=False)
+    ]
+
+    async def go():
+        await cache_company("acme-id", {
+            "id": "acme-id",
+            "status": "completed",
+            "sections": ["overview"],
+            "degraded_sections": ["market_intelligence"],
+            "metadata": {"sources_count": 20, "confidence_score": 0.75},
+            "data": {"overview": {"name": "Acme"}},
+        })
+        await orchestrator._background_enrich(context)
+        return await get_cached_company("acme-id", sections=()), await get_progress_updates("test-session")
+
+    head, progress = run(go())
+
+    assert context.degraded == {"competitors", "graph"}
+    assert head["degraded_sections"] == ["market_intelligence"]
+    assert progress["degraded_sections"] == ["market_intelligence"]
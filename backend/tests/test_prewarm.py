@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.core.cache import redis_cache
+from app.core.prewarm import ACCESS_KEY, DECAY_LOCK_KEY, PrewarmScheduler
+
+
+def test_access_counts_are_not_halved_on_the_first_run(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(redis_cache.breaker, "opened_at", None)
+    monkeypatch.setattr(settings, "prewarm_interval_seconds", 0)
+
+    async def go():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        monkeypatch.setattr(redis_cache, "_client", client)
+        await client.zincrby(ACCESS_KEY, 8, "stripe")
+
+        scheduler = PrewarmScheduler()
+        stop = asyncio.Event()
+
+        async def first_run():
+            await scheduler._decay(client)
+            stop.set()
+
+        scheduler.run_once = first_run
+        await scheduler.run(stop)
+        after_first_run = await client.zscore(ACCESS_KEY, "stripe")
+
+        # A period later the lock has expired and the counts are halved
+        await client.delete(DECAY_LOCK_KEY)
+        await scheduler._decay(client)
+        return after_first_run, await client.zscore(ACCESS_KEY, "stripe")
+
+    assert asyncio.run(go()) == (8, 4)
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import redis_cache
+from app.core.progress import ProgressHub
+
+
+def test_listener_without_followed_sessions_stops_without_subscribing(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(redis_cache.breaker, "opened_at", None)
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_cache, "_client", client)
+    hub = ProgressHub()
+    subscribed = []
+
+    def pubsub(**kwargs):
+        pubsub = type(client).pubsub(client, **kwargs)
+
+        async def subscribe(*channels):
+            # redis-py sends a bare SUBSCRIBE, which Redis rejects
+            subscribed.append(channels)
+
+        pubsub.subscribe = subscribe
+        return pubsub
+
+    monkeypatch.setattr(client, "pubsub", pubsub)
+
+    async def go():
+        # The last socket left before the listener (re)connected
+        hub._listener = asyncio.current_task()
+        await asyncio.wait_for(hub._listen(), 1)
+
+    asyncio.run(go())
+    assert subscribed == []
+    assert hub._listener is None and hub._pubsub is None
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.core.cache import redis_cache, cache_company, get_cached_company
+from app.services import research
+from app.services.research import ResearchService
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def fake_client(data):
+    class FakeAsyncClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def get(self, *args, **kwargs):
+            return FakeResponse(data)
+
+    return FakeAsyncClient
+
+
+@pytest.fixture
+def requeued(monkeypatch, memory_cache):
+    monkeypatch.setattr(settings, "research_poll_interval_seconds", 0)
+    jobs = []
+
+    async def enqueue(job_type, payload):
+        jobs.append((job_type, payload))
+
+    monkeypatch.setattr(research.poll_queue, "enqueue", enqueue)
+    return jobs
+
+
+def payload(**overrides):
+    return {
+        "task_id": "task-1", "company_name": "Acme",
+        "cache_key": "yutori:research:x:acme", "task_key": "yutori:task:x:acme",
+        "deadline": 4102444800, **overrides,
+    }
+
+
+def test_running_task_is_polled_again_by_a_new_job(monkeypatch, requeued):
+    monkeypatch.setattr(research.httpx, "AsyncClient", fake_client({"status": "running"}))
+
+    asyncio.run(ResearchService()._poll_and_cache(payload()))
+
+    assert requeued == [("research_poll", payload())]
+
+
+def test_poll_past_its_deadline_gives_up(monkeypatch, requeued):
+    monkeypatch.setattr(research.httpx, "AsyncClient", fake_client({"status": "running"}))
+
+    async def go():
+        await redis_cache.set("yutori:task:x:acme", "task-1")
+        await ResearchService()._poll_and_cache(payload(deadline=1))
+        return await redis_cache.get("yutori:task:x:acme")
+
+    assert asyncio.run(go()) is None
+    assert requeued == []
+
+
+def test_finished_task_is_parsed_and_cached(monkeypatch, requeued):
+    monkeypatch.setattr(research.httpx, "AsyncClient", fake_client({"status": "succeeded", "result": "text"}))
+
+    async def parse(self, company_name, data):
+        return {"name": company_name, "description": data["result"]}
+
+    monkeypatch.setattr(ResearchService, "_parse_overview", parse)
+
+    async def go():
+        await redis_cache.set("yutori:task:x:acme", "task-1")
+        await ResearchService()._poll_and_cache(payload())
+        return await redis_cache.get("yutori:research:x:acme"), await redis_cache.get("yutori:task:x:acme")
+
+    cached, task = asyncio.run(go())
+    assert cached == {"name": "Acme", "description": "text"}
+    assert task is None
+    assert requeued == []
+
+
+def test_finished_research_updates_the_cached_company_record(monkeypatch, requeued):
+    monkeypatch.setattr(research.httpx, "AsyncClient", fake_client({"status": "succeeded", "result": "text"}))
+
+    async def parse(self, company_name, data):
+        return {"name": company_name, "slug": "acme", "description": "Researched", "website": "https://acme.com"}
+
+    monkeypatch.setattr(ResearchService, "_parse_overview", parse)
+
+    async def go():
+        await cache_company("acme-id", {
+            "id": "acme-id",
+            "status": "completed",
+            "company_name": "Acme",
+            "section_updated_at": {"overview": "2020-01-01T00:00:00"},
+            "metadata": {},
+            "data": {"overview": {"name": "Acme", "description": "Quick search"}, "financials": {"status": "public"}},
+        }, aliases=["acme"])
+        await ResearchService()._poll_and_cache(payload(company_key="acme"))
+        return await get_cached_company("acme")
+
+    record = asyncio.run(go())
+    assert record["data"]["overview"]["description"] == "Researched"
+    assert record["data"]["financials"] == {"status": "public"}
+    assert record["section_updated_at"]["overview"] > "2020-01-01T00:00:00"
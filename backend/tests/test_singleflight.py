@@ -0,0 +1,50 @@
+import asyncio
+
+from app.core.cache import get_progress_updates, get_section_updates, push_section_update, update_progress
+from app.core.singleflight import AnalysisFlight, flight_key
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_flight_key_ignores_case_spacing_and_legal_suffix():
+    assert flight_key("  Open   AI, Inc. ") == flight_key("openai")
+
+
+def test_joiner_gets_sections_and_progress_published_before_it_attached(memory_cache):
+    async def go():
+        leader = AnalysisFlight("Acme", "leader")
+        assert await leader.join()
+        await push_section_update("leader", {"type": "section", "section": "overview", "session_id": "leader"})
+        await push_section_update("leader", {"type": "section", "section": "financials", "session_id": "leader"})
+        await update_progress("leader", {"type": "progress", "progress": 0.5, "session_id": "leader"})
+
+        joiner = AnalysisFlight("acme inc", "joiner")
+        assert not await joiner.join()
+        assert await leader.sessions() == ["leader", "joiner"]
+
+        sections = await get_section_updates("joiner")
+        progress = await get_progress_updates("joiner")
+        await leader.complete("acme-id")
+        return sections, progress
+
+    sections, progress = run(go())
+    assert [item["section"] for item in sections] == ["overview", "financials"]
+    assert all(item["session_id"] == "joiner" for item in sections)
+    assert progress == {"type": "progress", "progress": 0.5, "session_id": "joiner"}
+
+
+def test_sections_already_fanned_out_to_the_joiner_are_not_copied_twice(memory_cache):
+    async def go():
+        leader = AnalysisFlight("Acme", "leader")
+        assert await leader.join()
+        for session_id in ("leader", "joiner"):
+            await push_section_update(session_id, {"section": "overview", "session_id": session_id})
+
+        assert not await AnalysisFlight("Acme", "joiner").join()
+        sections = await get_section_updates("joiner")
+        await leader.complete()
+        return sections
+
+    assert [item["section"] for item in run(go())] == ["overview"]
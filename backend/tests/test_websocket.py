@@ -0,0 +1,69 @@
+import asyncio
+import types
+
+import pytest
+
+from app.api import websocket as ws_module
+from app.core.cache import push_section_update, update_progress
+
+real_sleep = asyncio.sleep
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def no_waits(memory_cache, monkeypatch):
+    """Poll without Redis pub/sub and skip the socket's sleeps"""
+    monkeypatch.setattr(ws_module, "asyncio", types.SimpleNamespace(sleep=lambda seconds: real_sleep(0)))
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_socket_stays_open_until_degraded_sections_are_recovered(no_waits):
+    socket = FakeWebSocket()
+
+    async def go():
+        await push_section_update("s1", {"type": "section", "section": "financials", "degraded": True})
+        await update_progress("s1", {"type": "completed", "degraded_sections": ["financials"]})
+
+        task = asyncio.create_task(ws_module.websocket_progress(socket, "s1"))
+        for _ in range(20):
+            await real_sleep(0)
+        still_open = not socket.closed
+
+        await push_section_update("s1", {"type": "section", "section": "financials", "degraded": False})
+        await asyncio.wait_for(task, 1)
+        return still_open
+
+    assert run(go())
+    assert socket.closed
+    assert [message.get("degraded") for message in socket.sent if message["type"] == "section"] == [True, False]
+
+
+def test_enriched_event_closes_the_socket_with_sections_still_degraded(no_waits):
+    socket = FakeWebSocket()
+
+    async def go():
+        await update_progress("s1", {"type": "completed", "degraded_sections": ["financials"]})
+        task = asyncio.create_task(ws_module.websocket_progress(socket, "s1"))
+        await real_sleep(0)
+        await update_progress("s1", {"type": "enriched", "degraded_sections": ["financials"]})
+        await asyncio.wait_for(task, 1)
+
+    run(go())
+    assert [message["type"] for message in socket.sent] == ["completed", "enriched"]
@@ -2,9 +2,8 @@
 """Check for active Yutori tasks in Redis and their status"""
 
 import redis
-import json
-import hashlib
 import os
+import sys
 import httpx
 import asyncio
 from dotenv import load_dotenv
@@ -14,8 +13,14 @@ load_dotenv('backend/.env')
 redis_url = os.getenv('REDIS_URL')
 yutori_key = os.getenv('YUTORI_API_KEY')
 
+# Keys and values in the backend's own formats
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from app.core.cache import CacheEntry
+from app.core.entities import company_key
+from app.services.research import ResearchService
+
 print("Connecting to Redis...")
-r = redis.from_url(redis_url, decode_responses=True)
+r = redis.from_url(redis_url)
 r.ping()
 print("✓ Connected!\n")
 
@@ -42,9 +47,9 @@ async def check_task_status(task_id):
 
 async def main():
     for company in companies:
-        name_hash = hashlib.md5(company.lower().encode()).hexdigest()
-        task_key = f"yutori:task:{name_hash}:{company.lower().replace(' ', '_')}"
-        cache_key = f"yutori:research:{name_hash}:{company.lower().replace(' ', '_')}"
+        research = ResearchService()
+        task_key = research._get_task_key(company_key(company))
+        cache_key = research._get_cache_key(company_key(company))
         
         print(f"\n{company}:")
         print("-" * 40)
@@ -52,7 +57,7 @@ async def main():
         # Check if cached
         cached = r.get(cache_key)
         if cached:
-            data = json.loads(cached)
+            data = CacheEntry.decode(cached).value
             print(f"  ✅ CACHED (research complete)")
             print(f"     Founded: {data.get('founded_year', 'N/A')}")
             print(f"     HQ: {data.get('headquarters', 'N/A')}")
@@ -60,8 +65,9 @@ async def main():
             print(f"  ❌ NOT CACHED")
         
         # Check for pending task
-        task_id = r.get(task_key)
-        if task_id:
+        task = r.get(task_key)
+        if task:
+            task_id = CacheEntry.decode(task).value
             print(f"  🔄 TASK RUNNING: {task_id}")
             
             # Check task status on Yutori
@@ -3,6 +3,8 @@ import {
   AnalyzeRequest,
   AnalyzeResponse,
   CompanyResponse,
+  CompanySection,
+  CompanySectionsResponse,
   GraphData
 } from '../types';
 
@@ -17,6 +19,16 @@ export const companyApi = {
     return data;
   },
 
+  getCompanySections: async (
+    companyId: string,
+    sections: CompanySection[]
+  ): Promise<CompanySectionsResponse> => {
+    const { data } = await apiClient.get(`/company/${companyId}/sections`, {
+      params: { names: sections.join(',') }
+    });
+    return data;
+  },
+
   getGraph: async (companyId: string, depth: number = 2): Promise<GraphData> => {
     const { data } = await apiClient.get(`/graph/${companyId}`, {
       params: { depth }
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import {
   Box,
   Paper,
@@ -35,6 +35,8 @@ const LoadingProgress: React.FC<LoadingProgressProps> = ({
   const [progress, setProgress] = useState<ProgressMessage | null>(null);
   const [isConnected, setIsConnected] = useState(false);
   const [_companySlug, _setCompanySlug] = useState<string | null>(null);
+  // The socket stays open for degraded sections after 'completed'
+  const completed = useRef(false);
 
   useEffect(() => {
     const apiUrl = import.meta.env.VITE_API_URL || 'http://localhost:8000';
@@ -50,7 +52,8 @@ const LoadingProgress: React.FC<LoadingProgressProps> = ({
       const data: ProgressMessage = JSON.parse(event.data);
       setProgress(data);
 
-      if (data.type === 'completed') {
+      if ((data.type === 'completed' || data.type === 'enriched') && !completed.current) {
+        completed.current = true;
         // Extract company slug from the message or session
         // For now, we'll pass the session ID and let the backend handle it
         setTimeout(() => {
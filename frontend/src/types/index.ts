@@ -177,18 +177,32 @@ export interface CompanyResponse {
   analyzed_at: string;
   status: string;
   enrichment_status?: string;
+  sections?: string[];
+  freshness?: Record<string, { age_seconds: number | null; stale: boolean }>;
   data: CompanyData;
   metadata: CompanyMetadata;
 }
 
+export type CompanySection = keyof CompanyData;
+
+export interface CompanySectionsResponse extends Omit<CompanyResponse, 'data'> {
+  data: Partial<CompanyData>;
+}
+
 // Progress Types
 export interface ProgressMessage {
-  type: 'progress' | 'completed' | 'error';
+  type: 'progress' | 'section' | 'completed' | 'enriched' | 'error';
   session_id: string;
   stage: string;
   progress: number;
   message: string;
   timestamp: string;
+  // Present on 'section' messages: one finished part of CompanyData
+  section?: keyof CompanyData;
+  degraded?: boolean;
+  data?: unknown;
+  // Present on 'completed' and 'enriched' messages: sections still loading
+  degraded_sections?: (keyof CompanyData)[];
 }
 
 // Graph Types
@@ -3,26 +3,32 @@
 
 import redis
 import json
-import hashlib
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment
 load_dotenv('backend/.env')
 redis_url = os.getenv('REDIS_URL')
 
+# Keys and values in the backend's own formats
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from app.core.cache import CacheEntry
+from app.core.entities import company_key
+from app.services.research import ResearchService
+
 print(f"Connecting to Redis: {redis_url[:40]}...")
-r = redis.from_url(redis_url, decode_responses=True)
+r = redis.from_url(redis_url)
 
 # Test connection
 r.ping()
 print("✓ Redis connected!\n")
 
-# Generate cache key for Tesla
+# Generate cache keys for Tesla (the canonical key, unless the alias index maps it elsewhere)
 company_name = "Tesla"
-name_hash = hashlib.md5(company_name.lower().encode()).hexdigest()
-cache_key = f"yutori:research:{name_hash}:{company_name.lower().replace(' ', '_')}"
-task_key = f"yutori:task:{name_hash}:{company_name.lower().replace(' ', '_')}"
+research = ResearchService()
+cache_key = research._get_cache_key(company_key(company_name))
+task_key = research._get_task_key(company_key(company_name))
 
 print(f"Cache key: {cache_key}")
 print(f"Task key: {task_key}\n")
@@ -31,7 +37,7 @@ print(f"Task key: {task_key}\n")
 cached = r.get(cache_key)
 if cached:
     print("✓ Tesla data IS cached!")
-    data = json.loads(cached)
+    data = CacheEntry.decode(cached).value
     print(f"  Name: {data['name']}")
     print(f"  Founded: {data.get('founded_year', 'N/A')}")
     print(f"  HQ: {data.get('headquarters', 'N/A')}")
@@ -40,8 +46,9 @@ else:
     print("✗ Tesla data NOT cached yet")
     
     # Check if there's a pending task
-    task_id = r.get(task_key)
-    if task_id:
+    task = r.get(task_key)
+    if task:
+        task_id = CacheEntry.decode(task).value
         print(f"  Pending task ID: {task_id}")
         print("  Background polling may still be running...")
     else:
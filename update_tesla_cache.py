@@ -3,23 +3,28 @@
 
 import redis
 import json
-import hashlib
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment
 load_dotenv('backend/.env')
 redis_url = os.getenv('REDIS_URL')
 
+# Keys and values in the backend's own formats
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from app.core.cache import CacheEntry
+from app.core.entities import company_key
+from app.services.research import ResearchService
+
 print(f"Connecting to Redis...")
-r = redis.from_url(redis_url, decode_responses=True)
+r = redis.from_url(redis_url)
 r.ping()
 print("✓ Connected!\n")
 
-# Generate cache key for Tesla
+# Generate cache key for Tesla (the canonical key, unless the alias index maps it elsewhere)
 company_name = "Tesla"
-name_hash = hashlib.md5(company_name.lower().encode()).hexdigest()
-cache_key = f"yutori:research:{name_hash}:{company_name.lower().replace(' ', '_')}"
+cache_key = ResearchService()._get_cache_key(company_key(company_name))
 
 # Real Tesla data from completed Yutori task (655f085d-7294-43ee-8655-76752e0efffb)
 tesla_data = {
@@ -52,6 +57,6 @@ print(f"   TTL: 7 days\n")
 # Verify
 cached = r.get(cache_key)
 if cached:
-    data = json.loads(cached)
+    data = CacheEntry.decode(cached).value
     print("✓ Verified: Cache updated successfully!")
     print(f"  Description: {data['description'][:100]}...")